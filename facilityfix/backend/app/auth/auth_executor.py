@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from ..core.config import settings
+
+
+class AuthExecutor:
+    """
+    Runs blocking firebase_admin.auth calls on a dedicated thread pool.
+
+    The pool is separate from the anyio worker threads used for Firestore, so
+    a slow Identity Toolkit response can only ever tie up auth workers. At most
+    ``max_workers`` calls are handed to the pool at once; callers beyond that
+    wait on the event loop and are reported as queued.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._methods: Dict[str, Dict[str, float]] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="firebase-auth"
+            )
+        return self._executor
+
+    async def run(self, method: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the auth pool, recording it under ``method``"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        slots = self._slots
+
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+        try:
+            await slots.acquire()
+        finally:
+            # Also when cancelled while waiting (client gone, request deadline)
+            with self._lock:
+                self._queued -= 1
+
+        try:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            error = False
+            try:
+                return await loop.run_in_executor(
+                    self._get_executor(), partial(fn, *args, **kwargs)
+                )
+            except Exception:
+                error = True
+                raise
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._record(method, started_at - queued_at, finished_at - started_at, error)
+        finally:
+            slots.release()
+
+    def _record(self, method: str, wait: float, latency: float, error: bool):
+        entry = self._methods.get(method)
+        if entry is None:
+            entry = self._methods[method] = {
+                "calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "queue_wait_ms": 0.0
+            }
+        entry["calls"] += 1
+        entry["errors"] += int(error)
+        entry["total_ms"] += latency * 1000
+        entry["max_ms"] = max(entry["max_ms"], latency * 1000)
+        entry["queue_wait_ms"] += wait * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and per-method latency counters"""
+        with self._lock:
+            methods = {
+                name: {
+                    "calls": int(entry["calls"]),
+                    "errors": int(entry["errors"]),
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+                    "max_ms": round(entry["max_ms"], 3),
+                    "avg_queue_wait_ms": round(entry["queue_wait_ms"] / entry["calls"], 3),
+                }
+                for name, entry in self._methods.items()
+            }
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "methods": methods,
+            }
+
+    def configure_http_pool(self, app=None):
+        """
+        Give the firebase_admin auth client a keep-alive connection pool that
+        is as large as this executor, so every worker reuses a warm connection.
+
+        firebase_admin has no public hook for this, so the session is found
+        through its private attributes (as of firebase_admin 7.1.0, pinned in
+        requirements.txt). If a release moves them, the SDK's default pool is
+        kept and a warning says so.
+        """
+        try:
+            from firebase_admin import auth, _http_client
+            get_client = getattr(auth, "_get_client", None)
+            client = get_client(app) if get_client is not None else None
+            user_manager = getattr(client, "_user_manager", None)
+            http_client = getattr(user_manager, "http_client", None)
+            session = getattr(http_client, "session", None)
+            if not isinstance(session, requests.Session):
+                print("Warning: firebase_admin auth internals have changed; "
+                      "keeping its default HTTP pool")
+                return
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=2,
+                pool_maxsize=self.max_workers,
+                max_retries=_http_client.DEFAULT_RETRY_CONFIG
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        except Exception as e:
+            # Fall back to the SDK's default pool
+            print(f"Warning: could not configure auth HTTP pool: {e}")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        # The semaphore belongs to the event loop that is going away
+        self._slots = None
+
+
+auth_executor = AuthExecutor(max_workers=settings.AUTH_EXECUTOR_WORKERS)
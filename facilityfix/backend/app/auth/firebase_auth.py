@@ -1,33 +1,38 @@
 import firebase_admin
-from firebase_admin import credentials, auth
-import os
+from firebase_admin import auth
 from typing import Optional
+from .token_verifier import FirebaseTokenVerifier
+from .auth_executor import auth_executor
+from ..core.config import settings
+from ..core.firebase_app import initialize_firebase
+from ..core.lazy import LazyService
 
 class FirebaseAuth:
     def __init__(self):
-        if not firebase_admin._apps:
-            try:
-                service_account_path = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH', 'firebase-service-account.json')
+        initialize_firebase()
 
-                if not os.path.exists(service_account_path):
-                    raise FileNotFoundError(f"Firebase service account file not found at {service_account_path}")
-                
-                cred = credentials.Certificate(service_account_path)
-                firebase_admin.initialize_app(cred, {
-                    'facilityfix-6d27a': os.getenv('FIREBASE_PROJECT_ID')
-                })
-                print("Firebase initialized successfully with Firestore")
-            except FileNotFoundError as e:
-                print(f"ERROR: {e}")
-                print("Please download your Firebase service account key and place it in the backend directory")
-                raise Exception("Firebase service account file missing")
-            except Exception as e:
-                print(f"Firebase initialization error: {e}")
-                raise
+        self.token_verifier = FirebaseTokenVerifier(
+            project_id=firebase_admin.get_app().project_id or settings.FIREBASE_PROJECT_ID,
+            cache_size=settings.TOKEN_CACHE_SIZE,
+            clock_skew_seconds=settings.TOKEN_CLOCK_SKEW_SECONDS
+        )
+        self.executor = auth_executor
+        self.executor.configure_http_pool()
+    
+    async def warm_up(self):
+        """Fetch Google's signing certificates before the first request needs them"""
+        try:
+            await self.token_verifier.refresh_keys()
+        except Exception as e:
+            print(f"Warning: could not prefetch signing certificates: {e}")
+    
+    async def close(self):
+        await self.token_verifier.close()
     
     async def verify_token(self, token: str) -> Optional[dict]:
+        """Verify an ID token locally against Google's cached signing keys"""
         try:
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = await self.token_verifier.verify(token)
             return decoded_token
         except Exception as e:
             print(f"Token verification failed: {e}")
@@ -35,7 +40,9 @@ class FirebaseAuth:
     
     async def create_user(self, email: str, password: str, display_name: str = None) -> dict:
         try:
-            user = auth.create_user(
+            user = await self.executor.run(
+                "create_user",
+                auth.create_user,
                 email=email,
                 password=password,
                 display_name=display_name
@@ -49,13 +56,13 @@ class FirebaseAuth:
     
     async def set_custom_claims(self, uid: str, claims: dict):
         try:
-            auth.set_custom_user_claims(uid, claims)
+            await self.executor.run("set_custom_claims", auth.set_custom_user_claims, uid, claims)
         except Exception as e:
             raise Exception(f"Setting custom claims failed: {e}")
     
     async def get_user_by_email(self, email: str):
         try:
-            user = auth.get_user_by_email(email)
+            user = await self.executor.run("get_user_by_email", auth.get_user_by_email, email)
             return user
         except Exception as e:
             return None
@@ -63,7 +70,7 @@ class FirebaseAuth:
     async def get_user(self, uid: str):
         """Get user by UID"""
         try:
-            user = auth.get_user(uid)
+            user = await self.executor.run("get_user", auth.get_user, uid)
             return user
         except Exception as e:
             print(f"Get user failed: {e}")
@@ -72,7 +79,9 @@ class FirebaseAuth:
     async def create_custom_token(self, uid: str, additional_claims: dict = None) -> str:
         """Create a custom token for testing purposes"""
         try:
-            custom_token = auth.create_custom_token(uid, additional_claims)
+            custom_token = await self.executor.run(
+                "create_custom_token", auth.create_custom_token, uid, additional_claims
+            )
             return custom_token.decode('utf-8')
         except Exception as e:
             raise Exception(f"Custom token creation failed: {e}")
@@ -80,15 +89,16 @@ class FirebaseAuth:
     async def delete_user(self, uid: str):
         """Delete a user from Firebase Auth"""
         try:
-            auth.delete_user(uid)
+            await self.executor.run("delete_user", auth.delete_user, uid)
         except Exception as e:
             raise Exception(f"User deletion failed: {e}")
     
     async def update_user(self, uid: str, **kwargs):
         """Update user properties in Firebase Auth"""
         try:
-            auth.update_user(uid, **kwargs)
+            await self.executor.run("update_user", auth.update_user, uid, **kwargs)
         except Exception as e:
             raise Exception(f"User update failed: {e}")
 
-firebase_auth = FirebaseAuth()
+# Created on first use or by the service container
+firebase_auth = LazyService(FirebaseAuth, "firebase_auth")
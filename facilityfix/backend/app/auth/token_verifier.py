@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+import jwt
+from cryptography import x509
+
+GOOGLE_CERTS_URL = (
+    "https://www.googleapis.com/robot/v1/metadata/x509/"
+    "securetoken@system.gserviceaccount.com"
+)
+ID_TOKEN_ISSUER_PREFIX = "https://securetoken.google.com/"
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+# Unknown "kid" values only force a refetch this often, so forged tokens
+# cannot turn every request into a certificate download.
+_MIN_FORCED_REFRESH_SECONDS = 60
+
+
+class TokenVerificationError(Exception):
+    """Raised when an ID token is malformed, expired or not signed by Google"""
+
+
+class FirebaseTokenVerifier:
+    """
+    Verifies Firebase ID tokens locally.
+
+    Google's signing certificates are kept in memory and refreshed in the
+    background shortly before their Cache-Control max-age runs out, so a
+    request never waits on the certificate endpoint once the keys are warm.
+    Tokens that verified successfully are remembered in a bounded LRU keyed
+    by the SHA-256 of the token until their own ``exp``.
+    """
+
+    def __init__(self, project_id: str, cache_size: int = 10000,
+                 clock_skew_seconds: int = 0, certs_url: str = GOOGLE_CERTS_URL):
+        self.project_id = project_id
+        self.issuer = f"{ID_TOKEN_ISSUER_PREFIX}{project_id}"
+        self.cache_size = cache_size
+        self.clock_skew_seconds = clock_skew_seconds
+        self.certs_url = certs_url
+
+        self._keys: Dict[str, object] = {}
+        self._keys_expire_at = 0.0
+        self._keys_fetched_at = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    async def verify(self, token: str) -> dict:
+        """
+        Verify a Firebase ID token and return its decoded claims
+
+        Raises:
+            TokenVerificationError: If the token is not a valid ID token
+        """
+        if not token or not isinstance(token, str):
+            raise TokenVerificationError("ID token must be a non-empty string")
+
+        cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Malformed ID token: {e}")
+
+        if header.get("alg") != "RS256":
+            raise TokenVerificationError(
+                f'Incorrect algorithm. Expected "RS256" but got "{header.get("alg")}"'
+            )
+        kid = header.get("kid")
+        if not kid:
+            raise TokenVerificationError('ID token has no "kid" claim')
+
+        public_key = await self._get_key(kid)
+        claims = self._decode(token, public_key)
+
+        self._cache_put(cache_key, float(claims["exp"]), claims)
+        return dict(claims)
+
+    def _decode(self, token: str, public_key) -> dict:
+        try:
+            claims = jwt.decode(
+                token,
+                public_key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=self.issuer,
+                leeway=self.clock_skew_seconds,
+                options={"require": ["exp", "iat", "aud", "iss", "sub"]},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise TokenVerificationError(f"Token expired: {e}")
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(str(e))
+
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise TokenVerificationError('ID token has an invalid "sub" (subject) claim')
+
+        auth_time = claims.get("auth_time")
+        if auth_time is not None and auth_time > time.time() + self.clock_skew_seconds:
+            raise TokenVerificationError('ID token has a future "auth_time" claim')
+
+        claims["uid"] = subject
+        return claims
+
+    # ── verified-token cache ─────────────────────────────────────────────
+    def _cache_get(self, cache_key: str) -> Optional[dict]:
+        entry = self._cache.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if expires_at + self.clock_skew_seconds <= time.time():
+            self._cache.pop(cache_key, None)
+            return None
+        self._cache.move_to_end(cache_key)
+        return claims
+
+    def _cache_put(self, cache_key: str, expires_at: float, claims: dict):
+        self._cache[cache_key] = (expires_at, claims)
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        """Forget every verified token (e.g. after revoking refresh tokens)"""
+        self._cache.clear()
+
+    # ── signing keys ─────────────────────────────────────────────────────
+    async def _get_key(self, kid: str):
+        if not self._keys or time.time() >= self._keys_expire_at:
+            await self.refresh_keys()
+
+        public_key = self._keys.get(kid)
+        if public_key is None and time.time() - self._keys_fetched_at >= _MIN_FORCED_REFRESH_SECONDS:
+            # Google rotated its keys before our copy expired
+            await self.refresh_keys(force=True)
+            public_key = self._keys.get(kid)
+        if public_key is None:
+            raise TokenVerificationError(f'ID token signed with unknown key "{kid}"')
+        return public_key
+
+    async def refresh_keys(self, force: bool = False):
+        """Fetch Google's signing certificates unless the in-memory copy is still fresh"""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+
+        async with self._refresh_lock:
+            now = time.time()
+            if not force and self._keys and now < self._keys_expire_at:
+                return
+            if force and now - self._keys_fetched_at < _MIN_FORCED_REFRESH_SECONDS:
+                # Another coroutine refreshed while we waited for the lock
+                return
+            keys, max_age = await self._fetch_keys()
+            self._keys = keys
+            self._keys_fetched_at = time.time()
+            self._keys_expire_at = self._keys_fetched_at + max_age
+            self._schedule_refresh(max_age)
+
+    async def _fetch_keys(self) -> Tuple[Dict[str, object], int]:
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.get(self.certs_url)
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise TokenVerificationError(f"Failed to fetch Google signing certificates: {e}")
+
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode("utf-8")).public_key()
+            for kid, pem in response.json().items()
+        }
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else 3600
+        return keys, max_age
+
+    def _schedule_refresh(self, max_age: int):
+        """Refresh the keys in the background before the current copy expires"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            if self._refresh_task is not asyncio.current_task():
+                self._refresh_task.cancel()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        delay = max(max_age * 0.9, 1)
+        self._refresh_task = loop.create_task(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await self.refresh_keys(force=True)
+        except Exception as e:
+            # Keep serving with the current keys; the next request retries
+            print(f"Background key refresh failed: {e}")
+
+    async def close(self):
+        """Stop the background refresh task"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
@@ -10,5 +10,40 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CLOCK_SKEW_SECONDS: int = int(os.getenv("TOKEN_CLOCK_SKEW_SECONDS", "0"))
+    AUTH_EXECUTOR_WORKERS: int = int(os.getenv("AUTH_EXECUTOR_WORKERS", "8"))
+    IDENTITY_INDEX_SIZE: int = int(os.getenv("IDENTITY_INDEX_SIZE", "50000"))
+    # "firestore", or a backend from app/database/backends ("memory", "sqlite")
+    DATABASE_BACKEND: str = os.getenv("DATABASE_BACKEND", "firestore")
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "facilityfix.sqlite3")
+    SQLITE_POOL_SIZE: int = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+    FIRESTORE_ASYNC: bool = os.getenv("FIRESTORE_ASYNC", "true").lower() == "true"
+    FIRESTORE_BULK_CONCURRENCY: int = int(os.getenv("FIRESTORE_BULK_CONCURRENCY", "4"))
+    FIRESTORE_GET_ALL_CHUNK_SIZE: int = int(os.getenv("FIRESTORE_GET_ALL_CHUNK_SIZE", "100"))
+    FIRESTORE_SCAN_PAGE_SIZE: int = int(os.getenv("FIRESTORE_SCAN_PAGE_SIZE", "300"))
+    FIRESTORE_AGGREGATION_CONCURRENCY: int = int(os.getenv("FIRESTORE_AGGREGATION_CONCURRENCY", "8"))
+    BUILDING_CACHE_TTL_SECONDS: int = int(os.getenv("BUILDING_CACHE_TTL_SECONDS", "60"))
+    # Query-result cache in DatabaseService; 0 for either disables it
+    QUERY_CACHE_MAX_BYTES: int = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    QUERY_CACHE_TTL_SECONDS: float = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "30"))
+    # Collections mirrored in memory by snapshot listeners (comma-separated, e.g. "users,buildings,units")
+    REPLICA_COLLECTIONS: list = [c.strip() for c in os.getenv("REPLICA_COLLECTIONS", "").split(",") if c.strip()]
+    REPLICA_MAX_STALENESS_SECONDS: float = float(os.getenv("REPLICA_MAX_STALENESS_SECONDS", "10"))
+    # Share one in-flight call between identical concurrent reads / GET requests
+    SINGLE_FLIGHT: bool = os.getenv("SINGLE_FLIGHT", "true").lower() == "true"
+    HTTP_SINGLE_FLIGHT: bool = os.getenv("HTTP_SINGLE_FLIGHT", "true").lower() == "true"
+    # Time budget of each HTTP request, which bounds Firestore read timeouts and retries (0: none)
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "15"))
+    # Idempotent reads: attempts (1 disables retries), per-attempt timeout and jittered backoff
+    FIRESTORE_READ_ATTEMPTS: int = int(os.getenv("FIRESTORE_READ_ATTEMPTS", "3"))
+    FIRESTORE_READ_TIMEOUT_SECONDS: float = float(os.getenv("FIRESTORE_READ_TIMEOUT_SECONDS", "5"))
+    FIRESTORE_RETRY_BASE_DELAY_MS: float = float(os.getenv("FIRESTORE_RETRY_BASE_DELAY_MS", "50"))
+    FIRESTORE_RETRY_MAX_DELAY_MS: float = float(os.getenv("FIRESTORE_RETRY_MAX_DELAY_MS", "1000"))
+    # Send a second point read when the first is slower than the recent p95 (at least the minimum delay)
+    FIRESTORE_HEDGE_READS: bool = os.getenv("FIRESTORE_HEDGE_READS", "false").lower() == "true"
+    FIRESTORE_HEDGE_MIN_DELAY_MS: float = float(os.getenv("FIRESTORE_HEDGE_MIN_DELAY_MS", "20"))
+    COUNTER_SHARDS: int = int(os.getenv("COUNTER_SHARDS", "4"))
+    USER_ID_BLOCK_SIZE: int = int(os.getenv("USER_ID_BLOCK_SIZE", "10"))
 
 settings = Settings()
@@ -0,0 +1,108 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI
+
+from ..auth.auth_executor import auth_executor
+from ..auth.firebase_auth import FirebaseAuth, firebase_auth
+from ..database.database_service import DatabaseService, database_service
+from ..services.concern_slip_service import ConcernSlipService
+from ..services.job_service_service import JobServiceService
+from ..services.work_order_permit_service import WorkOrderPermitService
+
+
+class ServiceContainer:
+    """
+    Process-wide services, built once when the app starts.
+
+    ``start`` creates the Firebase auth client and the DatabaseService,
+    binds them to the module-level ``firebase_auth`` / ``database_service``
+    singletons, starts the listeners of any replicated collections, builds
+    the workflow services on top of them and warms up the Firestore channel
+    and the signing-certificate cache, so the first request does not pay
+    for any of it. Routers get the services through
+    the ``get_*`` dependencies below.
+    """
+
+    def __init__(self):
+        self.firebase_auth: Optional[FirebaseAuth] = None
+        self.database_service: Optional[DatabaseService] = None
+        self.concern_slip_service: Optional[ConcernSlipService] = None
+        self.job_service_service: Optional[JobServiceService] = None
+        self.work_order_permit_service: Optional[WorkOrderPermitService] = None
+
+    @property
+    def started(self) -> bool:
+        return self.database_service is not None
+
+    async def start(self, warm_up: bool = True):
+        # Firebase auth first: it initializes the Firebase app Firestore uses
+        self.firebase_auth = firebase_auth.resolve()
+        self.database_service = database_service.resolve()
+        self.database_service.start_replicas()
+        self._build_services()
+
+        if warm_up:
+            await self.firebase_auth.warm_up()
+            await self.database_service.warm_up()
+
+    def _build_services(self):
+        self.concern_slip_service = ConcernSlipService(self.database_service)
+        self.job_service_service = JobServiceService(self.database_service)
+        self.work_order_permit_service = WorkOrderPermitService(self.database_service)
+
+    async def stop(self):
+        if self.firebase_auth is not None:
+            await self.firebase_auth.close()
+        if self.database_service is not None:
+            self.database_service.close()
+        auth_executor.shutdown()
+
+        firebase_auth.reset()
+        database_service.reset()
+        self.firebase_auth = None
+        self.database_service = None
+        self.concern_slip_service = None
+        self.job_service_service = None
+        self.work_order_permit_service = None
+
+    def _ensure_started(self):
+        # Apps run without the lifespan (e.g. a bare TestClient) build lazily
+        if not self.started:
+            self.firebase_auth = firebase_auth.resolve()
+            self.database_service = database_service.resolve()
+            self._build_services()
+
+
+container = ServiceContainer()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """FastAPI lifespan: start the container before serving, stop it on shutdown"""
+    await container.start()
+    try:
+        yield
+    finally:
+        await container.stop()
+
+
+# ── dependencies ─────────────────────────────────────────────────────────────
+def get_database_service() -> DatabaseService:
+    container._ensure_started()
+    return container.database_service
+
+
+def get_concern_slip_service() -> ConcernSlipService:
+    container._ensure_started()
+    return container.concern_slip_service
+
+
+def get_job_service_service() -> JobServiceService:
+    container._ensure_started()
+    return container.job_service_service
+
+
+def get_work_order_permit_service() -> WorkOrderPermitService:
+    container._ensure_started()
+    return container.work_order_permit_service
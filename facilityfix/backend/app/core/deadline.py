@@ -0,0 +1,57 @@
+"""
+Per-request time budgets.
+
+DeadlineMiddleware gives every HTTP request REQUEST_DEADLINE_SECONDS to
+finish. The deadline lives in a context variable, so it follows the
+request into the services, worker threads (FastAPI copies the context
+into them) and tasks spawned on its behalf, and the data path can size
+its timeouts and retries to what is left of it.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# time.monotonic() by which the current request must be done, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Run the block with at most ``seconds`` left (a deadline already in
+    force is only ever shortened; None or <= 0 leaves it as it is)
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (0 once passed), or None without one"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return max(0.0, expires_at - time.monotonic())
+
+
+class DeadlineMiddleware:
+    """ASGI middleware that runs each HTTP request under a deadline"""
+
+    def __init__(self, app, seconds: float):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline_scope(self.seconds):
+            await self.app(scope, receive, send)
@@ -0,0 +1,27 @@
+import os
+
+import firebase_admin
+from firebase_admin import credentials
+
+
+def initialize_firebase():
+    """Initialize the default Firebase app from the service account file, once"""
+    if not firebase_admin._apps:
+        try:
+            service_account_path = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH', 'firebase-service-account.json')
+
+            if not os.path.exists(service_account_path):
+                raise FileNotFoundError(f"Firebase service account file not found at {service_account_path}")
+            
+            cred = credentials.Certificate(service_account_path)
+            firebase_admin.initialize_app(cred, {
+                'facilityfix-6d27a': os.getenv('FIREBASE_PROJECT_ID')
+            })
+            print("Firebase initialized successfully with Firestore")
+        except FileNotFoundError as e:
+            print(f"ERROR: {e}")
+            print("Please download your Firebase service account key and place it in the backend directory")
+            raise Exception("Firebase service account file missing")
+        except Exception as e:
+            print(f"Firebase initialization error: {e}")
+            raise
@@ -0,0 +1,54 @@
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyService(Generic[T]):
+    """
+    Module-level stand-in for a service singleton.
+
+    The real instance is built on first attribute access (or handed in by the
+    service container at startup with ``bind``), so importing a module no
+    longer connects to Firebase as a side effect. Everything else is
+    forwarded to the instance.
+    """
+
+    def __init__(self, factory: Callable[[], T], name: Optional[str] = None):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_name", name or getattr(factory, "__name__", "service"))
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def resolve(self) -> T:
+        """Return the instance, building it if this is the first use"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def bind(self, instance: T):
+        """Use ``instance`` from now on (e.g. one the container built)"""
+        object.__setattr__(self, "_instance", instance)
+
+    def reset(self):
+        """Forget the instance; the next use builds a new one"""
+        object.__setattr__(self, "_instance", None)
+
+    @property
+    def is_resolved(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self.resolve(), name, value)
+
+    def __repr__(self) -> str:
+        state = "resolved" if self.is_resolved else "unresolved"
+        return f"<LazyService {self._name} ({state})>"
@@ -0,0 +1,112 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+
+While a call for a key is in flight, further calls with the same key wait
+for it and share its result instead of starting their own. The shared
+call runs as its own task, so a caller that is cancelled (e.g. a client
+that disconnects) does not cancel it for the others.
+
+DatabaseService coalesces its reads with one of these;
+SingleFlightMiddleware does the same for whole GET requests.
+"""
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls by key and counts how many were shared"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "coalesced": 0, "errors": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]],
+                 copier: Optional[Callable[[T], T]] = copy.deepcopy) -> T:
+        """
+        Await ``fn()``, or the call already in flight for ``key``
+
+        Args:
+            key: Identifies calls that may share a result
+            fn: Starts the call
+            copier: Applied to the result for every caller but the first,
+                so callers can modify what they get (None to share it as is)
+        """
+        loop = asyncio.get_running_loop()
+        # Tasks belong to one event loop; scripts may run several in turn
+        key = (id(loop), key)
+        with self._lock:
+            self._counters["calls"] += 1
+            task = self._calls.get(key)
+            leader = task is None
+            if leader:
+                task = self._calls[key] = loop.create_task(fn())
+                task.add_done_callback(lambda done: self._finish(key, done))
+            else:
+                self._counters["coalesced"] += 1
+        result = await asyncio.shield(task)
+        if leader or copier is None:
+            return result
+        return copier(result)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        with self._lock:
+            if self._calls.get(key) is task:
+                del self._calls[key]
+            if not task.cancelled() and task.exception() is not None:
+                self._counters["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, how many of them joined one in flight, and the resulting hit rate"""
+        with self._lock:
+            calls = self._counters["calls"]
+            return {
+                **self._counters,
+                "in_flight": len(self._calls),
+                "hit_rate": round(self._counters["coalesced"] / calls, 3) if calls else 0.0,
+            }
+
+
+# Request headers that can change a GET response, besides the path and query
+_VARY_HEADERS = (b"authorization", b"cookie", b"origin", b"accept", b"accept-encoding", b"accept-language")
+
+
+class SingleFlightMiddleware:
+    """
+    ASGI middleware that coalesces identical concurrent GET requests: the
+    first runs the route, the others receive a replay of its response.
+
+    Requests are identical when their path, query string and the headers
+    a response can depend on (credentials included) match, so responses
+    are only ever shared between requests of the same caller. GET routes
+    must therefore be free of side effects, as HTTP requires.
+    """
+
+    def __init__(self, app, flight: SingleFlight, exclude_paths: tuple = ()):
+        self.app = app
+        self.flight = flight
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        key = (scope["path"], scope.get("query_string", b""), *(headers.get(name) for name in _VARY_HEADERS))
+        messages = await self.flight.do(key, lambda: self._capture(scope, receive), copier=None)
+        for message in messages:
+            await send(message)
+
+    async def _capture(self, scope, receive) -> list:
+        messages = []
+
+        async def _send(message):
+            messages.append(message)
+
+        await self.app(scope, receive, _send)
+        return messages
@@ -0,0 +1,21 @@
+from .base import StorageBackend
+from .memory import MemoryFirestore
+from .sqlite import SQLiteFirestore
+
+# DATABASE_BACKEND name -> backend class ("firestore" is the default client)
+BACKENDS = {
+    MemoryFirestore.name: MemoryFirestore,
+    SQLiteFirestore.name: SQLiteFirestore,
+}
+
+
+def create_backend(name: str) -> StorageBackend:
+    """Build the storage backend registered under ``name``"""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown database backend {name!r}; expected 'firestore' or one of {', '.join(sorted(BACKENDS))}"
+        ) from None
+    return backend()
+
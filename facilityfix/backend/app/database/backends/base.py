@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+
+class StorageBackend(ABC):
+    """
+    A store DatabaseService can run on instead of Firestore.
+
+    DatabaseService talks to its store through the Firestore client API:
+    collection() / document() references, queries built with where,
+    order_by, start_after (and the other cursors), select, limit and
+    stream, get_all, write batches, count/sum/avg aggregations and
+    write_option(last_update_time=...) preconditions. A backend provides
+    that same surface with the same semantics, raising the same
+    google.api_core exceptions (NotFound, FailedPrecondition, ...). The
+    google-cloud-firestore clients satisfy the contract as they are;
+    subclasses of this class are the alternatives.
+
+    Reads accept Firestore's ``retry`` and ``timeout`` arguments; a local
+    backend may ignore them.
+
+    Transactions are the one difference: Firestore's are driven by the
+    ``@firestore.transactional`` decorator, a backend's by run_transaction.
+    """
+
+    # Short name used by the DATABASE_BACKEND setting
+    name: str = ""
+
+    # Whether calls may block (disk, network). DatabaseService runs calls of
+    # non-blocking backends inline rather than in a worker thread.
+    blocking: bool = True
+
+    @abstractmethod
+    def collection(self, collection_id: str):
+        """CollectionReference for a root collection"""
+
+    @abstractmethod
+    def get_all(self, references: Iterable[Any], field_paths: Optional[Iterable[str]] = None,
+                transaction: Any = None, retry: Any = None, timeout: Optional[float] = None) -> Iterator[Any]:
+        """DocumentSnapshot of each reference, missing documents included"""
+
+    @abstractmethod
+    def batch(self):
+        """WriteBatch whose commit() applies all its writes atomically"""
+
+    @abstractmethod
+    def run_transaction(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call ``fn(transaction, *args)`` and commit the writes it queued on
+        the transaction atomically, isolated from concurrent writers.
+        Reads go through ``get(transaction=...)`` / ``stream(transaction=...)``
+        and must come before the first write, as in Firestore.
+        """
+
+    @abstractmethod
+    def write_option(self, **kwargs: Any):
+        """Write precondition, e.g. write_option(last_update_time=snapshot.update_time)"""
+
+    def close(self):
+        """Release the backend's resources"""
@@ -0,0 +1,678 @@
+"""
+The Firestore client objects the stand-in backends share.
+
+References, queries, snapshots, batches and transactions only record what
+the caller asked for and hand it to their client, which stores and
+retrieves documents. The helpers here give every backend Firestore's
+semantics:
+
+- filters match only documents that have the field, range filters only
+  values of the same type, and 1 == 1.0 but True != 1
+- values sort in Firestore's cross-type order (null < booleans < numbers <
+  timestamps < strings < bytes < references < geopoints < arrays < maps)
+- queries are ordered by their order_by fields, then by the inequality
+  fields, then by document ID; documents without an order field are left out
+- start_at / start_after / end_at / end_before accept snapshots, dicts of
+  order values or lists
+- set / update / delete / create, merge, dotted field paths, the transform
+  sentinels (SERVER_TIMESTAMP, DELETE_FIELD, Increment, ArrayUnion, ...)
+  and last_update_time / exists preconditions
+- batches of at most 500 writes that apply all-or-nothing
+- naive datetimes are stored as UTC and read back timezone-aware
+
+A client provides ``_snapshot``, ``_run_query``, ``_aggregate``,
+``_commit`` and ``_list_ids``, and ``_listen`` if it supports snapshot
+listeners (see MemoryFirestore for the reference implementation).
+"""
+import copy
+import secrets
+import string
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition, InvalidArgument, NotFound
+from google.cloud.firestore_v1 import GeoPoint, ReadAfterWriteError, transforms
+from google.cloud.firestore_v1.base_aggregation import AggregationResult
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+DOCUMENT_ID = "__name__"
+
+MAX_BATCH_WRITES = 500
+
+EQUALITY_OPERATORS = {"==", "in", "array_contains", "array_contains_any"}
+RANGE_OPERATORS = {"<", "<=", ">", ">="}
+
+MISSING = object()
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+# (operation, document path, data, merge flag or write option)
+Write = Tuple[str, str, Any, Any]
+
+
+def auto_id() -> str:
+    return "".join(secrets.choice(_ID_ALPHABET) for _ in range(20))
+
+
+def utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def stored_value(value: Any) -> Any:
+    """Copy a value the way Firestore stores it"""
+    if isinstance(value, dict):
+        return {key: stored_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [stored_value(item) for item in value]
+    if isinstance(value, datetime):
+        return utc(value)
+    return copy.copy(value)
+
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def sort_key(value: Any) -> tuple:
+    """Key giving Firestore's ordering of values of any type"""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        if value != value:  # NaN sorts before every other number
+            return (2, 0, 0)
+        return (2, 1, value)
+    if isinstance(value, datetime):
+        return (3, utc(value))
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, DocumentReference):
+        return (6, value.path)
+    if isinstance(value, GeoPoint):
+        return (7, (value.latitude, value.longitude))
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(sort_key(item) for item in value))
+    if isinstance(value, dict):
+        return (9, tuple((key, sort_key(value[key])) for key in sorted(value)))
+    raise TypeError(f"Cannot store values of type {type(value).__name__}")
+
+
+def get_path(data: Dict[str, Any], field_path: str) -> Any:
+    value: Any = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+
+def project(data: Dict[str, Any], field_paths: Iterable[str]) -> Dict[str, Any]:
+    projected: Dict[str, Any] = {}
+    for field_path in field_paths:
+        value = get_path(data, field_path)
+        if value is MISSING:
+            continue
+        target = projected
+        *parents, last = field_path.split(".")
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[last] = copy.deepcopy(value)
+    return projected
+
+
+def _apply_value(target: Dict[str, Any], key: str, value: Any, now: datetime):
+    """Write ``value`` into ``target[key]``, resolving transform sentinels"""
+    current = target.get(key, MISSING)
+    if value is transforms.DELETE_FIELD:
+        target.pop(key, None)
+    elif value is transforms.SERVER_TIMESTAMP:
+        target[key] = now
+    elif isinstance(value, transforms.Increment):
+        base = current if is_number(current) else 0
+        target[key] = base + value.value
+    elif isinstance(value, transforms.Maximum):
+        target[key] = max(current, value.value) if is_number(current) else value.value
+    elif isinstance(value, transforms.Minimum):
+        target[key] = min(current, value.value) if is_number(current) else value.value
+    elif isinstance(value, transforms.ArrayUnion):
+        items = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if all(sort_key(item) != sort_key(existing) for existing in items):
+                items.append(stored_value(item))
+        target[key] = items
+    elif isinstance(value, transforms.ArrayRemove):
+        removed = {sort_key(item) for item in value.values}
+        items = list(current) if isinstance(current, list) else []
+        target[key] = [item for item in items if sort_key(item) not in removed]
+    elif isinstance(value, dict):
+        nested: Dict[str, Any] = {}
+        for nested_key, nested_value in value.items():
+            _apply_value(nested, nested_key, nested_value, now)
+        target[key] = nested
+    else:
+        target[key] = stored_value(value)
+
+
+def _merge_into(target: Dict[str, Any], data: Dict[str, Any], now: datetime):
+    """set(merge=True): nested maps are merged field by field"""
+    for key, value in data.items():
+        if isinstance(value, dict) and value and isinstance(target.get(key), dict):
+            _merge_into(target[key], value, now)
+        else:
+            _apply_value(target, key, value, now)
+
+
+def _update_paths(target: Dict[str, Any], data: Dict[str, Any], now: datetime):
+    """update(): keys are field paths and map values replace the whole map"""
+    for field_path, value in data.items():
+        *parents, last = field_path.split(".")
+        node = target
+        for part in parents:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is transforms.DELETE_FIELD:
+                    break
+                child = node[part] = {}
+            node = child
+        else:
+            _apply_value(node, last, value, now)
+
+
+def matches(data: Dict[str, Any], document_id: str, field_path: str, op: str, value: Any) -> bool:
+    actual = document_id if field_path == DOCUMENT_ID else get_path(data, field_path)
+    if actual is MISSING:
+        return False
+    if op == "==":
+        return sort_key(actual) == sort_key(value)
+    if op == "!=":
+        return actual is not None and sort_key(actual) != sort_key(value)
+    if op == "in":
+        return any(sort_key(actual) == sort_key(option) for option in value)
+    if op == "not-in":
+        return actual is not None and all(sort_key(actual) != sort_key(option) for option in value)
+    if op == "array_contains":
+        return isinstance(actual, list) and any(sort_key(item) == sort_key(value) for item in actual)
+    if op == "array_contains_any":
+        wanted = {sort_key(option) for option in value}
+        return isinstance(actual, list) and any(sort_key(item) in wanted for item in actual)
+    if op in RANGE_OPERATORS:
+        left, right = sort_key(actual), sort_key(value)
+        if left[0] != right[0]:
+            return False  # range filters only match values of the same type
+        return {"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[op]
+    raise ValueError(f"Operator string {op!r} is invalid")
+
+
+class StoredDocument:
+    __slots__ = ("data", "create_time", "update_time")
+
+    def __init__(self, data: Dict[str, Any], create_time: datetime, update_time: datetime):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+
+def apply_writes(writes: List[Write], load: Callable[[str], Optional[StoredDocument]],
+                 now: datetime) -> Dict[str, Optional[StoredDocument]]:
+    """
+    Work out the result of a batch of writes without changing anything
+
+    Args:
+        writes: The batch, in order
+        load: Returns the stored document at a path, or None
+        now: Commit time, used as update_time and for SERVER_TIMESTAMP
+
+    Returns:
+        Document path -> new document, or None where it is deleted
+
+    Raises:
+        NotFound, AlreadyExists, FailedPrecondition, InvalidArgument: as
+        Firestore would for the batch; nothing is applied
+    """
+    if len(writes) > MAX_BATCH_WRITES:
+        raise InvalidArgument(f"maximum {MAX_BATCH_WRITES} writes allowed per request")
+    staged: Dict[str, Optional[StoredDocument]] = {}
+    for operation, path, data, option in writes:
+        stored = staged[path] if path in staged else load(path)
+        if isinstance(option, WriteOption):
+            option.check(path, stored)
+
+        if operation == "delete":
+            staged[path] = None
+            continue
+        if operation == "create" and stored is not None:
+            raise AlreadyExists(f"Document already exists: {path}")
+        if operation == "update" and stored is None:
+            raise NotFound(f"No document to update: {path}")
+
+        if operation == "update":
+            new_data = copy.deepcopy(stored.data)
+            _update_paths(new_data, data, now)
+        elif operation == "set" and option:  # merge=True
+            new_data = copy.deepcopy(stored.data) if stored is not None else {}
+            _merge_into(new_data, data, now)
+        elif operation in ("set", "create"):
+            if any(value is transforms.DELETE_FIELD for value in data.values()):
+                raise ValueError("DELETE_FIELD is only allowed in update() or set(merge=True)")
+            new_data = {}
+            for key, value in data.items():
+                _apply_value(new_data, key, value, now)
+        else:
+            raise ValueError(f"Unknown write operation: {operation}")
+        create_time = stored.create_time if stored is not None else now
+        staged[path] = StoredDocument(new_data, create_time, now)
+    return staged
+
+
+def select_documents(query: "Query", documents: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Filter, order, window and limit (document_id, data) pairs as Firestore
+    would answer ``query``
+
+    Returns:
+        The matching (document_id, data) pairs in query order
+    """
+    orders = query._normalized_orders()
+    matched = []
+    for document_id, data in documents:
+        if not all(matches(data, document_id, field, op, value) for field, op, value in query._filters):
+            continue
+        keys = []
+        for field, _ in orders:
+            value = document_id if field == DOCUMENT_ID else get_path(data, field)
+            if value is MISSING:
+                break
+            keys.append(sort_key(value))
+        else:
+            matched.append((keys, document_id, data))
+
+    # Stable sorts from the last order field to the first
+    for position in reversed(range(len(orders))):
+        matched.sort(key=lambda entry: entry[0][position], reverse=orders[position][1] == DESCENDING)
+
+    if query._start is not None:
+        matched = _window(query, matched, orders, *query._start, before=True)
+    if query._end is not None:
+        matched = _window(query, matched, orders, *query._end, before=False)
+
+    if query._offset:
+        matched = matched[query._offset:]
+    if query._limit is not None:
+        matched = matched[-query._limit:] if query._limit_to_last else matched[:query._limit]
+    return [(document_id, data) for _, document_id, data in matched]
+
+
+def _window(query: "Query", matched: list, orders: List[Tuple[str, str]],
+            cursor: Any, inclusive: bool, before: bool) -> list:
+    cursor_keys = [sort_key(value) for value in query._cursor_values(cursor, orders)]
+
+    def _compare(keys: List[tuple]) -> int:
+        for position, cursor_key in enumerate(cursor_keys):
+            if keys[position] != cursor_key:
+                result = -1 if keys[position] < cursor_key else 1
+                return -result if orders[position][1] == DESCENDING else result
+        return 0
+
+    if before:
+        return [entry for entry in matched if _compare(entry[0]) > 0 or (inclusive and _compare(entry[0]) == 0)]
+    return [entry for entry in matched if _compare(entry[0]) < 0 or (inclusive and _compare(entry[0]) == 0)]
+
+
+def aggregate(aggregations: List[Tuple[str, Optional[str], str]], documents: List[Dict[str, Any]],
+              read_time: Optional[datetime] = None) -> List[AggregationResult]:
+    """count / sum / avg over the data of the documents a query matched"""
+    results = []
+    for kind, field_ref, alias in aggregations:
+        if kind == "count":
+            value: Any = len(documents)
+        else:
+            numbers = [value for value in (get_path(data, field_ref) for data in documents) if is_number(value)]
+            if kind == "sum":
+                value = sum(numbers)
+            else:
+                value = sum(numbers) / len(numbers) if numbers else None
+        results.append(AggregationResult(alias=alias, value=value, read_time=read_time))
+    return results
+
+
+class WriteResult:
+    def __init__(self, update_time: datetime):
+        self.update_time = update_time
+
+
+class WriteOption:
+    """Write precondition from a backend's write_option()"""
+
+    def __init__(self, last_update_time: Optional[datetime] = None, exists: Optional[bool] = None):
+        if last_update_time is not None and exists is not None:
+            raise TypeError("Only one of last_update_time and exists may be given")
+        if last_update_time is None and exists is None:
+            raise TypeError("write_option needs last_update_time or exists")
+        self.last_update_time = last_update_time
+        self.exists = exists
+
+    def check(self, path: str, stored: Optional[StoredDocument]):
+        if self.exists is True and stored is None:
+            raise NotFound(f"No document to update: {path}")
+        if self.exists is False and stored is not None:
+            raise AlreadyExists(f"Document already exists: {path}")
+        if self.last_update_time is not None and (
+                stored is None or stored.update_time != utc(self.last_update_time)):
+            raise FailedPrecondition(f"The document {path} was modified since the given update time")
+
+
+class DocumentSnapshot:
+    def __init__(self, reference: "DocumentReference", data: Optional[Dict[str, Any]],
+                 create_time: Optional[datetime] = None, update_time: Optional[datetime] = None,
+                 read_time: Optional[datetime] = None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = read_time
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path: str) -> Any:
+        if self._data is None:
+            return None
+        value = get_path(self._data, field_path)
+        if value is MISSING:
+            raise KeyError(f"{field_path!r} is not contained in the data")
+        return copy.deepcopy(value)
+
+
+class DocumentReference:
+    def __init__(self, client: Any, path: str):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self) -> str:
+        return self.path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self) -> "CollectionReference":
+        return CollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, collection_id: str) -> "CollectionReference":
+        return CollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction=None,
+            retry=None, timeout: Optional[float] = None) -> DocumentSnapshot:
+        if transaction is not None:
+            transaction._check_read()
+        return self._client._snapshot(self, field_paths)
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False) -> WriteResult:
+        return self._client._commit([("set", self.path, document_data, merge)])[0]
+
+    def create(self, document_data: Dict[str, Any]) -> WriteResult:
+        return self._client._commit([("create", self.path, document_data, None)])[0]
+
+    def update(self, field_updates: Dict[str, Any], option: Optional[WriteOption] = None) -> WriteResult:
+        return self._client._commit([("update", self.path, field_updates, option)])[0]
+
+    def delete(self, option: Optional[WriteOption] = None) -> datetime:
+        return self._client._commit([("delete", self.path, None, option)])[0].update_time
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, DocumentReference) and other._client is self._client and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def __repr__(self) -> str:
+        return f"<DocumentReference {self.path}>"
+
+
+class Query:
+    def __init__(self, client: Any, collection_path: str):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._orders: List[Tuple[str, str]] = []
+        self._projection: Optional[List[str]] = None
+        self._limit: Optional[int] = None
+        self._limit_to_last = False
+        self._offset = 0
+        self._start: Optional[Tuple[Any, bool]] = None  # (cursor, inclusive)
+        self._end: Optional[Tuple[Any, bool]] = None
+
+    def _copy(self) -> "Query":
+        query = copy.copy(self)
+        query._filters = list(self._filters)
+        query._orders = list(self._orders)
+        return query
+
+    # ── query building ───────────────────────────────────────────────────
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None,
+              value: Any = None, *, filter: Any = None) -> "Query":
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in EQUALITY_OPERATORS | RANGE_OPERATORS | {"!=", "not-in"}:
+            raise ValueError(f"Operator string {op_string!r} is invalid")
+        if op_string in ("in", "not-in", "array_contains_any"):
+            value = list(value)
+        query = self._copy()
+        query._filters.append((field_path, op_string, stored_value(value)))
+        return query
+
+    def order_by(self, field_path: str, direction: str = ASCENDING) -> "Query":
+        if direction not in (ASCENDING, DESCENDING):
+            raise ValueError(f"Invalid direction {direction!r}")
+        query = self._copy()
+        query._orders.append((field_path, direction))
+        return query
+
+    def select(self, field_paths: Iterable[str]) -> "Query":
+        query = self._copy()
+        query._projection = list(field_paths)
+        return query
+
+    def limit(self, count: int) -> "Query":
+        query = self._copy()
+        query._limit, query._limit_to_last = count, False
+        return query
+
+    def limit_to_last(self, count: int) -> "Query":
+        query = self._copy()
+        query._limit, query._limit_to_last = count, True
+        return query
+
+    def offset(self, num_to_skip: int) -> "Query":
+        query = self._copy()
+        query._offset = num_to_skip
+        return query
+
+    def start_at(self, document_fields_or_snapshot: Any) -> "Query":
+        return self._cursor("_start", document_fields_or_snapshot, True)
+
+    def start_after(self, document_fields_or_snapshot: Any) -> "Query":
+        return self._cursor("_start", document_fields_or_snapshot, False)
+
+    def end_at(self, document_fields_or_snapshot: Any) -> "Query":
+        return self._cursor("_end", document_fields_or_snapshot, True)
+
+    def end_before(self, document_fields_or_snapshot: Any) -> "Query":
+        return self._cursor("_end", document_fields_or_snapshot, False)
+
+    def _cursor(self, attribute: str, cursor: Any, inclusive: bool) -> "Query":
+        query = self._copy()
+        setattr(query, attribute, (cursor, inclusive))
+        return query
+
+    # ── aggregations ─────────────────────────────────────────────────────
+    def count(self, alias: Optional[str] = None) -> "AggregationQuery":
+        return AggregationQuery(self).count(alias=alias)
+
+    def sum(self, field_ref: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return AggregationQuery(self).sum(field_ref, alias=alias)
+
+    def avg(self, field_ref: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return AggregationQuery(self).avg(field_ref, alias=alias)
+
+    # ── execution ────────────────────────────────────────────────────────
+    def stream(self, transaction=None, retry=None, timeout: Optional[float] = None) -> Iterator[DocumentSnapshot]:
+        if transaction is not None:
+            transaction._check_read()
+        return iter(self._client._run_query(self))
+
+    def get(self, transaction=None, retry=None, timeout: Optional[float] = None) -> List[DocumentSnapshot]:
+        return list(self.stream(transaction=transaction))
+
+    def _normalized_orders(self) -> List[Tuple[str, str]]:
+        orders = list(self._orders)
+        if not orders:
+            inequality = sorted({field for field, op, _ in self._filters
+                                 if op not in EQUALITY_OPERATORS and field != DOCUMENT_ID})
+            orders = [(field, ASCENDING) for field in inequality]
+        if all(field != DOCUMENT_ID for field, _ in orders):
+            orders.append((DOCUMENT_ID, orders[-1][1] if orders else ASCENDING))
+        return orders
+
+    def _cursor_values(self, cursor: Any, orders: List[Tuple[str, str]]) -> List[Any]:
+        """The order values a cursor stands for (a prefix of ``orders``)"""
+        if isinstance(cursor, DocumentSnapshot):
+            data = cursor._data or {}
+            values = [cursor.id if field == DOCUMENT_ID else get_path(data, field) for field, _ in orders]
+            if MISSING in values:
+                raise ValueError("The cursor snapshot is missing a field the query orders by")
+            return values
+        if isinstance(cursor, dict):
+            values = []
+            for field, _ in orders:
+                if field not in cursor:
+                    if field == DOCUMENT_ID:
+                        break
+                    raise ValueError(f"The cursor is missing a value for order field {field!r}")
+                value = cursor[field]
+                if field == DOCUMENT_ID:
+                    value = value.id if isinstance(value, DocumentReference) else str(value).rsplit("/", 1)[-1]
+                values.append(stored_value(value))
+            return values
+        if isinstance(cursor, (list, tuple)):
+            if len(cursor) > len(orders):
+                raise ValueError("Too many cursor values for the query's order")
+            return [stored_value(value) for value in cursor]
+        raise TypeError("A cursor must be a snapshot, a dict of order values or a list")
+
+
+class CollectionReference(Query):
+    def __init__(self, client: Any, path: str):
+        super().__init__(client, path)
+        self.path = path
+
+    @property
+    def id(self) -> str:
+        return self.path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._client, f"{self.path}/{document_id or auto_id()}")
+
+    def add(self, document_data: Dict[str, Any],
+            document_id: Optional[str] = None) -> Tuple[datetime, DocumentReference]:
+        reference = self.document(document_id)
+        return reference.create(document_data).update_time, reference
+
+    def list_documents(self) -> Iterator[DocumentReference]:
+        return (self.document(document_id) for document_id in self._client._list_ids(self.path))
+
+    def on_snapshot(self, callback: Callable) -> Any:
+        """
+        Call ``callback(documents, changes, read_time)`` with the whole
+        collection now and with the changed documents after every commit
+        """
+        listen = getattr(self._client, "_listen", None)
+        if listen is None:
+            raise NotImplementedError(f"{type(self._client).__name__} does not support snapshot listeners")
+        return listen(self.path, callback)
+
+
+class AggregationQuery:
+    def __init__(self, query: Query):
+        self._query = query
+        self._aggregations: List[Tuple[str, Optional[str], str]] = []
+
+    def _add(self, kind: str, field_ref: Optional[str], alias: Optional[str]) -> "AggregationQuery":
+        self._aggregations.append((kind, field_ref, alias or f"field_{len(self._aggregations) + 1}"))
+        return self
+
+    def count(self, alias: Optional[str] = None) -> "AggregationQuery":
+        return self._add("count", None, alias)
+
+    def sum(self, field_ref: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return self._add("sum", field_ref, alias)
+
+    def avg(self, field_ref: str, alias: Optional[str] = None) -> "AggregationQuery":
+        return self._add("avg", field_ref, alias)
+
+    def get(self, transaction=None, retry=None, timeout: Optional[float] = None) -> List[List[AggregationResult]]:
+        if transaction is not None:
+            transaction._check_read()
+        return [self._query._client._aggregate(self._query, self._aggregations)]
+
+    def stream(self, transaction=None, retry=None, timeout: Optional[float] = None) -> Iterator[List[AggregationResult]]:
+        return iter(self.get(transaction=transaction))
+
+
+class WriteBatch:
+    def __init__(self, client: Any):
+        self._client = client
+        self._writes: List[Write] = []
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+    def set(self, reference: DocumentReference, document_data: Dict[str, Any], merge: bool = False):
+        self._writes.append(("set", reference.path, document_data, merge))
+        return self
+
+    def create(self, reference: DocumentReference, document_data: Dict[str, Any]):
+        self._writes.append(("create", reference.path, document_data, None))
+        return self
+
+    def update(self, reference: DocumentReference, field_updates: Dict[str, Any],
+               option: Optional[WriteOption] = None):
+        self._writes.append(("update", reference.path, field_updates, option))
+        return self
+
+    def delete(self, reference: DocumentReference, option: Optional[WriteOption] = None):
+        self._writes.append(("delete", reference.path, None, option))
+        return self
+
+    def commit(self) -> List[WriteResult]:
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+
+class Transaction(WriteBatch):
+    """Writes queued by a run_transaction callback; reads must come first"""
+
+    def _check_read(self):
+        if self._writes:
+            raise ReadAfterWriteError("Attempted read after write in a transaction.")
+
+
+def split_path(path: str) -> Tuple[str, str]:
+    """Document path -> (collection path, document ID)"""
+    collection_path, _, document_id = path.rpartition("/")
+    if not collection_path or not document_id:
+        raise ValueError(f"{path!r} is not a document path")
+    return collection_path, document_id
@@ -0,0 +1,219 @@
+"""
+In-memory stand-in for the Firestore client.
+
+MemoryFirestore keeps every document in a dict and answers the same calls
+DatabaseService makes on Firestore, with the semantics described in
+documents.py. It is meant for tests, local development and benchmarks:
+nothing is persisted and there is no security-rules or index enforcement.
+"""
+import copy
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.cloud.firestore_v1.base_aggregation import AggregationResult
+from google.cloud.firestore_v1.watch import ChangeType, DocumentChange
+
+from .base import StorageBackend
+from .documents import (
+    CollectionReference, DocumentReference, DocumentSnapshot, StoredDocument, Transaction, Write,
+    WriteBatch, WriteOption, WriteResult, aggregate, apply_writes, project, select_documents, split_path,
+)
+
+
+class MemoryWatch:
+    """Handle of a snapshot listener, like Firestore's Watch"""
+
+    def __init__(self, client: "MemoryFirestore", path: str, callback: Callable):
+        self._client = client
+        self.path = path
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        with self._client._lock:
+            listeners = self._client._listeners.get(self.path, [])
+            if self in listeners:
+                listeners.remove(self)
+            self.is_active = False
+
+
+class MemoryFirestore(StorageBackend):
+    """
+    In-memory Firestore client. Thread-safe; every call completes without
+    I/O, so DatabaseService runs it inline on the event loop.
+
+    ``operations`` counts billed-equivalent document reads, writes and
+    deletes, which benchmarks can report next to their timings.
+
+    Snapshot listeners are called synchronously, inside the commit that
+    changed their collection.
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # collection path -> document ID -> stored document
+        self._collections: Dict[str, Dict[str, StoredDocument]] = {}
+        self._last_time = datetime.fromtimestamp(0, timezone.utc)
+        self._listeners: Dict[str, List[MemoryWatch]] = {}
+        self.operations: Counter = Counter()
+
+    # ── client API ───────────────────────────────────────────────────────
+    def collection(self, collection_id: str) -> CollectionReference:
+        path = collection_id.strip("/")
+        if len(path.split("/")) % 2 == 0:
+            raise ValueError(f"{collection_id!r} is a document path, not a collection")
+        return CollectionReference(self, path)
+
+    def document(self, document_path: str) -> DocumentReference:
+        return DocumentReference(self, document_path.strip("/"))
+
+    def collections(self) -> List[CollectionReference]:
+        with self._lock:
+            return [self.collection(path) for path in sorted(self._collections)
+                    if "/" not in path and self._collections[path]]
+
+    def get_all(self, references: Iterable[DocumentReference],
+                field_paths: Optional[Iterable[str]] = None,
+                transaction: Optional[Transaction] = None, retry=None,
+                timeout: Optional[float] = None) -> Iterator[DocumentSnapshot]:
+        if transaction is not None:
+            transaction._check_read()
+        with self._lock:
+            snapshots = [self._snapshot(reference, field_paths) for reference in dict.fromkeys(references)]
+        return iter(snapshots)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self) -> Transaction:
+        return Transaction(self)
+
+    def run_transaction(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # Holding the lock for the whole callback makes transactions
+        # serialisable, which is what Firestore's retries converge to
+        with self._lock:
+            transaction = Transaction(self)
+            result = fn(transaction, *args)
+            transaction.commit()
+            return result
+
+    def write_option(self, **kwargs: Any) -> WriteOption:
+        return WriteOption(**kwargs)
+
+    def clear(self):
+        """Drop every document (between tests or benchmark rounds)"""
+        with self._lock:
+            self._collections.clear()
+            self.operations.clear()
+
+    # ── storage ──────────────────────────────────────────────────────────
+    def _now(self) -> datetime:
+        # Strictly increasing, so update times work as preconditions
+        with self._lock:
+            now = max(datetime.now(timezone.utc), self._last_time + timedelta(microseconds=1))
+            self._last_time = now
+            return now
+
+    def _load(self, path: str) -> Optional[StoredDocument]:
+        collection_path, document_id = split_path(path)
+        return self._collections.get(collection_path, {}).get(document_id)
+
+    def _list_ids(self, collection_path: str) -> List[str]:
+        with self._lock:
+            return list(self._collections.get(collection_path, {}))
+
+    def _snapshot(self, reference: DocumentReference,
+                  field_paths: Optional[Iterable[str]] = None) -> DocumentSnapshot:
+        with self._lock:
+            stored = self._load(reference.path)
+            self.operations["reads"] += 1
+            if stored is None:
+                return DocumentSnapshot(reference, None, read_time=self._last_time)
+            data = project(stored.data, field_paths) if field_paths is not None else copy.deepcopy(stored.data)
+            return DocumentSnapshot(reference, data, stored.create_time, stored.update_time, self._last_time)
+
+    def _listen(self, collection_path: str, callback: Callable) -> MemoryWatch:
+        with self._lock:
+            watch = MemoryWatch(self, collection_path, callback)
+            self._listeners.setdefault(collection_path, []).append(watch)
+            snapshots = self._collection_snapshots(collection_path)
+            changes = [DocumentChange(ChangeType.ADDED, snapshot, -1, index)
+                       for index, snapshot in enumerate(snapshots)]
+            callback(snapshots, changes, self._last_time)
+            return watch
+
+    def _collection_snapshots(self, collection_path: str) -> List[DocumentSnapshot]:
+        documents = self._collections.get(collection_path, {})
+        return [
+            DocumentSnapshot(DocumentReference(self, f"{collection_path}/{document_id}"), documents[document_id].data,
+                             documents[document_id].create_time, documents[document_id].update_time, self._last_time)
+            for document_id in sorted(documents)
+        ]
+
+    def _notify(self, changed: Dict[str, Tuple[bool, Optional[StoredDocument]]]):
+        """Tell the listeners of each collection which documents a commit changed"""
+        by_collection: Dict[str, List[DocumentChange]] = {}
+        for path, (existed, stored) in changed.items():
+            collection_path, _ = split_path(path)
+            if not self._listeners.get(collection_path):
+                continue
+            reference = DocumentReference(self, path)
+            if stored is None:
+                if not existed:
+                    continue
+                change = DocumentChange(ChangeType.REMOVED, DocumentSnapshot(reference, None, read_time=self._last_time), 0, -1)
+            else:
+                snapshot = DocumentSnapshot(reference, stored.data, stored.create_time, stored.update_time, self._last_time)
+                change = DocumentChange(ChangeType.MODIFIED if existed else ChangeType.ADDED, snapshot, -1, 0)
+            by_collection.setdefault(collection_path, []).append(change)
+        for collection_path, changes in by_collection.items():
+            snapshots = self._collection_snapshots(collection_path)
+            for watch in list(self._listeners[collection_path]):
+                watch.callback(snapshots, changes, self._last_time)
+
+    def _matching(self, query) -> List[Tuple[str, Dict[str, Any]]]:
+        documents = self._collections.get(query._collection_path, {})
+        return select_documents(query, ((document_id, stored.data) for document_id, stored in documents.items()))
+
+    def _run_query(self, query) -> List[DocumentSnapshot]:
+        with self._lock:
+            documents = self._collections.get(query._collection_path, {})
+            matched = self._matching(query)
+            self.operations["reads"] += max(1, len(matched))
+            snapshots = []
+            for document_id, data in matched:
+                stored = documents[document_id]
+                data = project(data, query._projection) if query._projection is not None else copy.deepcopy(data)
+                reference = DocumentReference(self, f"{query._collection_path}/{document_id}")
+                snapshots.append(DocumentSnapshot(reference, data, stored.create_time,
+                                                  stored.update_time, self._last_time))
+            return snapshots
+
+    def _aggregate(self, query, aggregations) -> List[AggregationResult]:
+        with self._lock:
+            matched = self._matching(query)
+            # Firestore bills one read per 1,000 index entries an aggregation scans
+            self.operations["aggregation_reads"] += 1 + len(matched) // 1000
+            return aggregate(aggregations, [data for _, data in matched], self._last_time)
+
+    def _commit(self, writes: List[Write]) -> List[WriteResult]:
+        with self._lock:
+            now = self._now()
+            changed = {}
+            for path, stored in apply_writes(writes, self._load, now).items():
+                collection_path, document_id = split_path(path)
+                changed[path] = (self._load(path) is not None, stored)
+                if stored is None:
+                    self._collections.get(collection_path, {}).pop(document_id, None)
+                else:
+                    self._collections.setdefault(collection_path, {})[document_id] = stored
+            for operation, *_ in writes:
+                self.operations["deletes" if operation == "delete" else "writes"] += 1
+            if self._listeners:
+                self._notify(changed)
+            return [WriteResult(now) for _ in writes]
@@ -0,0 +1,646 @@
+"""
+SQLite storage backend for self-contained (on-prem) deployments.
+
+Each collection ID gets a table of JSON documents keyed by (parent, id),
+where parent is the path of the document a subcollection hangs off ('' for
+root collections). Values JSON cannot hold are stored as tagged objects
+({"__ts__": "2024-01-01T00:00:00.000000Z"} for timestamps, and likewise
+bytes, references, geopoints and non-finite floats).
+
+Every field a collection indexes in COLLECTION_SCHEMAS gets two virtual
+generated columns: ``t:<field>``, the Firestore type rank of the value,
+and ``v:<field>``, a value that sorts correctly within that rank. The
+single-field and composite indexes declared there (see indexes.py) are
+created over those columns, so the queries the list endpoints run are
+answered from an index, in index order, with the limit and cursor applied
+in SQL. Filters SQL cannot evaluate exactly (array membership, values of
+exotic types) narrow the candidates in SQL and are finished in Python
+with the shared Firestore semantics in documents.py, as are orderings
+that meet bytes, references, geopoints, arrays or maps.
+
+Connections come from a small pool, the database runs in WAL mode so
+readers never wait for the writer, and statements are built from the
+query's shape only (values are parameters), so sqlite3's statement cache
+reuses the prepared statements.
+"""
+import base64
+import json
+import math
+import queue
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.cloud.firestore_v1 import GeoPoint
+from google.cloud.firestore_v1.base_aggregation import AggregationResult
+
+from ..collections import COLLECTION_SCHEMAS
+from ..indexes import LIST_ORDER, declared_indexes
+from ...core.config import settings
+from .base import StorageBackend
+from .documents import (
+    ASCENDING, DESCENDING, DOCUMENT_ID, RANGE_OPERATORS, CollectionReference, DocumentReference,
+    DocumentSnapshot, StoredDocument, Transaction, Write, WriteBatch, WriteOption, WriteResult,
+    aggregate, apply_writes, project, select_documents, split_path, utc,
+)
+
+_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+_TAGS = ("__ts__", "__bytes__", "__ref__", "__geo__", "__float__", "__map__")
+
+# Stand-ins for the non-finite floats in the v: columns
+_POSITIVE_INFINITY = "9e999"
+_NEGATIVE_INFINITY = "-9e999"
+
+
+def _timestamp(value: datetime) -> str:
+    return utc(value).strftime(_TIMESTAMP_FORMAT)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    # fromisoformat is far cheaper than strptime
+    return datetime.fromisoformat(value[:-1] + "+00:00")
+
+
+def _encode(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, str, int)):
+        return value
+    if isinstance(value, float):
+        if math.isnan(value):
+            return {"__float__": "nan"}
+        if math.isinf(value):
+            return {"__float__": "inf" if value > 0 else "-inf"}
+        return value
+    if isinstance(value, datetime):
+        return {"__ts__": _timestamp(value)}
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, DocumentReference):
+        return {"__ref__": value.path}
+    if isinstance(value, GeoPoint):
+        return {"__geo__": [value.latitude, value.longitude]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        if any(key in _TAGS for key in value):
+            # A map that could be mistaken for a tagged value
+            return {"__map__": [[key, _encode(item)] for key, item in value.items()]}
+        return {key: _encode(item) for key, item in value.items()}
+    raise TypeError(f"Cannot store values of type {type(value).__name__}")
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(_encode(data), separators=(",", ":"), ensure_ascii=False, allow_nan=False)
+
+
+def _json_path(field_path: str, tag: Optional[str] = None) -> str:
+    """JSON path of a field, escaped for use inside an SQL string literal"""
+    parts = field_path.split(".") + ([tag] if tag else [])
+    return ("$" + "".join(f'."{part}"' for part in parts)).replace("'", "''")
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _type_expression(field_path: str) -> str:
+    """SQL for the Firestore type rank of a field (NULL when it is missing)"""
+    path = _json_path(field_path)
+    tagged = " ".join(
+        f"WHEN json_type(data, '{_json_path(field_path, tag)}') IS NOT NULL THEN {rank}"
+        for tag, rank in (("__ts__", 3), ("__float__", 2), ("__bytes__", 5), ("__ref__", 6), ("__geo__", 7))
+    )
+    return (
+        f"CASE json_type(data, '{path}') "
+        "WHEN 'null' THEN 0 WHEN 'true' THEN 1 WHEN 'false' THEN 1 "
+        "WHEN 'integer' THEN 2 WHEN 'real' THEN 2 WHEN 'text' THEN 4 WHEN 'array' THEN 8 "
+        f"WHEN 'object' THEN CASE {tagged} ELSE 9 END END"
+    )
+
+
+def _value_expression(field_path: str) -> str:
+    """SQL for a value of a field that sorts correctly among values of the same rank"""
+    path = _json_path(field_path)
+    timestamp = _json_path(field_path, "__ts__")
+    special = _json_path(field_path, "__float__")
+    return (
+        f"CASE json_type(data, '{path}') "
+        "WHEN 'null' THEN 0 WHEN 'true' THEN 1 WHEN 'false' THEN 0 "
+        "WHEN 'object' THEN CASE "
+        f"WHEN json_type(data, '{timestamp}') IS NOT NULL THEN json_extract(data, '{timestamp}') "
+        f"WHEN json_type(data, '{special}') IS NOT NULL THEN "
+        f"CASE json_extract(data, '{special}') WHEN 'inf' THEN {_POSITIVE_INFINITY} ELSE {_NEGATIVE_INFINITY} END "
+        f"ELSE json_extract(data, '{path}') END "
+        f"ELSE json_extract(data, '{path}') END"
+    )
+
+
+def _sql_key(value: Any) -> Optional[Tuple[int, Any]]:
+    """(rank, value) matching the t:/v: columns, or None if SQL cannot compare it exactly"""
+    if value is None:
+        return 0, 0
+    if isinstance(value, bool):
+        return 1, int(value)
+    if isinstance(value, (int, float)):
+        return (2, value) if math.isfinite(value) else None
+    if isinstance(value, datetime):
+        return 3, _timestamp(value)
+    if isinstance(value, str):
+        return 4, value
+    return None
+
+
+def _indexed_fields(collection_id: str) -> List[str]:
+    schema = COLLECTION_SCHEMAS.get(collection_id)
+    if not schema:
+        return []
+    fields = dict.fromkeys(schema.get("indexes", []))
+    for index in declared_indexes().get(collection_id, []):
+        fields.update(dict.fromkeys(field for field, _ in index))
+    fields[LIST_ORDER[0]] = None
+    return list(fields)
+
+
+class _Plan:
+    """SQL for one query: WHERE clause, ORDER BY, and whether SQL alone is exact"""
+
+    def __init__(self, table: "_Table", query):
+        self.table = table
+        self.clauses: List[str] = ["parent = ?"]
+        self.params: List[Any] = [_parent_of(query._collection_path)]
+        self.exact = True
+        self.orders = query._normalized_orders()
+        for field, op, value in query._filters:
+            self._filter(field, op, value)
+
+        self.order_by, self.order_types = [], []
+        for field, direction in self.orders:
+            suffix = " DESC" if direction == DESCENDING else ""
+            if field == DOCUMENT_ID:
+                self.order_by.append(f"id{suffix}")
+            else:
+                self.clauses.append(f"{table.type_of(field)} IS NOT NULL")
+                self.order_types.append(table.type_of(field))
+                self.order_by += [f"{table.type_of(field)}{suffix}", f"{table.value_of(field)}{suffix}"]
+
+        # Cursors, offset and limit can only go to SQL when SQL gets the rows exactly right
+        self.window_in_sql = self.exact and not query._limit_to_last
+        if self.window_in_sql and (query._start or query._end):
+            if len({direction for _, direction in self.orders}) > 1:
+                self.window_in_sql = False
+            else:
+                for cursor, before in ((query._start, True), (query._end, False)):
+                    if cursor is not None and not self._cursor(query, *cursor, before=before):
+                        self.window_in_sql = False
+                        break
+
+    def _filter(self, field: str, op: str, value: Any):
+        if field == DOCUMENT_ID:
+            ids = [value] if op not in ("in", "not-in") else value
+            ids = [v.id if isinstance(v, DocumentReference) else v for v in ids]
+            if all(isinstance(v, str) for v in ids) and op in ("==", "!=", *RANGE_OPERATORS):
+                self.clauses.append(f"id {op} ?")
+                self.params.append(ids[0])
+            elif all(isinstance(v, str) for v in ids) and op in ("in", "not-in"):
+                negate = "NOT " if op == "not-in" else ""
+                self.clauses.append(f"id {negate}IN ({', '.join('?' * len(ids))})")
+                self.params += ids
+            else:
+                self.exact = False
+            return
+
+        type_of, value_of = self.table.type_of(field), self.table.value_of(field)
+        if op in ("==", "!=", "in", "not-in"):
+            options = [value] if op in ("==", "!=") else value
+            keys = [_sql_key(option) for option in options]
+            if None in keys or not keys:
+                self.clauses.append(f"{type_of} IS NOT NULL")
+                self.exact = False
+                return
+            one_of = " OR ".join(
+                f"{type_of} = 0" if rank == 0 else f"({type_of} = ? AND {value_of} = ?)" for rank, _ in keys
+            )
+            params = [param for rank, v in keys if rank != 0 for param in (rank, v)]
+            if op in ("==", "in"):
+                self.clauses.append(f"({one_of})")
+            else:
+                # != and not-in also leave out documents where the field is null
+                self.clauses.append(f"{type_of} IS NOT NULL AND {type_of} != 0 AND NOT ({one_of})")
+            self.params += params
+        elif op in RANGE_OPERATORS:
+            key = _sql_key(value)
+            if key is None or key[0] == 0:
+                self.clauses.append(f"{type_of} IS NOT NULL")
+                self.exact = False
+                return
+            self.clauses.append(f"{type_of} = ? AND {value_of} {op} ?")
+            self.params += list(key)
+        else:  # array_contains / array_contains_any: narrow to arrays, finish in Python
+            self.clauses.append(f"{type_of} = 8")
+            self.exact = False
+
+    def _cursor(self, query, cursor: Any, inclusive: bool, before: bool) -> bool:
+        columns, params = [], []
+        for (field, _), value in zip(self.orders, query._cursor_values(cursor, self.orders)):
+            if field == DOCUMENT_ID:
+                value = value.id if isinstance(value, DocumentReference) else value
+                if not isinstance(value, str):
+                    return False
+                columns.append("id")
+                params.append(value)
+                continue
+            key = _sql_key(value)
+            if key is None:
+                return False
+            columns += [self.table.type_of(field), self.table.value_of(field)]
+            params += list(key)
+        if not columns:
+            return True
+        descending = self.orders[0][1] == DESCENDING
+        op = ">" if before != descending else "<"
+        self.clauses.append(f"({', '.join(columns)}) {op}{'=' if inclusive else ''} ({', '.join('?' * len(params))})")
+        self.params += params
+        return True
+
+    def where(self) -> str:
+        return " AND ".join(self.clauses)
+
+
+def _parent_of(collection_path: str) -> str:
+    parent, _, _ = collection_path.rpartition("/")
+    return parent
+
+
+class _Table:
+    """SQL names for one collection ID's table"""
+
+    def __init__(self, collection_id: str):
+        self.collection_id = collection_id
+        self.name = _quote(f"docs:{collection_id}")
+        self.indexed = _indexed_fields(collection_id)
+
+    def type_of(self, field: str) -> str:
+        return _quote(f"t:{field}") if field in self.indexed else f"({_type_expression(field)})"
+
+    def value_of(self, field: str) -> str:
+        return _quote(f"v:{field}") if field in self.indexed else f"({_value_expression(field)})"
+
+    def ddl(self, existing_columns: Iterable[str]) -> List[str]:
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {self.name} ("
+            "parent TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+            "create_time TEXT NOT NULL, update_time TEXT NOT NULL, PRIMARY KEY (parent, id))"
+        ]
+        existing = set(existing_columns)
+        for field in self.indexed:
+            for prefix, expression in (("t", _type_expression(field)), ("v", _value_expression(field))):
+                if f"{prefix}:{field}" not in existing:
+                    statements.append(
+                        f"ALTER TABLE {self.name} ADD COLUMN {_quote(f'{prefix}:{field}')} "
+                        f"GENERATED ALWAYS AS ({expression}) VIRTUAL"
+                    )
+
+        # Firestore's automatic single-field indexes, then the declared composites
+        indexes = [((field, ASCENDING),) for field in self.indexed]
+        indexes += declared_indexes().get(self.collection_id, [])
+        for index in indexes:
+            columns = ["parent"]
+            for field, direction in index:
+                suffix = " DESC" if direction == DESCENDING else ""
+                columns += [f"{_quote(f't:{field}')}{suffix}", f"{_quote(f'v:{field}')}{suffix}"]
+            columns.append(f"id{' DESC' if index[-1][1] == DESCENDING else ''}")
+            name = _quote(f"idx:{self.collection_id}:" + "+".join(f"{f}:{d[0]}" for f, d in index))
+            statements.append(f"CREATE INDEX IF NOT EXISTS {name} ON {self.name} ({', '.join(columns)})")
+        return statements
+
+
+class _ConnectionPool:
+    def __init__(self, connect: Callable[[], sqlite3.Connection], size: int):
+        self._connect = connect
+        self._size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        finally:
+            if self._idle.qsize() < self._size:
+                self._idle.put(connection)
+            else:
+                connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLiteFirestore(StorageBackend):
+    """
+    Firestore client over a SQLite database file (SQLITE_PATH).
+
+    Writes are serialised through one writer at a time (BEGIN IMMEDIATE);
+    run_transaction holds that write lock for the whole callback and reads
+    through the same connection, so transactions are serialisable across
+    processes sharing the file as well as within one.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: Optional[str] = None, pool_size: Optional[int] = None):
+        self.path = path or settings.SQLITE_PATH
+        self._pool = _ConnectionPool(self._connect, max(1, pool_size or settings.SQLITE_POOL_SIZE))
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._tables: Dict[str, _Table] = {}
+        self._last_time = datetime.fromtimestamp(0, timezone.utc)
+        self._time_lock = threading.Lock()
+        self.operations: Counter = Counter()
+        with self._pool.connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=512, uri=self.path.startswith("file:"))
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        connection.execute("PRAGMA temp_store=MEMORY")
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """The running transaction's connection on this thread, else a pooled one"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            yield connection
+        else:
+            with self._pool.connection() as connection:
+                yield connection
+
+    # ── client API ───────────────────────────────────────────────────────
+    def collection(self, collection_id: str) -> CollectionReference:
+        path = collection_id.strip("/")
+        if len(path.split("/")) % 2 == 0:
+            raise ValueError(f"{collection_id!r} is a document path, not a collection")
+        return CollectionReference(self, path)
+
+    def document(self, document_path: str) -> DocumentReference:
+        return DocumentReference(self, document_path.strip("/"))
+
+    def collections(self) -> List[CollectionReference]:
+        with self._connection() as connection:
+            names = [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'docs:%' ORDER BY name")]
+            return [self.collection(name[len("docs:"):]) for name in names
+                    if connection.execute(f"SELECT 1 FROM {_quote(name)} WHERE parent = '' LIMIT 1").fetchone()]
+
+    def get_all(self, references: Iterable[DocumentReference],
+                field_paths: Optional[Iterable[str]] = None,
+                transaction: Optional[Transaction] = None, retry=None,
+                timeout: Optional[float] = None) -> Iterator[DocumentSnapshot]:
+        if transaction is not None:
+            transaction._check_read()
+        references = list(dict.fromkeys(references))
+        by_collection: Dict[str, List[DocumentReference]] = {}
+        for reference in references:
+            by_collection.setdefault(split_path(reference.path)[0], []).append(reference)
+
+        found: Dict[str, Tuple[Dict[str, Any], datetime, datetime]] = {}
+        with self._connection() as connection:
+            for collection_path, group in by_collection.items():
+                table = self._table(collection_path)
+                ids = [reference.id for reference in group]
+                rows = connection.execute(
+                    f"SELECT id, data, create_time, update_time FROM {table.name} "
+                    f"WHERE parent = ? AND id IN ({', '.join('?' * len(ids))})",
+                    [_parent_of(collection_path), *ids],
+                )
+                for document_id, data, create_time, update_time in rows:
+                    found[f"{collection_path}/{document_id}"] = (
+                        self._loads(data), _parse_timestamp(create_time), _parse_timestamp(update_time))
+        self.operations["reads"] += len(references)
+
+        snapshots = []
+        for reference in references:
+            if reference.path not in found:
+                snapshots.append(DocumentSnapshot(reference, None))
+                continue
+            data, create_time, update_time = found[reference.path]
+            if field_paths is not None:
+                data = project(data, field_paths)
+            snapshots.append(DocumentSnapshot(reference, data, create_time, update_time))
+        return iter(snapshots)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self) -> Transaction:
+        return Transaction(self)
+
+    def run_transaction(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._write_lock, self._pool.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            self._local.connection = connection
+            try:
+                transaction = Transaction(self)
+                result = fn(transaction, *args)
+                self._apply(connection, transaction._writes)
+                connection.execute("COMMIT")
+                return result
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            finally:
+                self._local.connection = None
+
+    def write_option(self, **kwargs: Any) -> WriteOption:
+        return WriteOption(**kwargs)
+
+    def close(self):
+        self._pool.close()
+
+    def clear(self):
+        """Delete every document (between tests or benchmark rounds)"""
+        with self._write_lock, self._pool.connection() as connection:
+            for (name,) in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'docs:%'").fetchall():
+                connection.execute(f"DELETE FROM {_quote(name)}")
+        self.operations.clear()
+
+    # ── storage ──────────────────────────────────────────────────────────
+    def _loads(self, data: str) -> Dict[str, Any]:
+        def _decode(value: Dict[str, Any]) -> Any:
+            if len(value) == 1:
+                tag, item = next(iter(value.items()))
+                if tag == "__ts__":
+                    return _parse_timestamp(item)
+                if tag == "__float__":
+                    return float(item)
+                if tag == "__bytes__":
+                    return base64.b64decode(item)
+                if tag == "__ref__":
+                    return self.document(item)
+                if tag == "__geo__":
+                    return GeoPoint(*item)
+                if tag == "__map__":
+                    return {key: entry for key, entry in item}
+            return value
+
+        return json.loads(data, object_hook=_decode)
+
+    def _table(self, collection_path: str) -> _Table:
+        """The table for a collection, created (or brought up to date) on first use"""
+        collection_id = collection_path.rsplit("/", 1)[-1]
+        table = self._tables.get(collection_id)
+        if table is not None:
+            return table
+        # DDL takes the write lock, which a running transaction may already hold
+        with self._write_lock:
+            table = self._tables.get(collection_id)
+            if table is None:
+                table = _Table(collection_id)
+                with self._connection() as connection:
+                    columns = [row[1] for row in connection.execute(f"PRAGMA table_xinfo({table.name})")]
+                    for statement in table.ddl(columns):
+                        connection.execute(statement)
+                self._tables[collection_id] = table
+        return table
+
+    def _now(self) -> datetime:
+        # Strictly increasing, so update times work as preconditions
+        with self._time_lock:
+            now = max(datetime.now(timezone.utc), self._last_time + timedelta(microseconds=1))
+            self._last_time = now
+            return now
+
+    def _load(self, connection: sqlite3.Connection, path: str) -> Optional[StoredDocument]:
+        collection_path, document_id = split_path(path)
+        row = connection.execute(
+            f"SELECT data, create_time, update_time FROM {self._table(collection_path).name} "
+            "WHERE parent = ? AND id = ?",
+            (_parent_of(collection_path), document_id),
+        ).fetchone()
+        if row is None:
+            return None
+        return StoredDocument(self._loads(row[0]), _parse_timestamp(row[1]), _parse_timestamp(row[2]))
+
+    def _list_ids(self, collection_path: str) -> List[str]:
+        with self._connection() as connection:
+            return [row[0] for row in connection.execute(
+                f"SELECT id FROM {self._table(collection_path).name} WHERE parent = ? ORDER BY id",
+                (_parent_of(collection_path),))]
+
+    def _snapshot(self, reference: DocumentReference,
+                  field_paths: Optional[Iterable[str]] = None) -> DocumentSnapshot:
+        with self._connection() as connection:
+            stored = self._load(connection, reference.path)
+        self.operations["reads"] += 1
+        if stored is None:
+            return DocumentSnapshot(reference, None)
+        data = project(stored.data, field_paths) if field_paths is not None else stored.data
+        return DocumentSnapshot(reference, data, stored.create_time, stored.update_time)
+
+    def _select(self, plan: _Plan, query) -> List[tuple]:
+        columns = ", ".join(["id", "data", "create_time", "update_time", *plan.order_types])
+        sql = f"SELECT {columns} FROM {plan.table.name} WHERE {plan.where()} ORDER BY {', '.join(plan.order_by)}"
+        params = list(plan.params)
+        if plan.window_in_sql and (query._limit is not None or query._offset):
+            sql += " LIMIT ? OFFSET ?"
+            params += [query._limit if query._limit is not None else -1, query._offset]
+        with self._connection() as connection:
+            return connection.execute(sql, params).fetchall()
+
+    def _matching(self, query) -> List[Tuple[str, Dict[str, Any], str, str]]:
+        plan = _Plan(self._table(query._collection_path), query)
+        rows = self._select(plan, query)
+        if plan.window_in_sql and any(rank >= 5 for row in rows for rank in row[4:]):
+            # Bytes, references, geopoints, arrays and maps do not sort
+            # correctly in SQL; if the window touches any, order in Python
+            plan.window_in_sql = False
+            rows = self._select(plan, query)
+        documents = [(document_id, self._loads(data), create_time, update_time)
+                     for document_id, data, create_time, update_time, *_ in rows]
+        if plan.window_in_sql:
+            return documents
+        times = {document_id: (create_time, update_time) for document_id, _, create_time, update_time in documents}
+        return [(document_id, data, *times[document_id])
+                for document_id, data in select_documents(query, ((d[0], d[1]) for d in documents))]
+
+    def _run_query(self, query) -> List[DocumentSnapshot]:
+        documents = self._matching(query)
+        self.operations["reads"] += max(1, len(documents))
+        snapshots = []
+        for document_id, data, create_time, update_time in documents:
+            if query._projection is not None:
+                data = project(data, query._projection)
+            reference = DocumentReference(self, f"{query._collection_path}/{document_id}")
+            snapshots.append(DocumentSnapshot(reference, data, _parse_timestamp(create_time),
+                                              _parse_timestamp(update_time)))
+        return snapshots
+
+    def _aggregate(self, query, aggregations) -> List[AggregationResult]:
+        self.operations["aggregation_reads"] += 1
+        plan = _Plan(self._table(query._collection_path), query)
+        windowed = query._start or query._end or query._limit is not None or query._offset
+        if not plan.exact or windowed:
+            return aggregate(aggregations, [data for _, data, _, _ in self._matching(query)])
+
+        expressions = []
+        for kind, field_ref, _ in aggregations:
+            if kind == "count":
+                expressions.append("COUNT(*)")
+            else:
+                number = f"CASE WHEN {plan.table.type_of(field_ref)} = 2 THEN {plan.table.value_of(field_ref)} END"
+                # SUM keeps integer totals exact; it is NULL (Firestore: 0) when nothing is numeric
+                expressions.append(f"COALESCE(SUM({number}), 0)" if kind == "sum" else f"AVG({number})")
+        with self._connection() as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(expressions)} FROM {plan.table.name} WHERE {plan.where()}", plan.params
+            ).fetchone()
+        return [AggregationResult(alias=alias, value=value, read_time=None)
+                for (_, _, alias), value in zip(aggregations, row)]
+
+    def _apply(self, connection: sqlite3.Connection, writes: List[Write]) -> datetime:
+        now = self._now()
+        staged = apply_writes(writes, lambda path: self._load(connection, path), now)
+        for path, stored in staged.items():
+            collection_path, document_id = split_path(path)
+            table = self._table(collection_path)
+            parent = _parent_of(collection_path)
+            if stored is None:
+                connection.execute(f"DELETE FROM {table.name} WHERE parent = ? AND id = ?", (parent, document_id))
+            else:
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {table.name} (parent, id, data, create_time, update_time) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (parent, document_id, _dumps(stored.data),
+                     _timestamp(stored.create_time), _timestamp(stored.update_time)),
+                )
+        for operation, *_ in writes:
+            self.operations["deletes" if operation == "delete" else "writes"] += 1
+        return now
+
+    def _commit(self, writes: List[Write]) -> List[WriteResult]:
+        if getattr(self._local, "connection", None) is not None:
+            raise RuntimeError("Commit the transaction's writes by returning from run_transaction")
+        for path in {path for _, path, _, _ in writes}:
+            self._table(split_path(path)[0])
+        with self._write_lock, self._pool.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = self._apply(connection, writes)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return [WriteResult(now) for _ in writes]
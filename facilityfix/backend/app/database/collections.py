@@ -14,9 +14,15 @@ COLLECTIONS = {
     'notifications': 'notifications',
     'status_history': 'status_history',
     'feedback': 'feedback',
+    'sequences': 'sequences',
+    'counters': 'counters',
 }
 
 # Collection Structure Documentation
+# 'indexes' are the fields list endpoints filter on; each becomes a
+# (field, created_at desc) composite index. 'composite_indexes' are extra
+# multi-field indexes. scripts/generate_firestore_indexes.py turns both into
+# firestore.indexes.json.
 COLLECTION_SCHEMAS = {
     'buildings': {
         'fields': ['building_name', 'address', 'total_floors', 'total_units'],
@@ -31,7 +37,7 @@ COLLECTION_SCHEMAS = {
     'users':{
         'fields': ['building_id', 'unit_id', 'first_name', 'last_name', 'phone_number', 'department', 'role', 'status'],
         'required': ['first_name', 'last_name', 'role'],
-        'indexes': ['role', 'building_id', 'status']
+        'indexes': ['role', 'building_id', 'status', 'department']
     },
     'user_profiles': {
         'fields': ['building_id', 'unit_id', 'first_name', 'last_name', 'phone_number', 'department', 'role', 'status'],
@@ -41,12 +47,14 @@ COLLECTION_SCHEMAS = {
     'equipment': {
         'fields': ['building_id', 'equipment_name', 'equipment_type', 'location', 'status', 'is_critical'],
         'required': ['building_id', 'equipment_name', 'equipment_type', 'location'],
-        'indexes': ['building_id', 'equipment_type', 'status']
+        'indexes': ['building_id', 'equipment_type', 'status'],
+        'composite_indexes': [['building_id', 'equipment_type'], ['building_id', 'status']]
     },
     'inventory': {
         'fields': ['building_id', 'item_name', 'department', 'classification', 'current_stock', 'reorder_level'],
         'required': ['building_id', 'item_name', 'department', 'current_stock'],
-        'indexes': ['building_id', 'department', 'current_stock']
+        'indexes': ['building_id', 'department', 'current_stock'],
+        'composite_indexes': [['building_id', 'current_stock'], ['department', 'current_stock']]
     },
     'concern_slips': {
         'fields': ['reported_by', 'unit_id', 'title', 'description', 'location', 'category', 'priority', 'status', 'resolution_type', 'evaluated_by'],
@@ -66,7 +74,8 @@ COLLECTION_SCHEMAS = {
     'maintenance_tasks': {
         'fields': ['equipment_id', 'assigned_to', 'location', 'task_description', 'status', 'scheduled_date', 'recurrence_type'],
         'required': ['assigned_to', 'location', 'task_description', 'scheduled_date'],
-        'indexes': ['status', 'assigned_to', 'scheduled_date']
+        'indexes': ['status', 'assigned_to', 'scheduled_date'],
+        'composite_indexes': [['assigned_to', 'status'], ['scheduled_date', 'status'], ['equipment_id', 'status']]
     },
     'announcements': {
         'fields': ['created_by', 'building_id', 'title', 'content', 'type', 'audience', 'is_active'],
@@ -0,0 +1,182 @@
+import random
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .collections import COLLECTIONS
+from ..core.config import settings
+
+# Collections with dashboard counters, and the fields they are broken down by
+COUNTED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    COLLECTIONS['users']: ("role", "status", "building_id"),
+    COLLECTIONS['concern_slips']: ("status",),
+    COLLECTIONS['job_services']: ("status",),
+    COLLECTIONS['work_order_permits']: ("status",),
+}
+
+# A counter document looks like {"collection": ..., "total": n, "by_status": {"pending": n}}
+COUNTER_PREFIX = "by_"
+
+
+def counter_deltas(collection: str, before: Optional[Dict[str, Any]],
+                   after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Counter changes for one document going from ``before`` to ``after``
+
+    Pass before=None for a create and after=None for a delete. Documents
+    without a value for a field are only included in the total.
+
+    Returns:
+        Nested deltas, e.g. {"by_status": {"pending": -1, "approved": 1}};
+        empty when nothing counted changed
+    """
+    fields = COUNTED_FIELDS.get(collection)
+    if not fields:
+        return {}
+
+    deltas: Dict[str, Any] = {}
+    if before is None and after is not None:
+        deltas["total"] = 1
+    elif before is not None and after is None:
+        deltas["total"] = -1
+
+    for field in fields:
+        old = before.get(field) if before is not None else None
+        new = after.get(field) if after is not None else None
+        if old == new and before is not None and after is not None:
+            continue
+        group = {}
+        if old is not None:
+            group[str(old)] = group.get(str(old), 0) - 1
+        if new is not None:
+            group[str(new)] = group.get(str(new), 0) + 1
+        group = {value: delta for value, delta in group.items() if delta}
+        if group:
+            deltas[COUNTER_PREFIX + field] = group
+    return deltas
+
+
+def merge_deltas(into: Dict[str, Any], deltas: Dict[str, Any]) -> Dict[str, Any]:
+    """Add ``deltas`` into ``into`` in place, dropping entries that cancel out"""
+    for key, value in deltas.items():
+        if isinstance(value, dict):
+            group = into.setdefault(key, {})
+            for name, delta in value.items():
+                group[name] = group.get(name, 0) + delta
+                if not group[name]:
+                    del group[name]
+            if not group:
+                del into[key]
+        else:
+            into[key] = into.get(key, 0) + value
+            if not into[key]:
+                del into[key]
+    return into
+
+
+def counter_shard_id(collection: str, shard: Optional[int] = None) -> str:
+    """Counter document ID for ``collection``; a random shard when none is given"""
+    if shard is None:
+        shard = random.randrange(max(1, settings.COUNTER_SHARDS))
+    return f"{collection}-{shard}"
+
+
+def counter_write(collection: str, deltas: Dict[str, Any]) -> Tuple[str, str, str, Dict[str, Any]]:
+    """
+    Write tuple for DatabaseService.commit_writes that applies ``deltas`` to
+    a random shard with atomic increments, so it can join the same batch as
+    the document writes it accounts for
+    """
+    return (
+        'increment',
+        COLLECTIONS['counters'],
+        counter_shard_id(collection),
+        {**deltas, "collection": collection, "updated_at": datetime.utcnow()},
+    )
+
+
+def _sum_shards(shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+    counts: Dict[str, Any] = {"total": 0}
+    for shard in shards:
+        counts["total"] += shard.get("total", 0)
+        for key, group in shard.items():
+            if key.startswith(COUNTER_PREFIX) and isinstance(group, dict):
+                merged = counts.setdefault(key, {})
+                for name, value in group.items():
+                    merged[name] = merged.get(name, 0) + value
+    # Values that were incremented and decremented back leave zero entries
+    for key, group in counts.items():
+        if isinstance(group, dict):
+            counts[key] = {name: value for name, value in group.items() if value}
+    return counts
+
+
+async def read_counts(db, collection: str) -> tuple[bool, Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Read the dashboard counters of ``collection`` in one query over its shards
+
+    Args:
+        db: DatabaseService to read through
+        collection: A collection in COUNTED_FIELDS
+
+    Returns:
+        Tuple of (success, counts, error_message). Counts look like
+        {"total": n, "by_status": {...}}, or None if the counters were never
+        initialised (run scripts/reconcile_counters.py).
+    """
+    success, shards, error = await db.query_documents(
+        COLLECTIONS['counters'], [("collection", "==", collection)]
+    )
+    if not success:
+        return False, None, error
+    if not shards:
+        return True, None, None
+    return True, _sum_shards(shards), None
+
+
+async def reconcile_counts(db, collection: str) -> tuple[bool, Dict[str, Any], Optional[str]]:
+    """
+    Rebuild the counters of ``collection`` from a scan of its documents
+
+    The exact counts go into shard 0 and every other shard is zeroed, in one
+    batch. Writes that land while the scan runs are not reflected, so run it
+    when the collection is quiet (or simply run it again).
+
+    Returns:
+        Tuple of (success, counts, error_message)
+    """
+    fields = COUNTED_FIELDS[collection]
+    total = 0
+    groups = {field: Counter() for field in fields}
+    try:
+        async for doc in db.scan_documents(collection, fields=list(fields)):
+            total += 1
+            for field in fields:
+                if doc.get(field) is not None:
+                    groups[field][str(doc[field])] += 1
+    except Exception as e:
+        return False, {}, str(e)
+
+    counts: Dict[str, Any] = {"total": total}
+    counts.update({COUNTER_PREFIX + field: dict(group) for field, group in groups.items()})
+
+    now = datetime.utcnow()
+    writes = [('set', COLLECTIONS['counters'], counter_shard_id(collection, 0),
+               {**counts, "collection": collection, "updated_at": now})]
+    writes += [
+        ('set', COLLECTIONS['counters'], counter_shard_id(collection, shard),
+         {"total": 0, "collection": collection, "updated_at": now})
+        for shard in range(1, max(1, settings.COUNTER_SHARDS))
+    ]
+    success, error = await db.commit_writes(writes)
+    if not success:
+        return False, {}, error
+    return True, counts, None
+
+
+async def load_counts(db, collection: str) -> tuple[bool, Dict[str, Any], Optional[str]]:
+    """read_counts, initialising the counters with reconcile_counts on first use"""
+    success, counts, error = await read_counts(db, collection)
+    if success and counts is None:
+        return await reconcile_counts(db, collection)
+    return success, counts or {}, error
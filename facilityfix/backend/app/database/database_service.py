@@ -1,28 +1,177 @@
-from typing import Dict, Any, List, Optional, Sequence, Tuple
-from .firestore_client import get_firestore_client
+from typing import AsyncIterator, Dict, Any, List, Optional, Sequence, Tuple
+from .backends import StorageBackend, create_backend
+from .firestore_client import get_firestore_db
 from .schema_validator import schema_validator
 from .collections import COLLECTIONS
+from .indexes import query_shape, query_shapes
+from .pagination import InvalidCursorError, decode_cursor, encode_cursor
+from .query_cache import MISS, QueryCache, query_key
+from .replica import ReplicaSet
+from .resilience import read_policy
+from ..core.config import settings
+from ..core.firebase_app import initialize_firebase
+from ..core.lazy import LazyService
+from ..core.single_flight import SingleFlight
 from datetime import datetime
+from functools import partial
+import copy
+import time
+from google.api_core.exceptions import FailedPrecondition, NotFound
+from google.cloud import firestore
 import anyio
 
+# Firestore rejects a WriteBatch with more writes than this
+MAX_BATCH_WRITES = 500
+
+# Error prefix of a batch that failed because a document to update is missing
+MISSING_DOCUMENT_ERROR = "Batch write failed, a document to update does not exist"
+
+# Below this many writes, a chunk failing on a missing document it does not
+# name is committed one write at a time instead of being bisected further
+ISOLATE_WRITES_BELOW = 4
+
+# Field path of the document ID, used as the tie-breaker in cursor ordering
+DOCUMENT_ID = "__name__"
+
+# Collections whose documents belong to a building through their building_id
+BUILDING_DATA_COLLECTIONS = ('units', 'equipment', 'inventory')
+
+def _names_document(error: str, write: tuple) -> bool:
+    """Whether a NotFound error message ends with the path of ``write``'s document"""
+    path = f"{write[1]}/{write[2]}"
+    error = error.rstrip()
+    return error.endswith(f"/{path}") or error.endswith(f" {path}")
+
+def _increments(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the numbers in a (nested) dict into Firestore Increment transforms"""
+    return {
+        key: _increments(value) if isinstance(value, dict)
+        else firestore.Increment(value) if isinstance(value, (int, float)) and not isinstance(value, bool)
+        else value
+        for key, value in data.items()
+    }
+
 class DatabaseService:
     """High-level database service with validation and error handling"""
     
-    def __init__(self):
-        self.client = get_firestore_client()
-        if not self.client:
+    def __init__(self, db=None, use_async: Optional[bool] = None):
+        """
+        Args:
+            db: Raw Firestore client or StorageBackend to use (defaults to
+                the DATABASE_BACKEND setting: the Firebase app's client, or
+                a stand-in such as the in-memory backend)
+            use_async: Whether ``db`` is an AsyncClient. Defaults to the
+                FIRESTORE_ASYNC setting when ``db`` is not given.
+        """
+        if db is None and settings.DATABASE_BACKEND != "firestore":
+            db = create_backend(settings.DATABASE_BACKEND)
+            use_async = False
+        if db is None:
+            initialize_firebase()
+            use_async = settings.FIRESTORE_ASYNC if use_async is None else use_async
+            db = get_firestore_db(use_async=use_async)
+        if db is None:
             raise Exception("Firestore client not available")
         
-    # ── helper: try to get a raw Firestore client that supports .collection() ──
-    def _raw_firestore(self):
-        for attr in ("db", "client", "_client"):
-            raw = getattr(self.client, attr, None)
-            if raw is not None and hasattr(raw, "collection"):
-                return raw
-        # Some wrappers *are* the raw client already
-        if hasattr(self.client, "collection"):
-            return self.client
-        return None
+        self.db = db
+        self.is_async = isinstance(db, firestore.AsyncClient) if use_async is None else use_async
+        # Backends that never block (in memory) are called inline, without a thread hop
+        self.run_inline = isinstance(db, StorageBackend) and not db.blocking
+        # building_id -> (expires_at, get_building_data result)
+        self._building_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # Bumped on every invalidation so in-flight reads don't cache stale data
+        self._building_generation = 0
+        # Results of query_documents / aggregate_documents, invalidated per collection on write
+        self.query_cache = QueryCache(settings.QUERY_CACHE_MAX_BYTES, settings.QUERY_CACHE_TTL_SECONDS)
+        # Listener-fed copies of REPLICA_COLLECTIONS, started by start_replicas();
+        # their change events also keep cached results of those collections current
+        self.replicas = ReplicaSet(settings.REPLICA_COLLECTIONS, settings.REPLICA_MAX_STALENESS_SECONDS,
+                                   on_change=self.query_cache.invalidate)
+        # Identical concurrent reads share one Firestore call (SINGLE_FLIGHT)
+        self.single_flight = SingleFlight()
+    
+    async def warm_up(self):
+        """
+        Open the Firestore channel ahead of the first request by reading a
+        document that does not exist (one billed read)
+        """
+        try:
+            await self._fetch(COLLECTIONS['sequences'], '_warm_up')
+        except Exception as e:
+            print(f"Warning: Firestore warm-up failed: {e}")
+    
+    def start_replicas(self):
+        """Start the snapshot listeners of the REPLICA_COLLECTIONS replicas"""
+        if not self.replicas.replicas:
+            return
+        # Listeners need the sync client; the AsyncClient cannot listen
+        client = get_firestore_db(use_async=False) if self.is_async else self.db
+        self.replicas.start(client)
+    
+    def close(self):
+        """Stop the replicas and release the client's transport"""
+        self.replicas.stop()
+        close = getattr(self.db, "close", None)
+        if close is not None:
+            close()
+    
+    async def _run(self, fn, *args, abandon_on_cancel: bool = False, **kwargs):
+        """
+        Invoke a Firestore call without blocking the event loop.
+        
+        With the AsyncClient the call is awaited natively (async streams are
+        drained into a list). With the sync client it runs in a worker thread,
+        and any stream is drained in that thread as well. Non-blocking
+        backends are called directly.
+        
+        A cancelled caller waits for the worker thread to finish, unless
+        ``abandon_on_cancel`` (for reads only: a write must not be left
+        running behind its cache invalidation).
+        """
+        if self.is_async:
+            result = fn(*args, **kwargs)
+            if hasattr(result, "__aiter__"):
+                return [item async for item in result]
+            if hasattr(result, "__await__"):
+                return await result
+            return result
+        
+        def _sync():
+            result = fn(*args, **kwargs)
+            if hasattr(result, "__next__"):
+                return list(result)
+            return result
+        
+        if self.run_inline:
+            return _sync()
+        return await anyio.to_thread.run_sync(_sync, abandon_on_cancel=abandon_on_cancel)
+    
+    async def _read(self, fn, *args, point_read: bool = False):
+        """
+        Run an idempotent read under the read policy (resilience.py): the
+        client's own retry is replaced by retries and timeouts bounded by
+        the request's deadline, and point reads may be hedged.
+        
+        A sync call that is given up on (a lost hedge, a timed-out attempt)
+        is left to finish in its worker thread; its result is discarded.
+        """
+        async def _attempt(timeout: float):
+            return await self._run(fn, *args, retry=None, timeout=timeout, abandon_on_cancel=True)
+        
+        return await read_policy.call(_attempt, point_read=point_read)
+    
+    async def _coalesce(self, kind: str, collection: str, fn, filters: List[tuple] = None, *parameters):
+        """
+        Await ``fn()``, sharing the call with identical reads already in flight
+        
+        The collection's write version is part of the key, so a read that
+        starts after a write through this service never joins one that
+        started before it. Every caller gets its own copy of the result.
+        """
+        key = query_key(kind, collection, filters, *parameters) if settings.SINGLE_FLIGHT else None
+        if key is None:
+            return await fn()
+        return await self.single_flight.do((self.query_cache.version(collection), key), fn)
     
     async def create_document(self, collection: str, data: Dict[str, Any], 
                             document_id: str = None, validate: bool = True) -> tuple[bool, str, Optional[str]]:
@@ -46,8 +195,15 @@ class DatabaseService:
                     return False, f"Validation failed: {error_msg}", error_msg
             
             # Create document with custom ID if provided
-            doc_id = self.client.create_document(collection, document_id=document_id, data=data)
-            return True, doc_id, None
+            data = {**(data or {}), 'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow()}
+            collection_ref = self.db.collection(collection)
+            doc_ref = collection_ref.document(document_id) if document_id else collection_ref.document()
+            update_time = None
+            try:
+                update_time = (await self._run(doc_ref.set, data)).update_time
+            finally:
+                self._note_write(collection, doc_ref.id, 'set', data, update_time)
+            return True, doc_ref.id, None
             
         except Exception as e:
             error_msg = f"Failed to create document in {collection}: {str(e)}"
@@ -57,11 +213,21 @@ class DatabaseService:
         """
         Get a document by ID
         
+        Served from the collection's replica when it has one that is fresh;
+        concurrent reads of the same document share one Firestore call.
+        
         Returns:
             Tuple of (success, document_data, error_message)
         """
         try:
-            doc_data = self.client.get_document(collection, document_id)
+            replica = self.replicas.serving(collection, document_id)
+            if replica is not None:
+                doc_data = replica.get(document_id)
+                if doc_data is not None:
+                    doc_data['id'] = document_id
+            else:
+                doc_data = await self._coalesce("get", collection, lambda: self._fetch(collection, document_id),
+                                                None, document_id)
             if doc_data:
                 return True, doc_data, None
             else:
@@ -71,18 +237,109 @@ class DatabaseService:
             error_msg = f"Failed to get document {document_id} from {collection}: {str(e)}"
             return False, None, error_msg
     
+    async def get_documents(self, collection: str, document_ids: Sequence[str]
+                            ) -> tuple[bool, List[Optional[Dict[str, Any]]], List[str], Optional[str]]:
+        """
+        Get many documents by ID with batched get_all calls
+        
+        IDs are de-duplicated and split into chunks of FIRESTORE_GET_ALL_CHUNK_SIZE,
+        fetched concurrently (at most FIRESTORE_BULK_CONCURRENCY at once).
+        
+        Returns:
+            Tuple of (success, documents, missing_ids, error_message).
+            documents[i] is the data (with 'id') of document_ids[i], or None
+            if that document does not exist; missing_ids lists those IDs.
+        """
+        unique_ids = list(dict.fromkeys(document_ids))
+        snapshots, error = await self._get_snapshots(collection, unique_ids)
+        if error:
+            return False, [], [], f"Failed to get documents from {collection}: {error}"
+        found = {
+            document_id: {**(snapshot.to_dict() or {}), 'id': document_id}
+            for document_id, snapshot in snapshots.items() if snapshot.exists
+        }
+        documents = [dict(found[i]) if i in found else None for i in document_ids]
+        missing_ids = [i for i in unique_ids if i not in found]
+        return True, documents, missing_ids, None
+    
+    async def get_versions(self, collection: str, document_ids: Sequence[str]
+                           ) -> tuple[bool, Dict[str, Tuple[Optional[Dict[str, Any]], Optional[datetime]]], Optional[str]]:
+        """
+        Get many documents together with their update_time, for writes that
+        must not apply if a document changed since (see commit_writes).
+        Batched like get_documents.
+        
+        Returns:
+            Tuple of (success, {document_id: (data with 'id' or None if
+            missing, update_time or None)}, error_message)
+        """
+        snapshots, error = await self._get_snapshots(collection, list(dict.fromkeys(document_ids)))
+        if error:
+            return False, {}, f"Failed to get documents from {collection}: {error}"
+        return True, {
+            document_id: ({**(snapshot.to_dict() or {}), 'id': document_id}, snapshot.update_time)
+            if snapshot.exists else (None, None)
+            for document_id, snapshot in snapshots.items()
+        }, None
+    
+    async def _get_snapshots(self, collection: str, document_ids: List[str]) -> tuple[Dict[str, Any], Optional[str]]:
+        """
+        Read snapshots with get_all, in chunks of FIRESTORE_GET_ALL_CHUNK_SIZE
+        fetched concurrently (at most FIRESTORE_BULK_CONCURRENCY at once)
+        
+        Returns:
+            Tuple of ({document_id: snapshot}, error_message of the first failed chunk)
+        """
+        chunk_size = max(1, settings.FIRESTORE_GET_ALL_CHUNK_SIZE)
+        snapshots: Dict[str, Any] = {}
+        errors: List[str] = []
+        limiter = anyio.CapacityLimiter(max(1, settings.FIRESTORE_BULK_CONCURRENCY))
+        collection_ref = self.db.collection(collection)
+        
+        async def _get_chunk(chunk: List[str]):
+            try:
+                async with limiter:
+                    results = await self._read(self.db.get_all, [collection_ref.document(i) for i in chunk])
+            except Exception as e:
+                errors.append(str(e))
+                return
+            for snapshot in results:
+                snapshots[snapshot.id] = snapshot
+        
+        async with anyio.create_task_group() as tg:
+            for start in range(0, len(document_ids), chunk_size):
+                tg.start_soon(_get_chunk, document_ids[start:start + chunk_size])
+        return snapshots, errors[0] if errors else None
+    
     async def update_document(self, collection: str, document_id: str, 
-                            data: Dict[str, Any], validate: bool = True) -> tuple[bool, Optional[str]]:
+                            data: Dict[str, Any], validate: bool = True,
+                            partial: bool = True,
+                            last_update_time: Optional[datetime] = None) -> tuple[bool, Optional[str]]:
         """
         Update a document with validation
         
+        Args:
+            collection: Collection name
+            document_id: Document ID
+            data: Fields to change
+            validate: Whether to validate against schema
+            partial: Validate only the changed fields, without reading the
+                document first. With partial=False the stored document is read,
+                merged and validated as a whole.
+            last_update_time: Only apply the update if the document has not
+                been written since this time (its snapshot's update_time)
+        
         Returns:
             Tuple of (success, error_message)
         """
         try:
-            # Get existing document for validation
-            if validate:
-                existing_doc = self.client.get_document(collection, document_id)
+            if validate and partial:
+                is_valid, error_msg = schema_validator.validate_partial(collection, data)
+                if not is_valid:
+                    return False, f"Validation failed: {error_msg}"
+            elif validate:
+                # Get existing document for validation
+                existing_doc = await self._fetch(collection, document_id)
                 if not existing_doc:
                     return False, f"Document {document_id} not found in {collection}"
                 
@@ -92,13 +349,25 @@ class DatabaseService:
                 if not is_valid:
                     return False, f"Validation failed: {error_msg}"
             
-            # Update document
-            success = self.client.update_document(collection, document_id, data)
-            if success:
-                return True, None
-            else:
-                return False, "Update operation failed"
-                
+            # Update document; update() itself fails if the document is missing
+            data = {**data, 'updated_at': datetime.utcnow()}
+            doc_ref = self.db.collection(collection).document(document_id)
+            update_time = None
+            try:
+                if last_update_time is not None:
+                    option = self.db.write_option(last_update_time=last_update_time)
+                    result = await self._run(doc_ref.update, data, option=option)
+                else:
+                    result = await self._run(doc_ref.update, data)
+                update_time = result.update_time
+            finally:
+                self._note_write(collection, document_id, 'update', data, update_time)
+            return True, None
+        
+        except NotFound:
+            return False, f"Document {document_id} not found in {collection}"
+        except FailedPrecondition:
+            return False, f"Document {document_id} in {collection} was modified since it was read"
         except Exception as e:
             error_msg = f"Failed to update document {document_id} in {collection}: {str(e)}"
             return False, error_msg
@@ -111,11 +380,12 @@ class DatabaseService:
             Tuple of (success, error_message)
         """
         try:
-            success = self.client.delete_document(collection, document_id)
-            if success:
-                return True, None
-            else:
-                return False, "Delete operation failed"
+            update_time = None
+            try:
+                update_time = await self._run(self.db.collection(collection).document(document_id).delete)
+            finally:
+                self._note_write(collection, document_id, 'delete', update_time=update_time)
+            return True, None
                 
         except Exception as e:
             error_msg = f"Failed to delete document {document_id} from {collection}: {str(e)}"
@@ -127,7 +397,10 @@ class DatabaseService:
         return await self.query_documents(collection, filters, limit)
     
     async def query_documents(self, collection: str, filters: List[tuple] = None, 
-                            limit: int = None) -> tuple[bool, List[Dict[str, Any]], Optional[str]]:
+                            limit: int = None, order_by: Optional[str] = None,
+                            descending: bool = False,
+                            cursor: Optional[str] = None,
+                            fields: Optional[List[str]] = None) -> tuple[bool, List[Dict[str, Any]], Optional[str]]:
         """
         Query documents in a collection.
 
@@ -135,85 +408,644 @@ class DatabaseService:
           - (field, value) -> uses '=='
           - (field, op, value) -> explicit operator (==, >, >=, <, <=, array_contains, in, etc.)
         limit: optional max number of docs.
+        order_by: optional field to sort by; ties are broken by document ID.
+        descending: sort direction for order_by.
+        cursor: opaque token from query_page; results start after it.
+        fields: optional projection; only these fields are fetched (select()).
         Returns: (success, [docs], error). Each doc includes '_doc_id'.
+        Raises InvalidCursorError if the cursor does not belong to this query.
+        
+        Results are served from the query cache until a write through this
+        service (or, for replicated collections, a listener event) touches
+        the collection, or QUERY_CACHE_TTL_SECONDS pass. Otherwise they come
+        from the collection's replica when it has one that is fresh, and
+        identical concurrent queries share one Firestore call.
         """
-        raw = self._raw_firestore()
-
-        # If we can reach the raw client, use it (fastest & includes doc ids)
-        if raw is not None:
-            def _run():
-                q = raw.collection(collection)
-                if filters:
-                    for f in filters:
-                        if len(f) == 3:
-                            field, op, value = f
-                        elif len(f) == 2:
-                            field, value = f
-                            op = "=="
-                        else:
-                            raise ValueError("Invalid filter tuple format")
-                        q = q.where(field, op, value)
-                if limit:
-                    q = q.limit(limit)
-                # stream() yields DocumentSnapshot; add Firestore doc id
-                out = []
-                for snap in q.stream():
-                    data = snap.to_dict() or {}
-                    data["_doc_id"] = snap.id
-                    out.append(data)
-                return out
-
+        start_after = None
+        if cursor:
+            if not order_by:
+                raise InvalidCursorError("A page cursor requires order_by")
+            start_after = decode_cursor(cursor, order_by, descending, filters)
+        
+        key = self.query_cache.key("query", collection, filters, limit, order_by, descending, cursor, fields)
+        if key is not None:
+            cached = self.query_cache.get(key)
+            if cached is not MISS:
+                return True, cached, None
+        version = self.query_cache.version(collection)
+        
+        replica = self.replicas.serving(collection)
+        if replica is not None:
+            try:
+                q = self._ordered_query(collection, filters, fields, order_by, descending, start_after, limit,
+                                        client=replica)
+                docs = self._documents(q.stream())
+            except Exception as e:
+                return False, [], f"Failed to query {collection}: {e}"
+            if key is not None:
+                self.query_cache.put(key, collection, version, docs)
+            return True, docs, None
+        
+        async def _query():
+            started = time.perf_counter()
+            error = None
             try:
-                docs = await anyio.to_thread.run_sync(_run)
+                q = self._ordered_query(collection, filters, fields, order_by, descending, start_after, limit)
+                docs = await self._stream(q)
+                if key is not None:
+                    self.query_cache.put(key, collection, version, docs)
                 return True, docs, None
             except Exception as e:
+                error = str(e)
                 return False, [], f"Failed to query {collection}: {e}"
-
-        # Fallback: use your wrapper's get_collection()
+            finally:
+                query_shapes.record(query_shape(collection, filters, order_by, descending),
+                                    time.perf_counter() - started, error)
+        
+        return await self._coalesce("query", collection, _query, filters,
+                                    limit, order_by, descending, cursor, fields)
+    
+    async def query_page(self, collection: str, filters: List[tuple] = None,
+                         order_by: str = "created_at", descending: bool = True,
+                         page_size: int = 50,
+                         cursor: Optional[str] = None,
+                         fields: Optional[List[str]] = None) -> tuple[bool, List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Fetch one page of a query in a stable order
+        
+        Args:
+            collection: Collection name
+            filters: Same filter tuples as query_documents
+            order_by: Field to sort by (documents without it are not returned)
+            descending: Sort direction, newest first by default
+            page_size: Maximum documents in the page
+            cursor: next_cursor of the previous page, or None for the first page
+            fields: Optional projection of the fields to return
+        
+        Returns:
+            Tuple of (success, docs, next_cursor, error_message). next_cursor is
+            None on the last page.
+        
+        Raises:
+            InvalidCursorError: The cursor is malformed or from another query
+        """
+        # The cursor needs the order field even if the caller did not ask for it
+        selected = fields
+        if fields and order_by not in fields:
+            selected = [*fields, order_by]
+        
+        # One extra document tells us whether another page exists
+        success, docs, error = await self.query_documents(
+            collection, filters, limit=page_size + 1,
+            order_by=order_by, descending=descending, cursor=cursor, fields=selected
+        )
+        if not success:
+            return False, [], None, error
+        
+        next_cursor = None
+        if len(docs) > page_size:
+            docs = docs[:page_size]
+            last = docs[-1]
+            next_cursor = encode_cursor(order_by, descending, filters, {
+                order_by: last.get(order_by),
+                DOCUMENT_ID: last["_doc_id"],
+            })
+        if selected is not fields:
+            for doc in docs:
+                doc.pop(order_by, None)
+        return True, docs, next_cursor, None
+    
+    async def aggregate_documents(self, collection: str, filters: List[tuple] = None,
+                                  aggregations: Sequence[Tuple[str, Optional[str]]] = (("count", None),)
+                                  ) -> tuple[bool, Dict[str, Any], Optional[str]]:
+        """
+        Run count/sum/avg aggregations on the server without reading documents
+        
+        Args:
+            collection: Collection name
+            filters: Same filter tuples as query_documents
+            aggregations: (operation, field) pairs, operation being 'count',
+                'sum' or 'avg' (field is ignored for count)
+        
+        Returns:
+            Tuple of (success, results, error_message). Results are keyed
+            'count', 'sum_<field>' and 'avg_<field>'; avg is None when no
+            document matched. Cached and coalesced like query_documents.
+        """
+        key = self.query_cache.key("aggregate", collection, filters, aggregations)
+        if key is not None:
+            cached = self.query_cache.get(key)
+            if cached is not MISS:
+                return True, cached, None
+        version = self.query_cache.version(collection)
         try:
-            documents = self.client.get_collection(collection, filters, limit)
-            # Best-effort: ensure a _doc_id field if wrapper returns an 'id'
-            normalized = []
-            for d in documents or []:
-                if isinstance(d, dict):
-                    if "_doc_id" not in d and "id" in d:
-                        d = {**d, "_doc_id": d["id"]}
-                normalized.append(d)
-            return True, normalized, None
+            q = self._build_query(collection, filters)
+            aggregation_query = None
+            for operation, field in aggregations:
+                alias = operation if operation == "count" else f"{operation}_{field}"
+                target = aggregation_query or q
+                if operation == "count":
+                    aggregation_query = target.count(alias=alias)
+                elif operation == "sum":
+                    aggregation_query = target.sum(field, alias=alias)
+                elif operation == "avg":
+                    aggregation_query = target.avg(field, alias=alias)
+                else:
+                    raise ValueError(f"Unknown aggregation: {operation}")
+            if aggregation_query is None:
+                return True, {}, None
+            
+            async def _aggregate():
+                results = {}
+                for result_set in await self._read(aggregation_query.get):
+                    for result in result_set:
+                        results[result.alias] = result.value
+                if key is not None:
+                    self.query_cache.put(key, collection, version, results)
+                return results
+            
+            return True, await self._coalesce("aggregate", collection, _aggregate, filters, aggregations), None
         except Exception as e:
-            return False, [], f"Failed to query collection {collection}: {e}"
+            return False, {}, f"Failed to aggregate {collection}: {e}"
+    
+    async def aggregate_buckets(self, collection: str, buckets: Dict[str, List[tuple]],
+                                aggregations: Sequence[Tuple[str, Optional[str]]] = (("count", None),)
+                                ) -> tuple[bool, Dict[str, Dict[str, Any]], Optional[str]]:
+        """
+        Run the same aggregations for several filter sets concurrently
+        
+        Args:
+            collection: Collection name
+            buckets: Bucket name -> filters for that bucket (None for all documents)
+            aggregations: As for aggregate_documents
+        
+        Returns:
+            Tuple of (success, {bucket: results}, error_message). Fails if any
+            bucket fails.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        errors: List[str] = []
+        limiter = anyio.CapacityLimiter(max(1, settings.FIRESTORE_AGGREGATION_CONCURRENCY))
+        
+        async def _aggregate(name: str, filters: Optional[List[tuple]]):
+            async with limiter:
+                success, values, error = await self.aggregate_documents(collection, filters, aggregations)
+            if success:
+                results[name] = values
+            else:
+                errors.append(error)
+        
+        async with anyio.create_task_group() as tg:
+            for name, filters in buckets.items():
+                tg.start_soon(_aggregate, name, filters)
+        
+        if errors:
+            return False, {}, errors[0]
+        return True, {name: results[name] for name in buckets}, None
+    
+    async def scan_documents(self, collection: str, filters: List[tuple] = None,
+                             order_by: Optional[str] = None,
+                             page_size: Optional[int] = None,
+                             fields: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over every matching document, one page at a time.
+        
+        Pages are fetched with order_by + start_after cursors, so at most
+        ``page_size`` documents are held in memory however large the
+        collection is. Documents are ordered by ``order_by`` (if given) and
+        then by document ID, which keeps the order stable across pages.
+        
+        Args:
+            collection: Collection name
+            filters: Same filter tuples as query_documents
+            order_by: Optional field to order by before the document ID
+            page_size: Documents per round trip (defaults to FIRESTORE_SCAN_PAGE_SIZE)
+            fields: Optional projection; must include ``order_by`` if one is given
+        
+        Yields:
+            Document data including '_doc_id'
+        
+        Raises:
+            Exception: A page could not be fetched
+        """
+        page_size = page_size or settings.FIRESTORE_SCAN_PAGE_SIZE
+        q = self._build_query(collection, filters, fields)
+        if order_by:
+            q = q.order_by(order_by)
+        q = q.order_by(DOCUMENT_ID).limit(page_size)
+        
+        cursor = None
+        while True:
+            page_query = q.start_after(cursor) if cursor else q
+            try:
+                page = await self._stream(page_query)
+            except Exception as e:
+                raise Exception(f"Failed to scan {collection}: {e}") from e
+            
+            for doc in page:
+                yield doc
+            if len(page) < page_size:
+                return
+            
+            last = page[-1]
+            cursor = {DOCUMENT_ID: last["_doc_id"]}
+            if order_by:
+                cursor[order_by] = last.get(order_by)
+    
+    def _build_query(self, collection: str, filters: List[tuple] = None,
+                     fields: Optional[List[str]] = None, client=None):
+        q = (client or self.db).collection(collection)
+        if fields:
+            q = q.select(fields)
+        if filters:
+            for f in filters:
+                if len(f) == 3:
+                    field, op, value = f
+                elif len(f) == 2:
+                    field, value = f
+                    op = "=="
+                else:
+                    raise ValueError("Invalid filter tuple format")
+                q = q.where(field, op, value)
+        return q
+    
+    def _ordered_query(self, collection: str, filters: Optional[List[tuple]], fields: Optional[List[str]],
+                       order_by: Optional[str], descending: bool, start_after: Optional[Dict[str, Any]],
+                       limit: Optional[int], client=None):
+        """query_documents' query: filters, order (ties broken by document ID), cursor and limit"""
+        q = self._build_query(collection, filters, fields, client)
+        if order_by:
+            direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            q = q.order_by(order_by, direction=direction).order_by(DOCUMENT_ID, direction=direction)
+        if start_after:
+            q = q.start_after(start_after)
+        if limit:
+            q = q.limit(limit)
+        return q
+    
+    async def _stream(self, q) -> List[Dict[str, Any]]:
+        """Run a query, returning each document's data with its '_doc_id'"""
+        return self._documents(await self._read(q.stream))
+    
+    @staticmethod
+    def _documents(snapshots) -> List[Dict[str, Any]]:
+        docs = []
+        for snap in snapshots:
+            data = snap.to_dict() or {}
+            data["_doc_id"] = snap.id
+            docs.append(data)
+        return docs
+    
+    async def _fetch(self, collection: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """Read one document, returning its data with 'id' or None if missing"""
+        snapshot = await self._read(self.db.collection(collection).document(document_id).get, point_read=True)
+        if not snapshot.exists:
+            return None
+        data = snapshot.to_dict() or {}
+        data['id'] = snapshot.id
+        return data
+    
+    async def create_documents(self, collection: str, documents: Sequence[Dict[str, Any]],
+                               document_ids: Optional[Sequence[Optional[str]]] = None,
+                               validate: bool = True) -> tuple[bool, List[Tuple[bool, Optional[str], Optional[str]]]]:
+        """
+        Create many documents using chunked batch writes
+        
+        Args:
+            collection: Collection name
+            documents: Document data, one dict per document
+            document_ids: Optional custom IDs aligned with ``documents``
+                (None entries auto-generate)
+            validate: Whether to validate each document against schema
+        
+        Returns:
+            Tuple of (all_succeeded, results) where results[i] is the
+            (success, document_id, error_message) of documents[i]
+        """
+        results: List[Tuple[bool, Optional[str], Optional[str]]] = []
+        writes, positions = [], []
+        collection_ref = self.db.collection(collection)
+        now = datetime.utcnow()
+        validations = schema_validator.validate_many(collection, documents) if validate else None
+        for i, data in enumerate(documents):
+            if validations is not None:
+                is_valid, error_msg = validations[i]
+                if not is_valid:
+                    results.append((False, None, f"Validation failed: {error_msg}"))
+                    continue
+            document_id = document_ids[i] if document_ids else None
+            document_id = document_id or collection_ref.document().id
+            results.append((True, document_id, None))
+            writes.append(('set', collection, document_id, {**data, 'created_at': now, 'updated_at': now}))
+            positions.append(i)
+        
+        for position, error in zip(positions, await self._apply_writes(writes)):
+            if error:
+                results[position] = (False, None, f"Failed to create document in {collection}: {error}")
+        return all(result[0] for result in results), results
+    
+    async def update_documents(self, collection: str, updates: Sequence[Tuple[str, Dict[str, Any]]],
+                               validate: bool = True) -> tuple[bool, List[Tuple[bool, Optional[str]]]]:
+        """
+        Update many documents using chunked batch writes
+        
+        Args:
+            collection: Collection name
+            updates: (document_id, changed_fields) pairs
+            validate: Whether to validate the changed fields against schema
+        
+        Returns:
+            Tuple of (all_succeeded, results) where results[i] is the
+            (success, error_message) of updates[i]. A chunk that fails because
+            a document is missing is retried one update at a time, so only
+            the updates of missing documents fail.
+        """
+        results: List[Tuple[bool, Optional[str]]] = []
+        writes, positions = [], []
+        now = datetime.utcnow()
+        for i, (document_id, data) in enumerate(updates):
+            if validate:
+                is_valid, error_msg = schema_validator.validate_partial(collection, data)
+                if not is_valid:
+                    results.append((False, f"Validation failed: {error_msg}"))
+                    continue
+            results.append((True, None))
+            writes.append(('update', collection, document_id, {**data, 'updated_at': now}))
+            positions.append(i)
+        
+        for position, error in zip(positions, await self._apply_writes(writes, isolate_missing=True)):
+            if error:
+                results[position] = (False, f"Failed to update document {updates[position][0]} in {collection}: {error}")
+        return all(result[0] for result in results), results
+    
+    async def delete_documents(self, collection: str,
+                               document_ids: Sequence[str]) -> tuple[bool, List[Tuple[bool, Optional[str]]]]:
+        """
+        Delete many documents using chunked batch writes
+        
+        Returns:
+            Tuple of (all_succeeded, results) where results[i] is the
+            (success, error_message) of document_ids[i]
+        """
+        writes = [('delete', collection, document_id, None) for document_id in document_ids]
+        results = [
+            (False, f"Failed to delete document {document_id} from {collection}: {error}") if error else (True, None)
+            for document_id, error in zip(document_ids, await self._apply_writes(writes))
+        ]
+        return all(result[0] for result in results), results
+    
+    async def commit_writes(self, writes: Sequence[Tuple[str, str, str, Optional[Dict[str, Any]]]]) -> tuple[bool, Optional[str]]:
+        """
+        Apply several writes in a single WriteBatch
+        
+        Up to MAX_BATCH_WRITES writes are atomic. Larger sets are split into
+        chunks that commit independently, like the bulk operations.
+        
+        Args:
+            writes: (operation, collection, document_id, data) tuples where
+                operation is 'set', 'update', 'delete' or 'increment'. Data is
+                written as given; timestamps are the caller's responsibility.
+                For 'increment', numbers in data (also inside nested maps) are
+                applied as atomic increments and the document is created if
+                missing. An 'update' or 'delete' may carry a fifth element,
+                the update_time the document was read at: it then only
+                applies if the document has not been written since.
+        
+        Returns:
+            Tuple of (success, error_message)
+        """
+        if len(writes) <= MAX_BATCH_WRITES:
+            return await self._commit_batch(writes)
+        
+        errors = [error for error in await self._apply_writes(writes) if error]
+        if errors:
+            return False, f"{len(errors)} of {len(writes)} writes failed: {errors[0]}"
+        return True, None
+    
+    async def _apply_writes(self, writes: Sequence[Tuple[str, str, str, Optional[Dict[str, Any]]]],
+                            isolate_missing: bool = False) -> List[Optional[str]]:
+        """
+        Commit writes in chunks of MAX_BATCH_WRITES, running at most
+        FIRESTORE_BULK_CONCURRENCY chunks at once
+        
+        Args:
+            writes: As for commit_writes
+            isolate_missing: When a chunk fails because a document to update
+                does not exist (nothing in it was applied), fail only that
+                write and commit the rest again as one batch. If the error
+                does not say which document it was, the chunk is bisected,
+                and only small remainders are committed one write at a time.
+                Only for writes that do not need to land together.
+        
+        Returns:
+            The error message of each write's chunk (or of the write itself
+            when isolated), or None where it succeeded
+        """
+        errors: List[Optional[str]] = [None] * len(writes)
+        limiter = anyio.CapacityLimiter(max(1, settings.FIRESTORE_BULK_CONCURRENCY))
+        
+        async def _commit_positions(positions: List[int]):
+            while positions:
+                async with limiter:
+                    success, error = await self._commit_batch([writes[p] for p in positions])
+                if success:
+                    return
+                if not (isolate_missing and error.startswith(MISSING_DOCUMENT_ERROR)) or len(positions) == 1:
+                    for position in positions:
+                        errors[position] = error
+                    return
+                
+                # Firestore names the missing document's path in the error
+                missing = [p for p in positions if _names_document(error, writes[p])]
+                if missing:
+                    for position in missing:
+                        errors[position] = error
+                    positions = [p for p in positions if p not in missing]
+                    continue
+                
+                if len(positions) < ISOLATE_WRITES_BELOW:
+                    parts = [[position] for position in positions]
+                else:
+                    half = len(positions) // 2
+                    parts = [positions[:half], positions[half:]]
+                async with anyio.create_task_group() as tg:
+                    for part in parts:
+                        tg.start_soon(_commit_positions, part)
+                return
+        
+        async def _commit_chunk(start: int):
+            await _commit_positions(list(range(start, min(len(writes), start + MAX_BATCH_WRITES))))
+        
+        async with anyio.create_task_group() as tg:
+            for start in range(0, len(writes), MAX_BATCH_WRITES):
+                tg.start_soon(_commit_chunk, start)
+        return errors
+    
+    async def _commit_batch(self, writes: Sequence[Tuple[str, str, str, Optional[Dict[str, Any]]]]) -> tuple[bool, Optional[str]]:
+        if not writes:
+            return True, None
+        try:
+            batch = self.db.batch()
+            for operation, collection, document_id, data, *read_at in writes:
+                doc_ref = self.db.collection(collection).document(document_id)
+                option = self.db.write_option(last_update_time=read_at[0]) if read_at and read_at[0] else None
+                if operation == 'set':
+                    batch.set(doc_ref, data)
+                elif operation == 'update':
+                    batch.update(doc_ref, data, option=option)
+                elif operation == 'delete':
+                    batch.delete(doc_ref, option=option)
+                elif operation == 'increment':
+                    batch.set(doc_ref, _increments(data), merge=True)
+                else:
+                    raise ValueError(f"Unknown write operation: {operation}")
+            results = []
+            try:
+                results = await self._run(batch.commit)
+            finally:
+                update_times = [result.update_time for result in results] or [None] * len(writes)
+                for (operation, collection, document_id, data, *_), update_time in zip(writes, update_times):
+                    self._note_write(collection, document_id, operation, data, update_time)
+            return True, None
+        except NotFound as e:
+            return False, f"{MISSING_DOCUMENT_ERROR}: {e}"
+        except FailedPrecondition as e:
+            return False, f"Batch write failed, a document was modified since it was read: {e}"
+        except Exception as e:
+            return False, f"Batch write failed: {e}"
+    
+    async def reserve_sequence_block(self, collection: str, document_id: str, size: int,
+                                     initial: Optional[int] = None) -> tuple[bool, Optional[int], Optional[str]]:
+        """
+        Atomically reserve ``size`` consecutive values from a counter document
+        
+        Args:
+            collection: Collection holding the counter documents
+            document_id: Counter document ID
+            size: Number of values to reserve
+            initial: First value to hand out if the counter does not exist yet
+            
+        Returns:
+            Tuple of (success, first_reserved_value, error_message). The value is
+            None when the counter does not exist and no ``initial`` was given.
+        """
+        ref = self.db.collection(collection).document(document_id)
+        
+        def _plan(snapshot) -> Optional[int]:
+            if snapshot.exists:
+                return (snapshot.to_dict() or {}).get("next_value", 1)
+            return initial
+        
+        def _new_state(start: int) -> Dict[str, Any]:
+            return {"next_value": start + size, "updated_at": datetime.utcnow()}
+        
+        try:
+            if self.is_async:
+                @firestore.async_transactional
+                async def _reserve_async(transaction):
+                    start = _plan(await ref.get(transaction=transaction))
+                    if start is not None:
+                        transaction.set(ref, _new_state(start))
+                    return start
+                
+                start = await _reserve_async(self.db.transaction())
+            else:
+                def _reserve(transaction):
+                    start = _plan(ref.get(transaction=transaction))
+                    if start is not None:
+                        transaction.set(ref, _new_state(start))
+                    return start
+                
+                if isinstance(self.db, StorageBackend):
+                    start = await self._run(self.db.run_transaction, _reserve)
+                else:
+                    start = await anyio.to_thread.run_sync(
+                        partial(firestore.transactional(_reserve), self.db.transaction())
+                    )
+            return True, start, None
+        except Exception as e:
+            return False, None, f"Failed to reserve values from {collection}/{document_id}: {e}"
+        finally:
+            self.query_cache.invalidate(collection)
+            self.replicas.note_write(collection, document_id)
     
     async def get_building_data(self, building_id: str) -> tuple[bool, Dict[str, Any], Optional[str]]:
         """
         Get comprehensive building data including units, equipment, etc.
         
+        The building and its related collections are read concurrently, and
+        the combined result is cached per building until a document of that
+        building is written through this service (or BUILDING_CACHE_TTL_SECONDS
+        pass, which bounds staleness from writers in other processes).
+        
         Returns:
             Tuple of (success, building_data, error_message)
         """
+        cached = self._building_cache.get(building_id)
+        if cached and cached[0] > time.monotonic():
+            return True, copy.deepcopy(cached[1]), None
+        
+        generation = self._building_generation
         try:
-            # Get building info
-            building_success, building_data, building_error = await self.get_document('buildings', building_id)
+            results: Dict[str, tuple] = {}
+            
+            async def _read(key: str, read, *args):
+                results[key] = await read(*args)
+            
+            # Get building info and related data in one concurrent round
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(_read, 'building', self.get_document, 'buildings', building_id)
+                for collection in BUILDING_DATA_COLLECTIONS:
+                    tg.start_soon(_read, collection, self.query_collection, collection,
+                                  [('building_id', '==', building_id)])
+            
+            building_success, building_data, building_error = results['building']
             if not building_success:
                 return False, {}, building_error
             
-            # Get related data
-            units_success, units, _ = await self.query_collection('units', [('building_id', '==', building_id)])
-            equipment_success, equipment, _ = await self.query_collection('equipment', [('building_id', '==', building_id)])
-            inventory_success, inventory, _ = await self.query_collection('inventory', [('building_id', '==', building_id)])
-            
             # Combine data
-            comprehensive_data = {
-                'building': building_data,
-                'units': units if units_success else [],
-                'equipment': equipment if equipment_success else [],
-                'inventory': inventory if inventory_success else []
-            }
+            comprehensive_data = {'building': building_data}
+            for collection in BUILDING_DATA_COLLECTIONS:
+                related_success, related, _ = results[collection]
+                comprehensive_data[collection] = related if related_success else []
+            
+            # Only complete results are cached, and only if nothing was written meanwhile
+            complete = all(results[collection][0] for collection in BUILDING_DATA_COLLECTIONS)
+            ttl = settings.BUILDING_CACHE_TTL_SECONDS
+            if complete and ttl > 0 and generation == self._building_generation:
+                self._building_cache[building_id] = (time.monotonic() + ttl, copy.deepcopy(comprehensive_data))
             
             return True, comprehensive_data, None
             
         except Exception as e:
             error_msg = f"Failed to get building data for {building_id}: {str(e)}"
             return False, {}, error_msg
+    
+    def _note_write(self, collection: str, document_id: str, operation: str,
+                    data: Optional[Dict[str, Any]] = None, update_time: Optional[datetime] = None):
+        """
+        Drop cached query results and building snapshots that a write may
+        have changed, and hold replica reads of the document until the
+        listener has seen the write (committed at ``update_time``, if known)
+        """
+        self.query_cache.invalidate(collection)
+        self.replicas.note_write(collection, document_id, update_time)
+        if collection == 'buildings':
+            stale = [document_id]
+        elif collection in BUILDING_DATA_COLLECTIONS:
+            building_id = (data or {}).get('building_id')
+            # Updates and deletes don't say which building the document was
+            # in (an update may even move it), so they drop every snapshot
+            stale = [building_id] if operation == 'set' and building_id else None
+        else:
+            return
+        
+        self._building_generation += 1
+        if stale is None:
+            self._building_cache.clear()
+        else:
+            for building_id in stale:
+                self._building_cache.pop(building_id, None)
 
-# Create global service instance
-database_service = DatabaseService()
+# Global service instance, created on first use or by the service container
+database_service = LazyService(DatabaseService, "database_service")
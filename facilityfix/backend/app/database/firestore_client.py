@@ -1,12 +1,13 @@
-from firebase_admin import firestore
+from firebase_admin import firestore, firestore_async
 from typing import Optional, Dict, List, Any
 import firebase_admin
 from datetime import datetime
+from ..core.firebase_app import initialize_firebase
+from .resilience import read_policy
 
 class FirestoreClient:
     def __init__(self):
-        if not firebase_admin._apps:
-            raise Exception("Firebase must be initialized before using Firestore")
+        initialize_firebase()
         self.db = firestore.client()
     
     def create_document(self, collection: str, document_id: str = None, data: Dict[str, Any] = None) -> str:
@@ -24,20 +25,20 @@ class FirestoreClient:
                 doc_ref = self.db.collection(collection).add(data)
                 return doc_ref[1].id
         except Exception as e:
-            raise Exception(f"Error creating document: {e}")
+            raise Exception(f"Error creating document: {e}") from e
     
     def get_document(self, collection: str, document_id: str) -> Optional[Dict[str, Any]]:
-        """Get a document by ID"""
+        """Get a document by ID (transient errors are retried within the request deadline)"""
         try:
             doc_ref = self.db.collection(collection).document(document_id)
-            doc = doc_ref.get()
+            doc = read_policy.call_sync(lambda timeout: doc_ref.get(retry=None, timeout=timeout))
             if doc.exists:
                 data = doc.to_dict()
                 data['id'] = doc.id
                 return data
             return None
         except Exception as e:
-            raise Exception(f"Error getting document: {e}")
+            raise Exception(f"Error getting document: {e}") from e
     
     def update_document(self, collection: str, document_id: str, data: Dict[str, Any]) -> bool:
         """Update a document"""
@@ -47,7 +48,7 @@ class FirestoreClient:
             doc_ref.update(data)
             return True
         except Exception as e:
-            raise Exception(f"Error updating document: {e}")
+            raise Exception(f"Error updating document: {e}") from e
     
     def delete_document(self, collection: str, document_id: str) -> bool:
         """Delete a document"""
@@ -56,10 +57,10 @@ class FirestoreClient:
             doc_ref.delete()
             return True
         except Exception as e:
-            raise Exception(f"Error deleting document: {e}")
+            raise Exception(f"Error deleting document: {e}") from e
     
     def get_collection(self, collection: str, filters: List[tuple] = None, limit: int = None) -> List[Dict[str, Any]]:
-        """Get documents from a collection with optional filters"""
+        """Get documents from a collection with optional filters (reads are retried like get_document)"""
         try:
             query = self.db.collection(collection)
             
@@ -70,7 +71,7 @@ class FirestoreClient:
             if limit:
                 query = query.limit(limit)
             
-            docs = query.stream()
+            docs = read_policy.call_sync(lambda timeout: list(query.stream(retry=None, timeout=timeout)))
             results = []
             for doc in docs:
                 data = doc.to_dict()
@@ -79,7 +80,7 @@ class FirestoreClient:
             
             return results
         except Exception as e:
-            raise Exception(f"Error getting collection: {e}")
+            raise Exception(f"Error getting collection: {e}") from e
 
 firestore_client = None
 
@@ -93,3 +94,14 @@ def get_firestore_client():
             print(f"Warning: Firestore client not initialized: {e}")
             return None
     return firestore_client
+
+
+def get_firestore_db(use_async: bool = False):
+    """
+    Get the raw Firestore client (AsyncClient when ``use_async``), or None
+    if Firebase has not been initialized
+    """
+    if not firebase_admin._apps:
+        print("Warning: Firestore client not initialized: Firebase must be initialized before using Firestore")
+        return None
+    return firestore_async.client() if use_async else firestore.client()
@@ -0,0 +1,195 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .collections import COLLECTION_SCHEMAS
+
+# List endpoints page through collections newest first (query_page's default
+# order), so every declared index field is paired with this sort order
+LIST_ORDER = ("created_at", "DESCENDING")
+
+# Field path of the document ID; Firestore orders by it implicitly
+DOCUMENT_ID = "__name__"
+
+EQUALITY_OPERATORS = {"==", "in", "array_contains", "array_contains_any"}
+
+# (collection, ((field, operator), ...), ((field, direction), ...))
+QueryShape = Tuple[str, Tuple[Tuple[str, str], ...], Tuple[Tuple[str, str], ...]]
+
+
+def declared_indexes(schemas: Dict[str, Dict[str, Any]] = COLLECTION_SCHEMAS
+                     ) -> Dict[str, List[Tuple[Tuple[str, str], ...]]]:
+    """
+    Composite indexes implied by the collection schemas
+
+    Each field in a schema's ``indexes`` gets (field ASC, created_at DESC),
+    which serves equality filters on any combination of those fields in
+    newest-first order (Firestore merges the indexes). ``composite_indexes``
+    entries are taken as given, ascending unless a field is written as
+    (field, direction).
+
+    Returns:
+        collection -> list of indexes, each a tuple of (field, direction)
+    """
+    indexes: Dict[str, List[Tuple[Tuple[str, str], ...]]] = {}
+    for collection, schema in schemas.items():
+        found = []
+        for field in schema.get("indexes", []):
+            if field != LIST_ORDER[0]:
+                found.append(((field, "ASCENDING"), LIST_ORDER))
+        for composite in schema.get("composite_indexes", []):
+            found.append(tuple(
+                (entry, "ASCENDING") if isinstance(entry, str) else tuple(entry)
+                for entry in composite
+            ))
+        if found:
+            indexes[collection] = list(dict.fromkeys(found))
+    return indexes
+
+
+def index_manifest(schemas: Dict[str, Dict[str, Any]] = COLLECTION_SCHEMAS) -> Dict[str, Any]:
+    """The declared indexes in firestore.indexes.json format"""
+    return {
+        "indexes": [
+            {
+                "collectionGroup": collection,
+                "queryScope": "COLLECTION",
+                "fields": [{"fieldPath": field, "order": direction} for field, direction in index],
+            }
+            for collection, collection_indexes in sorted(declared_indexes(schemas).items())
+            for index in collection_indexes
+        ],
+        "fieldOverrides": [],
+    }
+
+
+def query_shape(collection: str, filters: Optional[Iterable[tuple]] = None,
+                order_by: Optional[str] = None, descending: bool = False) -> QueryShape:
+    """Normalise a query_documents call into its shape (values dropped)"""
+    filter_shape = []
+    for f in filters or []:
+        field, op = (f[0], f[1]) if len(f) == 3 else (f[0], "==")
+        filter_shape.append((field, op))
+    orders = ((order_by, "DESCENDING" if descending else "ASCENDING"),) if order_by else ()
+    return collection, tuple(sorted(filter_shape)), orders
+
+
+def is_covered(shape: QueryShape,
+               indexes: Optional[Dict[str, List[Tuple[Tuple[str, str], ...]]]] = None) -> bool:
+    """
+    Whether a query shape can be served by single-field indexes or by the
+    declared composite indexes
+
+    This follows Firestore's rules closely enough to flag shapes worth a
+    look; Firestore's own error on a missing index remains the final word.
+    """
+    collection, filters, orders = shape
+    indexes = declared_indexes() if indexes is None else indexes
+    equality = sorted({field for field, op in filters if op in EQUALITY_OPERATORS})
+    inequality = sorted({field for field, op in filters if op not in EQUALITY_OPERATORS})
+    if len(inequality) > 1:
+        return False
+
+    # Sort order the index must provide after the equality fields
+    sort = [(field, direction) for field, direction in orders if field != DOCUMENT_ID]
+    if inequality and inequality[0] not in [field for field, _ in sort]:
+        sort.insert(0, (inequality[0], "ASCENDING"))
+
+    if not sort:
+        return True  # equality filters only: single-field indexes are merged
+    if not equality and len(sort) == 1:
+        return True  # one field: its single-field index (either direction)
+
+    def _same_order(index_sort: Sequence[Tuple[str, str]]) -> bool:
+        if [field for field, _ in index_sort] != [field for field, _ in sort]:
+            return False
+        directions = [direction for _, direction in index_sort]
+        wanted = [direction for _, direction in sort]
+        flipped = ["ASCENDING" if d == "DESCENDING" else "DESCENDING" for d in wanted]
+        return directions in (wanted, flipped)
+
+    candidates = indexes.get(collection, [])
+    # One composite index holding every equality field, then the sort fields
+    for index in candidates:
+        leading = sorted(field for field, _ in index[:len(equality)])
+        if leading == equality and _same_order(index[len(equality):]):
+            return True
+    # Or one (equality field, sort...) index per equality field, merged
+    if equality and all(
+        any(index[0][0] == field and _same_order(index[1:]) for index in candidates)
+        for field in equality
+    ):
+        return True
+    return False
+
+
+class QueryShapeRecorder:
+    """
+    Records every distinct query shape seen by DatabaseService.query_documents
+    with its call count, latency and errors, and warns once when a shape is
+    not covered by a declared index.
+    """
+
+    def __init__(self, max_shapes: int = 1000):
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes: Dict[QueryShape, Dict[str, Any]] = {}
+        self._indexes: Optional[Dict[str, List[Tuple[Tuple[str, str], ...]]]] = None
+
+    def record(self, shape: QueryShape, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    return
+                if self._indexes is None:
+                    self._indexes = declared_indexes()
+                entry = self._shapes[shape] = {
+                    "calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "covered": is_covered(shape, self._indexes), "index_error": False,
+                }
+                if not entry["covered"]:
+                    print(f"Warning: query shape not covered by a declared index: {describe_shape(shape)}")
+
+            entry["calls"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            if error:
+                entry["errors"] += 1
+                if "index" in error.lower() and not entry["index_error"]:
+                    entry["index_error"] = True
+                    print(f"Warning: query needs an index Firestore does not have: {describe_shape(shape)}")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-shape counters, uncovered and slowest shapes first"""
+        with self._lock:
+            rows = [
+                {
+                    "shape": describe_shape(shape),
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else 0.0,
+                    "max_ms": round(entry["max_ms"], 3),
+                    "covered": entry["covered"],
+                    "index_error": entry["index_error"],
+                }
+                for shape, entry in self._shapes.items()
+            ]
+        return sorted(rows, key=lambda row: (row["covered"] and not row["index_error"], -row["avg_ms"]))
+
+    def clear(self):
+        with self._lock:
+            self._shapes.clear()
+            self._indexes = None
+
+
+def describe_shape(shape: QueryShape) -> str:
+    collection, filters, orders = shape
+    parts = [collection]
+    if filters:
+        parts.append("where " + ", ".join(f"{field} {op}" for field, op in filters))
+    if orders:
+        parts.append("order by " + ", ".join(f"{field} {direction.lower()}" for field, direction in orders))
+    return " ".join(parts)
+
+
+query_shapes = QueryShapeRecorder()
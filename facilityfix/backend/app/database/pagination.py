@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Page sizes accepted by list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorError(ValueError):
+    """A page cursor is malformed or belongs to a different query"""
+
+
+def _query_key(order_by: str, descending: bool, filters: Optional[List[tuple]]) -> str:
+    """Short fingerprint of a query's ordering and filters"""
+    shape = json.dumps([order_by, descending, [list(map(str, f)) for f in filters or []]])
+    return hashlib.sha1(shape.encode()).hexdigest()[:12]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and set(value) == {"$dt"}:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(order_by: str, descending: bool, filters: Optional[List[tuple]],
+                  values: Dict[str, Any]) -> str:
+    """
+    Build an opaque page token from the last document's ordering values
+
+    Args:
+        order_by: Field the query is ordered by
+        descending: Sort direction of the query
+        filters: The query's filters, so the token only fits the same query
+        values: Cursor values keyed by field path (order field and '__name__')
+    """
+    payload = {
+        "q": _query_key(order_by, descending, filters),
+        "v": {field: _encode_value(value) for field, value in values.items()},
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, order_by: str, descending: bool,
+                  filters: Optional[List[tuple]]) -> Dict[str, Any]:
+    """
+    Turn a page token back into start_after values
+
+    Raises:
+        InvalidCursorError: The token is malformed or was issued for another query
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = {field: _decode_value(value) for field, value in payload["v"].items()}
+        query_key = payload["q"]
+    except Exception:
+        raise InvalidCursorError("Invalid page cursor")
+
+    if query_key != _query_key(order_by, descending, filters):
+        raise InvalidCursorError("Page cursor does not match this query")
+    return values
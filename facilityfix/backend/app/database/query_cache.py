@@ -0,0 +1,184 @@
+"""
+Query-result cache for DatabaseService.
+
+Results are keyed by the query (collection, normalized filters, order,
+limit, cursor, projection) and tagged with the version of the collection
+when the query started. Every write through DatabaseService bumps the
+version of the collection it touched, which drops that collection's
+entries and refuses results of queries that were in flight, so a cached
+result never hides a write made through this process. Writers elsewhere
+(other processes, the Firebase console, the legacy FirestoreClient) are
+only picked up when an entry expires after QUERY_CACHE_TTL_SECONDS.
+
+Entries are stored pickled: that measures them against the byte budget
+and gives every hit its own copy, so callers may modify what they get.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+# Returned by get() when there is no usable entry (None is a valid result)
+MISS = object()
+
+# Operators whose value is a list that Firestore treats as a set
+_LIST_OPERATORS = ("in", "not-in", "array_contains_any")
+
+
+def _freeze(value: Any) -> Hashable:
+    """
+    Hashable form of a value that keeps its type: Python has True == 1 == 1.0
+    (with equal hashes), but Firestore filters on each as a different value
+    """
+    if isinstance(value, (list, tuple)):
+        return ("list", tuple(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return ("map", tuple(sorted((key, _freeze(item)) for key, item in value.items())))
+    return (type(value).__name__, value)
+
+
+def normalize_filters(filters: Optional[List[tuple]]) -> Tuple[Tuple[str, str, Hashable], ...]:
+    """
+    Filters as sorted (field, op, value) triples, so that the same query
+    written in a different order (or with 2-tuple equality filters) shares
+    a cache key
+
+    Raises:
+        ValueError: A filter is not a 2- or 3-tuple
+    """
+    normalized = []
+    for f in filters or ():
+        if len(f) == 3:
+            field, op, value = f
+        elif len(f) == 2:
+            field, value = f
+            op = "=="
+        else:
+            raise ValueError("Invalid filter tuple format")
+        value = _freeze(value)
+        if op in _LIST_OPERATORS and value[0] == "list":
+            value = ("list", tuple(sorted(value[1], key=repr)))
+        normalized.append((field, op, value))
+    return tuple(sorted(normalized, key=repr))
+
+
+def query_key(kind: str, collection: str, filters: Optional[List[tuple]], *parameters: Any) -> Optional[Hashable]:
+    """
+    Hashable identity of a read, or None if it has none (a filter value is
+    unhashable or malformed)
+    """
+    try:
+        key = (kind, collection, normalize_filters(filters), *(_freeze(p) for p in parameters))
+        hash(key)
+    except (TypeError, ValueError):
+        return None
+    return key
+
+
+class QueryCache:
+    """
+    LRU cache of query results with a byte budget and per-collection
+    versions. Disabled when max_bytes or ttl_seconds is 0.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # key -> (collection, version, expires_at, pickled result)
+        self._entries: "OrderedDict[Hashable, Tuple[str, int, float, bytes]]" = OrderedDict()
+        self._keys_by_collection: Dict[str, Set[Hashable]] = {}
+        self._versions: Dict[str, int] = {}
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl_seconds > 0
+
+    def key(self, kind: str, collection: str, filters: Optional[List[tuple]], *parameters: Any) -> Optional[Hashable]:
+        """Cache key of a query (see query_key), or None while the cache is disabled"""
+        if not self.enabled:
+            return None
+        return query_key(kind, collection, filters, *parameters)
+
+    def version(self, collection: str) -> int:
+        """Current version of a collection; take it before running the query"""
+        return self._versions.get(collection, 0)
+
+    def get(self, key: Hashable) -> Any:
+        """The cached result (a fresh copy), or MISS"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return MISS
+            collection, version, expires_at, blob = entry
+            if version != self._versions.get(collection, 0) or expires_at <= time.monotonic():
+                self._drop(key)
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+        return pickle.loads(blob)
+
+    def put(self, key: Hashable, collection: str, version: int, result: Any):
+        """
+        Cache a result read at ``version`` of ``collection``; ignored if the
+        collection was written since, or the result exceeds the whole budget
+        """
+        try:
+            blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._versions.get(collection, 0):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (collection, version, time.monotonic() + self.ttl_seconds, blob)
+            self._keys_by_collection.setdefault(collection, set()).add(key)
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def invalidate(self, collection: str):
+        """Bump a collection's version after a write and drop its entries"""
+        with self._lock:
+            self._versions[collection] = self._versions.get(collection, 0) + 1
+            for key in list(self._keys_by_collection.get(collection, ())):
+                self._drop(key)
+            self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_collection.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, bytes used and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+    def _drop(self, key: Hashable):
+        collection, _, _, blob = self._entries.pop(key)
+        self._bytes -= len(blob)
+        keys = self._keys_by_collection.get(collection)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_collection[collection]
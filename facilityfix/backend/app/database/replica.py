@@ -0,0 +1,286 @@
+"""
+In-memory replicas of small, hot collections kept current by Firestore
+snapshot listeners.
+
+Each replicated collection (REPLICA_COLLECTIONS) is mirrored from an
+``on_snapshot`` listener into a dict of documents, with a hash index per
+field in the collection's ``indexes`` (COLLECTION_SCHEMAS). DatabaseService
+answers get_document and query_documents from the replica while it is
+fresh, and reads Firestore directly otherwise:
+
+- until the listener has delivered its first snapshot;
+- once the listener has been down for longer than
+  REPLICA_MAX_STALENESS_SECONDS (it is restarted at most that often);
+- for a document written through this process until the listener has
+  caught up with the write (and for queries, while any such write is
+  outstanding), so callers always read their own writes.
+
+Queries are evaluated with the Firestore semantics of the local storage
+backends (backends/documents.py); the indexes only narrow the candidates
+of equality and ``in`` filters.
+"""
+import copy
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from google.cloud.firestore_v1.watch import ChangeType
+
+from .backends.documents import (
+    DocumentReference, DocumentSnapshot, CollectionReference, select_documents, sort_key, project,
+)
+from .collections import COLLECTION_SCHEMAS
+
+
+class CollectionReplica:
+    """
+    Listener-fed copy of one collection. It is also a (read-only) client
+    for the local query objects, so DatabaseService builds queries on it
+    exactly as it does on Firestore.
+    """
+
+    def __init__(self, collection: str, max_staleness: float,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self.collection_id = collection
+        self.max_staleness = max_staleness
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._index_fields = list(COLLECTION_SCHEMAS.get(collection, {}).get("indexes", []))
+        # field -> value key -> document IDs; values that cannot be keyed are always candidates
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in self._index_fields}
+        self._unindexed: Dict[str, Set[str]] = {field: set() for field in self._index_fields}
+        # document ID -> (write update_time or None, give up waiting at)
+        self._pending: Dict[str, Tuple[Optional[datetime], float]] = {}
+        self._client = None
+        self._watch = None
+        self._synced = False
+        self._read_time: Optional[datetime] = None
+        self._confirmed_at = 0.0
+        self._started_at = 0.0
+        self._counters = {"hits": 0, "fallbacks": 0, "events": 0, "restarts": 0}
+
+    # ── listener ─────────────────────────────────────────────────────────
+    def start(self, client):
+        """Subscribe to the collection (a no-op if the client cannot listen)"""
+        self._client = client
+        self._subscribe()
+
+    def stop(self):
+        self._client = None
+        watch, self._watch = self._watch, None
+        if watch is not None:
+            try:
+                watch.unsubscribe()
+            except Exception as e:
+                print(f"Warning: closing the {self.collection_id} replica listener failed: {e}")
+        with self._lock:
+            self._synced = False
+
+    def _subscribe(self):
+        self._started_at = time.monotonic()
+        old, self._watch = self._watch, None
+        if old is not None:
+            try:
+                old.unsubscribe()
+            except Exception:
+                pass
+        with self._lock:
+            self._synced = False
+            self._documents.clear()
+            for field in self._index_fields:
+                self._indexes[field].clear()
+                self._unindexed[field].clear()
+        try:
+            self._watch = self._client.collection(self.collection_id).on_snapshot(self._on_snapshot)
+        except NotImplementedError as e:
+            print(f"Warning: {e}; the {self.collection_id} replica is disabled")
+            self._client = None
+        except Exception as e:
+            print(f"Warning: could not start the {self.collection_id} replica listener: {e}")
+
+    def _on_snapshot(self, documents, changes, read_time):
+        with self._lock:
+            for change in changes:
+                snapshot = change.document
+                self._unindex(snapshot.id)
+                if change.type == ChangeType.REMOVED:
+                    self._documents.pop(snapshot.id, None)
+                else:
+                    self._documents[snapshot.id] = snapshot.to_dict() or {}
+                    self._index(snapshot.id)
+                pending = self._pending.get(snapshot.id)
+                if pending is not None and (pending[0] is None or (
+                        snapshot.update_time is not None and snapshot.update_time >= pending[0])):
+                    del self._pending[snapshot.id]
+            if read_time is not None:
+                self._read_time = read_time
+                self._pending = {
+                    document_id: (update_time, expires_at)
+                    for document_id, (update_time, expires_at) in self._pending.items()
+                    if update_time is None or update_time > read_time
+                }
+            self._counters["events"] += 1
+            self._synced = True
+            self._confirmed_at = time.monotonic()
+        if changes and self.on_change is not None:
+            self.on_change(self.collection_id)
+
+    def _listening(self) -> bool:
+        watch = self._watch
+        if watch is None:
+            return False
+        active = getattr(watch, "is_active", False)
+        return active() if callable(active) else bool(active)
+
+    def _index(self, document_id: str):
+        data = self._documents[document_id]
+        for field in self._index_fields:
+            if field not in data:
+                continue
+            try:
+                self._indexes[field].setdefault(sort_key(data[field]), set()).add(document_id)
+            except TypeError:
+                self._unindexed[field].add(document_id)
+
+    def _unindex(self, document_id: str):
+        data = self._documents.get(document_id)
+        if data is None:
+            return
+        for field in self._index_fields:
+            if field not in data:
+                continue
+            self._unindexed[field].discard(document_id)
+            try:
+                key = sort_key(data[field])
+                ids = self._indexes[field].get(key)
+            except TypeError:
+                continue
+            if ids is not None:
+                ids.discard(document_id)
+                if not ids:
+                    del self._indexes[field][key]
+
+    # ── freshness ────────────────────────────────────────────────────────
+    def note_write(self, document_id: str, update_time: Optional[datetime] = None):
+        """A write went through this process; read it directly until the listener sees it"""
+        with self._lock:
+            if update_time is not None and self._read_time is not None and self._read_time >= update_time:
+                return
+            self._pending[document_id] = (update_time, time.monotonic() + self.max_staleness)
+
+    def serves(self, document_id: Optional[str] = None) -> bool:
+        """
+        Whether reads (of one document, or queries when ``document_id`` is
+        None) may come from the replica right now. Counts a fallback if not.
+        """
+        now = time.monotonic()
+        restart = False
+        with self._lock:
+            if self._listening():
+                self._confirmed_at = now
+            elif self._client is not None and now - self._started_at >= self.max_staleness:
+                restart = True
+            fresh = self._synced and now - self._confirmed_at <= self.max_staleness
+            if fresh and self._pending:
+                self._pending = {key: entry for key, entry in self._pending.items() if entry[1] > now}
+                fresh = not self._pending if document_id is None else document_id not in self._pending
+            self._counters["hits" if fresh else "fallbacks"] += 1
+        if restart:
+            self._counters["restarts"] += 1
+            self._subscribe()
+        return fresh
+
+    # ── reads ────────────────────────────────────────────────────────────
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """A copy of the document's data, or None if it does not exist"""
+        with self._lock:
+            data = self._documents.get(document_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def collection(self, collection_id: str) -> CollectionReference:
+        if collection_id != self.collection_id:
+            raise ValueError(f"This replica only holds {self.collection_id!r}")
+        return CollectionReference(self, collection_id)
+
+    def _candidates(self, filters: List[Tuple[str, str, Any]]) -> Iterable[str]:
+        candidates: Optional[Set[str]] = None
+        for field, op, value in filters:
+            if field not in self._indexes or op not in ("==", "in"):
+                continue
+            try:
+                keys = [sort_key(value)] if op == "==" else [sort_key(item) for item in value]
+            except TypeError:
+                continue
+            matched = set(self._unindexed[field])
+            for key in keys:
+                matched |= self._indexes[field].get(key, set())
+            candidates = matched if candidates is None else candidates & matched
+        return self._documents if candidates is None else candidates
+
+    def _run_query(self, query) -> List[DocumentSnapshot]:
+        with self._lock:
+            candidates = ((document_id, self._documents[document_id])
+                          for document_id in self._candidates(query._filters))
+            matched = select_documents(query, candidates)
+            snapshots = []
+            for document_id, data in matched:
+                # Snapshots copy their data in to_dict()
+                if query._projection is not None:
+                    data = project(data, query._projection)
+                reference = DocumentReference(self, f"{self.collection_id}/{document_id}")
+                snapshots.append(DocumentSnapshot(reference, data, read_time=self._read_time))
+            return snapshots
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "synced": self._synced,
+                "listening": self._listening(),
+                "seconds_since_confirmed": round(time.monotonic() - self._confirmed_at, 3) if self._synced else None,
+                "pending_writes": len(self._pending),
+                **self._counters,
+            }
+
+
+class ReplicaSet:
+    """
+    The replicas of the configured collections. ``on_change(collection)``
+    is called whenever a listener reports changed documents.
+    """
+
+    def __init__(self, collections: Iterable[str], max_staleness: float,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self.replicas = {collection: CollectionReplica(collection, max_staleness, on_change)
+                         for collection in dict.fromkeys(collections)}
+
+    def start(self, client):
+        """Start every replica's listener on a client that supports on_snapshot"""
+        if not self.replicas:
+            return
+        if client is None:
+            print("Warning: no Firestore client to listen on; replicas are disabled")
+            return
+        for replica in self.replicas.values():
+            replica.start(client)
+
+    def stop(self):
+        for replica in self.replicas.values():
+            replica.stop()
+
+    def serving(self, collection: str, document_id: Optional[str] = None) -> Optional[CollectionReplica]:
+        """The collection's replica if it can answer the read now, else None"""
+        replica = self.replicas.get(collection)
+        if replica is not None and replica.serves(document_id):
+            return replica
+        return None
+
+    def note_write(self, collection: str, document_id: str, update_time: Optional[datetime] = None):
+        replica = self.replicas.get(collection)
+        if replica is not None:
+            replica.note_write(document_id, update_time)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {collection: replica.stats() for collection, replica in self.replicas.items()}
@@ -0,0 +1,231 @@
+"""
+Retries and hedging for idempotent Firestore reads.
+
+ReadPolicy runs a read as a series of attempts:
+
+- each attempt gets a timeout of FIRESTORE_READ_TIMEOUT_SECONDS, cut down
+  to what is left of the request's deadline (app/core/deadline.py), and
+  the client's own retry is turned off so the whole budget is ours;
+- attempts failing with a transient error (UNAVAILABLE, INTERNAL,
+  RESOURCE_EXHAUSTED, ABORTED, an attempt timeout) are retried up to
+  FIRESTORE_READ_ATTEMPTS times, sleeping a random delay of up to
+  base * 2**n (full jitter, capped) in between, but never past the
+  deadline: a retry that cannot finish in time is not started;
+- point reads may be hedged (FIRESTORE_HEDGE_READS): when an attempt has
+  not answered after the p95 latency of recent point reads, a second
+  identical attempt is started and the first answer wins. Only the
+  slowest ~5% of reads are sent twice.
+
+Writes are never retried here; they are not idempotent.
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import anyio
+from google.api_core.exceptions import (
+    Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable,
+)
+
+from ..core.config import settings
+from ..core.deadline import remaining
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = (ServiceUnavailable, InternalServerError, ResourceExhausted, Aborted, DeadlineExceeded)
+
+# Point-read latencies kept for the hedging delay, and how many are needed first
+LATENCY_WINDOW = 500
+MIN_LATENCY_SAMPLES = 50
+
+
+class LatencyWindow:
+    """The most recent latencies, with a cached p95"""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._p95: Optional[float] = None
+        self._since_p95 = 0
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_p95 += 1
+            if self._since_p95 >= 20:
+                self._p95 = None
+
+    def p95(self) -> Optional[float]:
+        """None until MIN_LATENCY_SAMPLES have been seen"""
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            if self._p95 is None:
+                ordered = sorted(self._samples)
+                self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+                self._since_p95 = 0
+            return self._p95
+
+
+class ReadPolicy:
+    def __init__(self, attempts: int, attempt_timeout: float, base_delay: float, max_delay: float,
+                 hedge: bool, hedge_min_delay: float):
+        self.attempts = max(1, attempts)
+        self.attempt_timeout = attempt_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyWindow()
+        self._lock = threading.Lock()
+        self._counters = {"reads": 0, "retries": 0, "recovered": 0, "failed": 0,
+                          "deadline_exceeded": 0, "hedges": 0, "hedge_wins": 0}
+
+    @classmethod
+    def from_settings(cls) -> "ReadPolicy":
+        return cls(
+            attempts=settings.FIRESTORE_READ_ATTEMPTS,
+            attempt_timeout=settings.FIRESTORE_READ_TIMEOUT_SECONDS,
+            base_delay=settings.FIRESTORE_RETRY_BASE_DELAY_MS / 1000,
+            max_delay=settings.FIRESTORE_RETRY_MAX_DELAY_MS / 1000,
+            hedge=settings.FIRESTORE_HEDGE_READS,
+            hedge_min_delay=settings.FIRESTORE_HEDGE_MIN_DELAY_MS / 1000,
+        )
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _timeout(self) -> float:
+        """Timeout for the next attempt; raises DeadlineExceeded if no time is left"""
+        left = remaining()
+        if left is None:
+            return self.attempt_timeout
+        if left <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded("The request deadline passed before the read could start")
+        return min(self.attempt_timeout, left)
+
+    def _backoff(self, attempt: int) -> Optional[float]:
+        """Delay before retrying after ``attempt`` (0-based), or None if there is no time for it"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        left = remaining()
+        if left is not None and delay >= left:
+            return None
+        return delay
+
+    async def call(self, attempt: Callable[[float], Awaitable[T]], point_read: bool = False) -> T:
+        """
+        Run ``attempt(timeout)`` until it succeeds, a non-transient error
+        occurs, the attempts run out or the deadline would be missed
+
+        Args:
+            attempt: Performs the read with the given timeout in seconds
+            point_read: Feed the latency window, and hedge if enabled
+        """
+        self._count("reads")
+        for n in range(self.attempts):
+            timeout = self._timeout()
+            try:
+                if point_read and self.hedge:
+                    result = await self._hedged(attempt, timeout)
+                else:
+                    result = await self._timed(attempt, timeout, point_read)
+            except RETRYABLE_ERRORS:
+                delay = self._backoff(n) if n + 1 < self.attempts else None
+                if delay is None:
+                    self._count("failed")
+                    raise
+                self._count("retries")
+                await anyio.sleep(delay)
+                continue
+            if n:
+                self._count("recovered")
+            return result
+        raise AssertionError("unreachable")
+
+    def call_sync(self, attempt: Callable[[float], T]) -> T:
+        """call() for blocking code (the legacy FirestoreClient)"""
+        self._count("reads")
+        for n in range(self.attempts):
+            timeout = self._timeout()
+            try:
+                result = attempt(timeout)
+            except RETRYABLE_ERRORS:
+                delay = self._backoff(n) if n + 1 < self.attempts else None
+                if delay is None:
+                    self._count("failed")
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            if n:
+                self._count("recovered")
+            return result
+        raise AssertionError("unreachable")
+
+    async def _timed(self, attempt: Callable[[float], Awaitable[T]], timeout: float, record: bool) -> T:
+        started = time.monotonic()
+        result = await attempt(timeout)
+        if record:
+            self.latency.add(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, attempt: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        p95 = self.latency.p95()
+        if p95 is None:
+            return await self._timed(attempt, timeout, True)
+        delay = max(self.hedge_min_delay, p95)
+
+        outcome: Dict[str, Any] = {}
+        finished = anyio.Event()
+        running = 0
+
+        async def _attempt(hedge: bool):
+            nonlocal running
+            try:
+                result = await self._timed(attempt, timeout, True)
+            except Exception as e:
+                outcome.setdefault("error", e)
+                running -= 1
+                if running == 0:
+                    finished.set()
+                return
+            if "result" not in outcome:
+                outcome["result"] = result
+                if hedge:
+                    self._count("hedge_wins")
+            finished.set()
+
+        async with anyio.create_task_group() as tg:
+            running = 1
+            tg.start_soon(_attempt, False)
+            with anyio.move_on_after(delay):
+                await finished.wait()
+            if not finished.is_set() and delay < timeout:
+                running += 1
+                self._count("hedges")
+                tg.start_soon(_attempt, True)
+            await finished.wait()
+            # The loser is abandoned; its result (or error) is discarded
+            tg.cancel_scope.cancel()
+
+        if "result" in outcome:
+            return outcome["result"]
+        raise outcome["error"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        p95 = self.latency.p95()
+        return {
+            **counters,
+            "hedging": self.hedge,
+            "point_read_p95_ms": round(p95 * 1000, 3) if p95 is not None else None,
+        }
+
+
+# Shared by DatabaseService and the legacy FirestoreClient
+read_policy = ReadPolicy.from_settings()
@@ -1,11 +1,46 @@
-from typing import Dict, Any, Optional, List
-from pydantic import ValidationError
+import copy
+from typing import Annotated, Dict, Any, Optional, List, Sequence, Tuple, Type
+from typing_extensions import NotRequired, TypedDict
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from app.models.database_models import (
     Building, Unit, UserProfile, Equipment, Inventory,
     ConcernSlip, JobService, WorkOrderPermit, MaintenanceTask, Announcement,
-    StatusHistory, Feedback
+    StatusHistory, Feedback, Notification
 )
 
+# Fields the service sets itself; never required from callers
+_SERVICE_FIELDS = ('id', 'created_at', 'updated_at')
+
+
+def _annotation(field_info) -> Any:
+    """A field's type with its Field() constraints (ge/le etc.), which live in the metadata"""
+    if field_info.metadata:
+        return Annotated[(field_info.annotation, *field_info.metadata)]
+    return field_info.annotation
+
+
+def _document_type(model_class: Type[BaseModel]) -> Any:
+    """
+    What documents are validated as: a TypedDict with the model's fields
+    when that validates the same (no validators or config on the model),
+    which checks a dict without building a model instance; else the model.
+    """
+    decorators = model_class.__pydantic_decorators__
+    if model_class.model_config or decorators.validators or decorators.field_validators \
+            or decorators.root_validators or decorators.model_validators:
+        return model_class
+    fields = {
+        name: _annotation(field_info) if field_info.is_required() else NotRequired[_annotation(field_info)]
+        for name, field_info in model_class.model_fields.items()
+    }
+    return TypedDict(f"{model_class.__name__}Document", fields)
+
+
+def _format_errors(errors: List[Dict[str, Any]], skip: int = 0) -> str:
+    """'field -> subfield: message' per error, without the first ``skip`` parts of each location"""
+    return "; ".join(f"{' -> '.join(str(x) for x in error['loc'][skip:])}: {error['msg']}" for error in errors)
+
+
 class SchemaValidator:
     """Validates Firestore documents against defined schemas"""
     
@@ -21,8 +56,28 @@ class SchemaValidator:
         'maintenance_tasks': MaintenanceTask,
         'announcements': Announcement,
         'status_history': StatusHistory,
-        'feedback': Feedback
+        'feedback': Feedback,
+        'notifications': Notification
+    }
+    
+    # Compiled at import, once per collection: validators for one document
+    # and for a list of them, required fields and the JSON schema
+    _document_types = {collection: _document_type(model) for collection, model in MODEL_MAPPING.items()}
+    _adapters: Dict[str, TypeAdapter] = {collection: TypeAdapter(t) for collection, t in _document_types.items()}
+    _list_adapters: Dict[str, TypeAdapter] = {
+        collection: TypeAdapter(List[t]) for collection, t in _document_types.items()
     }
+    _required_fields: Dict[str, Tuple[str, ...]] = {
+        collection: tuple(name for name, field_info in model.model_fields.items()
+                          if field_info.is_required() and name not in _SERVICE_FIELDS)
+        for collection, model in MODEL_MAPPING.items()
+    }
+    _schemas: Dict[str, Dict[str, Any]] = {
+        collection: model.model_json_schema() for collection, model in MODEL_MAPPING.items()
+    }
+    
+    # (collection, field) -> TypeAdapter for that field's type and constraints
+    _field_adapters: Dict[Tuple[str, str], TypeAdapter] = {}
     
     @classmethod
     def validate_document(cls, collection: str, data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
@@ -36,26 +91,95 @@ class SchemaValidator:
         Returns:
             Tuple of (is_valid, error_message)
         """
-        if collection not in cls.MODEL_MAPPING:
+        adapter = cls._adapters.get(collection)
+        if adapter is None:
             return False, f"Unknown collection: {collection}"
         
-        model_class = cls.MODEL_MAPPING[collection]
-        
         try:
-            # Validate the data using Pydantic model
-            model_class(**data)
+            adapter.validate_python(data)
             return True, None
         except ValidationError as e:
-            error_details = []
-            for error in e.errors():
-                field = " -> ".join(str(x) for x in error['loc'])
-                message = error['msg']
-                error_details.append(f"{field}: {message}")
-            
-            return False, "; ".join(error_details)
+            return False, _format_errors(e.errors(include_url=False))
         except Exception as e:
             return False, f"Validation error: {str(e)}"
     
+    @classmethod
+    def validate_many(cls, collection: str, documents: Sequence[Dict[str, Any]]) -> List[tuple[bool, Optional[str]]]:
+        """
+        Validate a list of documents in one pass, for the bulk paths
+        
+        Args:
+            collection: Collection name
+            documents: Document data to validate
+            
+        Returns:
+            (is_valid, error_message) of each document, as validate_document
+            would return it
+        """
+        adapter = cls._list_adapters.get(collection)
+        if adapter is None:
+            return [(False, f"Unknown collection: {collection}")] * len(documents)
+        
+        try:
+            adapter.validate_python(documents)
+            return [(True, None)] * len(documents)
+        except ValidationError as e:
+            # Locations start with the index of the document
+            errors: Dict[int, List[Dict[str, Any]]] = {}
+            for error in e.errors(include_url=False):
+                errors.setdefault(error['loc'][0], []).append(error)
+            return [(False, _format_errors(errors[i], skip=1)) if i in errors else (True, None)
+                    for i in range(len(documents))]
+        except Exception:
+            return [cls.validate_document(collection, data) for data in documents]
+    
+    @classmethod
+    def _field_adapter(cls, collection: str, field_name: str) -> Optional[TypeAdapter]:
+        key = (collection, field_name)
+        if key not in cls._field_adapters:
+            field_info = cls.MODEL_MAPPING[collection].model_fields.get(field_name)
+            if field_info is None:
+                return None
+            cls._field_adapters[key] = TypeAdapter(_annotation(field_info))
+        return cls._field_adapters[key]
+    
+    @classmethod
+    def validate_partial(cls, collection: str, data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
+        """
+        Validate only the given fields against their types in the schema
+        
+        Used for updates, where the rest of the document is already valid and
+        does not need to be read back. Fields the model does not declare are
+        ignored, the same as in validate_document.
+        
+        Args:
+            collection: Collection name
+            data: Changed fields to validate
+            
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if collection not in cls.MODEL_MAPPING:
+            return False, f"Unknown collection: {collection}"
+        
+        error_details = []
+        for field_name, value in data.items():
+            adapter = cls._field_adapter(collection, field_name)
+            if adapter is None:
+                continue
+            try:
+                adapter.validate_python(value)
+            except ValidationError as e:
+                for error in e.errors(include_url=False):
+                    field = " -> ".join(str(x) for x in (field_name, *error['loc']))
+                    error_details.append(f"{field}: {error['msg']}")
+            except Exception as e:
+                return False, f"Validation error: {str(e)}"
+        
+        if error_details:
+            return False, "; ".join(error_details)
+        return True, None
+    
     @classmethod
     def validate_required_fields(cls, collection: str, data: Dict[str, Any]) -> tuple[bool, List[str]]:
         """
@@ -68,23 +192,11 @@ class SchemaValidator:
         Returns:
             Tuple of (all_present, missing_fields)
         """
-        if collection not in cls.MODEL_MAPPING:
+        required_fields = cls._required_fields.get(collection)
+        if required_fields is None:
             return False, [f"Unknown collection: {collection}"]
         
-        model_class = cls.MODEL_MAPPING[collection]
-        
-        # Get required fields from the model
-        required_fields = []
-        for field_name, field_info in model_class.__fields__.items():
-            if field_info.is_required() and field_name not in ['id', 'created_at', 'updated_at']:
-                required_fields.append(field_name)
-        
-        # Check which required fields are missing
-        missing_fields = []
-        for field in required_fields:
-            if field not in data or data[field] is None:
-                missing_fields.append(field)
-        
+        missing_fields = [field for field in required_fields if data.get(field) is None]
         return len(missing_fields) == 0, missing_fields
     
     @classmethod
@@ -96,13 +208,10 @@ class SchemaValidator:
             collection: Collection name
             
         Returns:
-            Schema definition or None if collection not found
+            Schema definition (a copy) or None if collection not found
         """
-        if collection not in cls.MODEL_MAPPING:
-            return None
-        
-        model_class = cls.MODEL_MAPPING[collection]
-        return model_class.schema()
+        schema = cls._schemas.get(collection)
+        return copy.deepcopy(schema) if schema is not None else None
 
 # Create global validator instance
 schema_validator = SchemaValidator()
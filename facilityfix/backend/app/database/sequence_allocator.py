@@ -0,0 +1,60 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .collections import COLLECTIONS
+
+
+class SequenceAllocator:
+    """
+    Hi/lo allocator for human-readable sequence numbers.
+
+    Each worker process leases a block of ``block_size`` values from a counter
+    document in a Firestore transaction and then hands them out from memory,
+    so allocating a value is O(1) and two workers can never receive the same
+    number. Values left in a block when the process exits are skipped, which
+    leaves gaps but never duplicates.
+    """
+
+    def __init__(self, db, block_size: int = 10, collection: str = COLLECTIONS['sequences']):
+        self.db = db
+        self.block_size = block_size
+        self.collection = collection
+        # sequence name -> [next value, end of block (exclusive)]
+        self._blocks: Dict[str, List[int]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def next_value(self, name: str,
+                         seed: Optional[Callable[[], Awaitable[int]]] = None) -> int:
+        """
+        Allocate the next value of the ``name`` sequence
+
+        Args:
+            name: Sequence (counter document) name
+            seed: Coroutine function returning the first value to use when the
+                counter document does not exist yet (called at most once)
+        """
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            block = self._blocks.get(name)
+            if block is None or block[0] >= block[1]:
+                start = await self._lease_block(name, seed)
+                block = self._blocks[name] = [start, start + self.block_size]
+
+            value = block[0]
+            block[0] += 1
+            return value
+
+    async def _lease_block(self, name: str,
+                           seed: Optional[Callable[[], Awaitable[int]]]) -> int:
+        success, start, error = await self.db.reserve_sequence_block(
+            self.collection, name, self.block_size
+        )
+        if success and start is None:
+            # First lease ever: seed the counter, e.g. from existing data
+            initial = await seed() if seed else 1
+            success, start, error = await self.db.reserve_sequence_block(
+                self.collection, name, self.block_size, initial=initial
+            )
+        if not success:
+            raise Exception(error)
+        return start
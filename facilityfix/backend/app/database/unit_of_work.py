@@ -0,0 +1,311 @@
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+import uuid
+
+from .counters import COUNTED_FIELDS, counter_deltas, counter_write, merge_deltas
+from .schema_validator import schema_validator
+
+
+class UnitOfWork:
+    """
+    Request-scoped session over DatabaseService.
+
+    Every document is read from Firestore at most once per session (identity
+    map). Writes are validated when they are made, applied to the cached
+    post-image so later reads in the same session see them, and buffered
+    until ``commit`` sends them in one WriteBatch (or in independently
+    committed chunks if a session ever buffers more than MAX_BATCH_WRITES).
+
+    Creates, deletes and changes to counted fields of the collections in
+    COUNTED_FIELDS also update the sharded dashboard counters in the same
+    batch. Updating or deleting such a document therefore needs its current
+    data in the session first, via ``get``, ``query`` or ``attach``. That data
+    may be stale (another request changed the document since), so the write
+    is made conditional on the update_time the data was read at; a concurrent
+    change fails the commit instead of being counted twice. ``get`` and
+    ``get_many`` record that update_time for counted collections, and
+    ``attach`` takes it from the caller. Only documents that arrived without
+    one (from ``query``, or attached without it) are read again at commit.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        # (collection, document_id) -> document data, or None if known missing
+        self._documents: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        # (collection, document_id) -> update_time the stored document was read at
+        self._versions: Dict[Tuple[str, str], Any] = {}
+        self._writes: List[Tuple[str, str, str, Optional[Dict[str, Any]]]] = []
+        # collection -> pending counter deltas
+        self._counter_deltas: Dict[str, Dict[str, Any]] = {}
+        # Documents this session created or deleted (their stored version no
+        # longer matters), and the data the counter deltas of the others were
+        # computed from (None: known missing)
+        self._written: Set[Tuple[str, str]] = set()
+        self._pre_images: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+
+    # ── reads ────────────────────────────────────────────────────────────
+    async def get(self, collection: str, document_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document (with 'id'), reading Firestore only on first access"""
+        key = (collection, document_id)
+        if key not in self._documents:
+            if collection in COUNTED_FIELDS:
+                await self._load_versions(collection, [document_id])
+            else:
+                success, data, error = await self.db.get_document(collection, document_id)
+                if not success and error != f"Document {document_id} not found in {collection}":
+                    raise Exception(error)
+                self._documents[key] = data if success else None
+        document = self._documents[key]
+        return dict(document) if document is not None else None
+
+    async def get_many(self, collection: str, document_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Get several documents, aligned with ``document_ids`` (None where
+        missing). Those not in the session yet are read in one batched call.
+        """
+        unknown = [i for i in dict.fromkeys(document_ids) if (collection, i) not in self._documents]
+        if unknown and collection in COUNTED_FIELDS:
+            await self._load_versions(collection, unknown)
+        elif unknown:
+            success, documents, _, error = await self.db.get_documents(collection, unknown)
+            if not success:
+                raise Exception(error)
+            for document_id, document in zip(unknown, documents):
+                self._documents[(collection, document_id)] = document
+        return [
+            dict(document) if document is not None else None
+            for document in (self._documents[(collection, i)] for i in document_ids)
+        ]
+
+    async def _load_versions(self, collection: str, document_ids: List[str]):
+        """Read documents into the identity map along with their update_time"""
+        success, versions, error = await self.db.get_versions(collection, document_ids)
+        if not success:
+            raise Exception(error)
+        for document_id in document_ids:
+            data, update_time = versions.get(document_id, (None, None))
+            self._documents[(collection, document_id)] = data
+            if update_time is not None:
+                self._versions[(collection, document_id)] = update_time
+
+    async def query(self, collection: str, filters: List[tuple] = None,
+                    limit: int = None) -> List[Dict[str, Any]]:
+        """Run a query and add the results to the identity map"""
+        success, docs, error = await self.db.query_documents(collection, filters, limit)
+        if not success:
+            raise Exception(error)
+        for doc in docs:
+            key = (collection, doc["_doc_id"])
+            # Documents this session already changed keep their post-image
+            if key not in self._documents:
+                self._documents[key] = {**doc, "id": doc.get("id") or doc["_doc_id"]}
+        return docs
+
+    def attach(self, collection: str, document_id: str, data: Optional[Dict[str, Any]],
+               update_time: Optional[datetime] = None):
+        """
+        Add a document the caller has already read to the identity map, so
+        it is not read again. A version the session already holds wins.
+
+        Pass the snapshot's ``update_time`` (see DatabaseService.get_versions)
+        when the document may get a counted change; without it, commit reads
+        the document once more to check it.
+        """
+        key = (collection, document_id)
+        if key not in self._documents:
+            self._documents[key] = {**data, "id": data.get("id") or document_id} if data is not None else None
+            if update_time is not None and data is not None:
+                self._versions[key] = update_time
+
+    # ── buffered writes ──────────────────────────────────────────────────
+    def create(self, collection: str, data: Dict[str, Any],
+               document_id: Optional[str] = None, validate: bool = True) -> str:
+        """
+        Buffer a document creation
+
+        Returns:
+            The document ID (``data['id']`` or a new UUID when not given)
+
+        Raises:
+            ValueError: The document does not match its schema
+        """
+        if validate:
+            is_valid, error_msg = schema_validator.validate_document(collection, data)
+            if not is_valid:
+                raise ValueError(f"Validation failed: {error_msg}")
+
+        document_id = document_id or data.get("id") or str(uuid.uuid4())
+        now = datetime.utcnow()
+        data = {**data, "created_at": now, "updated_at": now}
+        self._writes.append(("set", collection, document_id, data))
+        self._written.add((collection, document_id))
+        self._count(collection, self._documents.get((collection, document_id)), data)
+        self._documents[(collection, document_id)] = {**data, "id": data.get("id", document_id)}
+        return document_id
+
+    def create_many(self, collection: str, documents: List[Dict[str, Any]],
+                    validate: bool = True) -> List[str]:
+        """
+        Buffer several document creations, e.g. a notification fan-out.
+        They are committed with the rest of the session, in chunks of at most
+        MAX_BATCH_WRITES writes.
+        """
+        return [self.create(collection, data, validate=validate) for data in documents]
+
+    def update(self, collection: str, document_id: str, data: Dict[str, Any],
+               validate: bool = True):
+        """
+        Buffer an update of the given fields
+
+        Raises:
+            ValueError: A changed field does not match its schema
+        """
+        if validate:
+            is_valid, error_msg = schema_validator.validate_partial(collection, data)
+            if not is_valid:
+                raise ValueError(f"Validation failed: {error_msg}")
+
+        counted = set(COUNTED_FIELDS.get(collection, ())) & set(data)
+        if counted:
+            before = self._current(collection, document_id)
+            self._pin(collection, document_id, before)
+            if before is not None:
+                self._count(collection, before, {**before, **data})
+
+        data = {**data, "updated_at": datetime.utcnow()}
+        self._writes.append(("update", collection, document_id, data))
+        key = (collection, document_id)
+        if self._documents.get(key) is not None:
+            self._documents[key] = {**self._documents[key], **data}
+
+    def delete(self, collection: str, document_id: str):
+        """Buffer a document deletion"""
+        if collection in COUNTED_FIELDS:
+            before = self._current(collection, document_id)
+            self._pin(collection, document_id, before)
+            if before is not None:
+                self._count(collection, before, None)
+        self._writes.append(("delete", collection, document_id, None))
+        self._written.add((collection, document_id))
+        self._documents[(collection, document_id)] = None
+
+    def _current(self, collection: str, document_id: str) -> Optional[Dict[str, Any]]:
+        key = (collection, document_id)
+        if key not in self._documents:
+            raise ValueError(
+                f"{collection}/{document_id} must be read in this unit of work before "
+                f"it is changed, to keep its counters accurate"
+            )
+        return self._documents[key]
+
+    def _pin(self, collection: str, document_id: str, before: Optional[Dict[str, Any]]):
+        """Remember what a stored document's counter deltas are based on"""
+        key = (collection, document_id)
+        if key not in self._written:
+            self._pre_images.setdefault(key, before)
+
+    def _count(self, collection: str, before: Optional[Dict[str, Any]],
+               after: Optional[Dict[str, Any]]):
+        deltas = counter_deltas(collection, before, after)
+        if deltas:
+            merge_deltas(self._counter_deltas.setdefault(collection, {}), deltas)
+
+    # ── commit ───────────────────────────────────────────────────────────
+    @property
+    def pending_writes(self) -> int:
+        return len(self._writes) + sum(1 for deltas in self._counter_deltas.values() if deltas)
+
+    async def commit(self) -> tuple[bool, Optional[str]]:
+        """
+        Send all buffered writes via DatabaseService.commit_writes
+
+        Returns:
+            Tuple of (success, error_message)
+        """
+        writes, self._writes = self._writes, []
+        writes += [
+            counter_write(collection, deltas)
+            for collection, deltas in self._counter_deltas.items() if deltas
+        ]
+        self._counter_deltas = {}
+        writes, error = await self._guard(writes)
+        self._written.clear()
+        self._pre_images.clear()
+        # Once committed the stored versions have moved on
+        self._versions.clear()
+        if error is None:
+            success, error = await self.db.commit_writes(writes)
+        else:
+            success = False
+        if not success:
+            # Some or all writes were not applied, so the post-images are stale
+            self._documents.clear()
+        return success, error
+
+    async def _guard(self, writes: List[tuple]) -> Tuple[List[tuple], Optional[str]]:
+        """
+        Make the first write of each pinned document conditional on the
+        update_time its pre-image was read at. Pre-images read without one
+        are checked against the stored documents first.
+
+        Returns:
+            Tuple of (writes, error_message)
+        """
+        read_at: Dict[Tuple[str, str], Any] = {}
+        ids_by_collection: Dict[str, List[str]] = {}
+        for key in self._pre_images:
+            if key in self._versions:
+                read_at[key] = self._versions[key]
+            else:
+                ids_by_collection.setdefault(key[0], []).append(key[1])
+
+        for collection, document_ids in ids_by_collection.items():
+            success, versions, error = await self.db.get_versions(collection, document_ids)
+            if not success:
+                return writes, error
+            fields = COUNTED_FIELDS[collection]
+            for document_id in document_ids:
+                before = self._pre_images[(collection, document_id)]
+                stored, update_time = versions.get(document_id, (None, None))
+                if (stored is None) != (before is None) or (
+                        stored is not None and any(stored.get(f) != before.get(f) for f in fields)):
+                    return writes, f"{collection}/{document_id} was modified since it was read"
+                if update_time is not None:
+                    read_at[(collection, document_id)] = update_time
+
+        guarded = []
+        for write in writes:
+            update_time = read_at.pop((write[1], write[2]), None)
+            guarded.append((*write, update_time) if update_time is not None else write)
+        return guarded, None
+
+    def rollback(self):
+        """Discard buffered writes and everything read so far"""
+        self._writes.clear()
+        self._counter_deltas.clear()
+        self._documents.clear()
+        self._versions.clear()
+        self._written.clear()
+        self._pre_images.clear()
+
+
+@asynccontextmanager
+async def unit_of_work(db, uow: Optional[UnitOfWork] = None):
+    """
+    Use ``uow`` if the caller passed one, otherwise open a session that
+    commits when the block exits cleanly and is discarded on error
+    """
+    if uow is not None:
+        yield uow
+        return
+
+    session = UnitOfWork(db)
+    try:
+        yield session
+    except BaseException:
+        session.rollback()
+        raise
+    success, error = await session.commit()
+    if not success:
+        raise Exception(error)
@@ -1,5 +1,14 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.auth.auth_executor import auth_executor
+from app.auth.dependencies import require_admin
+from app.core.config import settings
+from app.core.container import lifespan
+from app.core.deadline import DeadlineMiddleware
+from app.core.single_flight import SingleFlight, SingleFlightMiddleware
+from app.database.database_service import database_service
+from app.database.indexes import query_shapes
+from app.database.resilience import read_policy
 import logging
 
 # Configure logging
@@ -9,7 +18,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="FacilityFix API",
     description="Smart Maintenance and Repair Analytics Management System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -21,6 +31,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Identical concurrent GET requests (same caller) share one response
+http_single_flight = SingleFlight()
+if settings.HTTP_SINGLE_FLIGHT:
+    app.add_middleware(SingleFlightMiddleware, flight=http_single_flight, exclude_paths=("/metrics",))
+
+# Each request's time budget; added last so it is the outermost and covers the others
+app.add_middleware(DeadlineMiddleware, seconds=settings.REQUEST_DEADLINE_SECONDS)
+
 def safe_include_router(router_module_path: str, router_name: str = "router"):
     """Safely include a router with error handling"""
     try:
@@ -77,3 +95,19 @@ async def health_check():
         "loaded_routers": len(successful_routers),
         "failed_routers": len(failed_routers)
     }
+
+
+@app.get("/metrics")
+async def metrics(current_user: dict = Depends(require_admin)):
+    """Admin-only: pool, cache and retry statistics (they reveal query shapes)"""
+    return {
+        "auth_executor": auth_executor.stats(),
+        "query_shapes": query_shapes.stats(),
+        "query_cache": database_service.query_cache.stats() if database_service.is_resolved else None,
+        "replicas": database_service.replicas.stats() if database_service.is_resolved else None,
+        "single_flight": {
+            "database": database_service.single_flight.stats() if database_service.is_resolved else None,
+            "http": http_single_flight.stats()
+        },
+        "resilience": read_policy.stats()
+    }
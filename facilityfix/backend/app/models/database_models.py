@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -198,4 +198,9 @@ class Feedback(BaseModel):
     timeliness: Optional[int] = Field(default=None, ge=1, le=5)
     communication: Optional[int] = Field(default=None, ge=1, le=5)
     would_recommend: Optional[bool] = None
-    submitted_at: Optional[datetime] = None
\ No newline at end of file
+    submitted_at: Optional[datetime] = None
+
+# Dashboard counts of a collection by status
+class StatusCounts(BaseModel):
+    total: int = 0
+    by_status: Dict[str, int] = {}
@@ -0,0 +1,51 @@
+from typing import Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel, create_model
+
+# Always returned with a projection so clients can address the document
+ALWAYS_SELECTED = ("id",)
+
+_partial_models: Dict[Type[BaseModel], Type[BaseModel]] = {}
+
+
+class InvalidFieldsError(ValueError):
+    """A fields= projection names fields the model does not have"""
+
+
+def partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    Variant of ``model`` where every field is optional and defaults to None,
+    used to return sparse documents. Types are still validated.
+    """
+    if model not in _partial_models:
+        fields = {
+            name: (Optional[field.annotation], None)
+            for name, field in model.model_fields.items()
+        }
+        _partial_models[model] = create_model(f"Partial{model.__name__}", **fields)
+    return _partial_models[model]
+
+
+def parse_fields(raw: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated ``fields`` query parameter
+
+    Returns:
+        The selected field names (plus ALWAYS_SELECTED), or None for whole documents
+
+    Raises:
+        InvalidFieldsError: A field is not in ``allowed``
+    """
+    if not raw:
+        return None
+
+    allowed = set(allowed)
+    fields = [field.strip() for field in raw.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise InvalidFieldsError(f"Unknown fields: {', '.join(unknown)}")
+
+    for field in ALWAYS_SELECTED:
+        if field not in fields and field in allowed:
+            fields.insert(0, field)
+    return fields
@@ -148,11 +148,10 @@ class UserSearchFilters(BaseModel):
     search_term: Optional[str] = Field(None, description="Search in name, email, or department")
 
 class UserListResponse(BaseModel):
-    users: List[UserResponse]
-    total_count: int
-    page: int
+    """One page of user profiles; pass next_cursor back to get the next page"""
+    users: List[dict]
     page_size: int
-    total_pages: int
+    next_cursor: Optional[str] = None
 
 class BulkUserOperation(BaseModel):
     user_ids: List[str]
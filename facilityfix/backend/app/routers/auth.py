@@ -9,7 +9,9 @@ from ..auth.firebase_auth import firebase_auth
 from ..auth.dependencies import require_admin, get_current_user
 from ..database.database_service import database_service
 from ..database.collections import COLLECTIONS
+from ..database.unit_of_work import unit_of_work
 from ..services.user_id_service import user_id_service
+from ..services.identity_resolver import identity_resolver, UserNotFoundError
 from ..core.config import settings
 from datetime import datetime
 import re
@@ -17,6 +19,13 @@ import httpx
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+async def _find_profile(ref: str):
+    """Resolve a UID or user_id to its Firestore profile, or None if there is none"""
+    try:
+        return await identity_resolver.resolve(ref)
+    except UserNotFoundError:
+        return None
+
 @router.post("/login/admin")
 async def login_admin(login_data: AdminLogin):
     """Admin login with userEmail, userId, and userPassword"""
@@ -196,13 +205,17 @@ async def _register_user_by_role(user_data, role: UserRole):
         
         await firebase_auth.set_custom_claims(firebase_user["uid"], custom_claims)
         
-        # Save user profile to Firestore
-        profile_success, profile_id, profile_error = await database_service.create_document(
-            COLLECTIONS['users'],
-            user_profile_data,
-            document_id=firebase_user["uid"],  # Use Firebase UID as document ID
-            validate=True
-        )
+        # Save user profile to Firestore, counting it in the same batch
+        profile_success, profile_error = True, None
+        try:
+            async with unit_of_work(database_service) as uow:
+                uow.create(
+                    COLLECTIONS['users'],
+                    user_profile_data,
+                    document_id=firebase_user["uid"]  # Use Firebase UID as document ID
+                )
+        except Exception as e:
+            profile_success, profile_error = False, str(e)
         
         if not profile_success:
             # Clean up Firebase user if Firestore creation fails
@@ -214,6 +227,7 @@ async def _register_user_by_role(user_data, role: UserRole):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to create user profile: {profile_error}"
             )
+        identity_resolver.remember(user_profile_data)
         
         return {
             "message": f"{role.value.title()} registered successfully",
@@ -237,31 +251,22 @@ async def login_user(login_data: UserLogin):
     """Generic login with email or user ID - Backward compatibility"""
     try:
         user = None
+        profile_data = None
         
         # Check if identifier is email or user ID
         if '@' in login_data.identifier:
             # Login with email
             user = await firebase_auth.get_user_by_email(login_data.identifier)
+            if user:
+                profile_data = await _find_profile(user.uid)
         else:
             # Login with user ID (e.g., T-0001)
-            # First find user in Firestore by user_id
-            success, users, error = await database_service.query_documents(
-                COLLECTIONS['users'],
-                [("user_id", "==", login_data.identifier)]
-            )
-            
-            if success and users:
-                user_profile = users[0]
-                user = await firebase_auth.get_user(user_profile['id'])
+            profile_data = await _find_profile(login_data.identifier)
+            if profile_data:
+                user = await firebase_auth.get_user(identity_resolver.doc_id_of(profile_data))
         
         if user:
-            # Get user profile from Firestore
-            profile_success, profile_data, profile_error = await database_service.get_document(
-                COLLECTIONS['users'],
-                user.uid
-            )
-            
-            if profile_success and profile_data:
+            if profile_data:
                 user_status = profile_data.get('status', 'active')
                 if user_status in ['suspended', 'inactive']:
                     raise HTTPException(
@@ -303,36 +308,29 @@ async def generate_test_token(login_data: UserLogin):
     try:
         user = None
         
+        profile_data = None
+        
         # Check if identifier is email or user ID
         if '@' in login_data.identifier:
             user = await firebase_auth.get_user_by_email(login_data.identifier)
+            if user:
+                profile_data = await _find_profile(user.uid)
         else:
-            success, users, error = await database_service.query_documents(
-                COLLECTIONS['users'],
-                [("user_id", "==", login_data.identifier)]
-            )
-            
-            if success and users:
-                user_profile = users[0]
-                user = await firebase_auth.get_user(user_profile['id'])
+            profile_data = await _find_profile(login_data.identifier)
+            if profile_data:
+                user = await firebase_auth.get_user(identity_resolver.doc_id_of(profile_data))
         
         if user:
             # Generate custom token for testing
             custom_token = await firebase_auth.create_custom_token(user.uid)
             
-            # Get user profile
-            profile_success, profile_data, profile_error = await database_service.get_document(
-                COLLECTIONS['users'],
-                user.uid
-            )
-            
             return {
                 "access_token": custom_token,
                 "token_type": "Bearer",
                 "uid": user.uid,
-                "user_id": profile_data.get('user_id') if profile_success else None,
+                "user_id": profile_data.get('user_id') if profile_data else None,
                 "email": user.email,
-                "role": profile_data.get('role') if profile_success else None,
+                "role": profile_data.get('role') if profile_data else None,
                 "instructions": "Copy the 'access_token' value and paste it in the Authorization field in FastAPI docs"
             }
         else:
@@ -356,18 +354,17 @@ async def exchange_custom_token_for_id_token(login_data: UserLogin):
     """
     try:
         user = None
+        profile_data = None
 
         # Find user by identifier (email or user_id)
         if '@' in login_data.identifier:
             user = await firebase_auth.get_user_by_email(login_data.identifier)
+            if user:
+                profile_data = await _find_profile(user.uid)
         else:
-            success, users, error = await database_service.query_documents(
-                COLLECTIONS['users'],
-                [("user_id", "==", login_data.identifier)]
-            )
-            if success and users:
-                user_profile = users[0]
-                user = await firebase_auth.get_user(user_profile['id'])
+            profile_data = await _find_profile(login_data.identifier)
+            if profile_data:
+                user = await firebase_auth.get_user(identity_resolver.doc_id_of(profile_data))
 
         if not user:
             raise HTTPException(
@@ -409,12 +406,8 @@ async def exchange_custom_token_for_id_token(login_data: UserLogin):
                     detail="Failed to get ID token from exchange"
                 )
 
-        # Step 3: Fetch user profile from Firestore (match by Firebase UID)
-        profile_success, profile_docs, profile_error = await database_service.query_documents(
-            COLLECTIONS['users'],
-            [("id", "==", user.uid)]
-        )
-        profile_data = profile_docs[0] if profile_success and profile_docs else {}
+        # Step 3: Reuse the Firestore profile resolved above
+        profile_data = profile_data or {}
 
         return {
             "id_token": id_token,
@@ -687,19 +680,16 @@ async def change_user_role(
     """Admin-only: Change user's role"""
     try:
         # Find user by user_id in Firestore
-        success, users, error = await database_service.query_documents(
-            COLLECTIONS['users'],
-            [("user_id", "==", user_id)]
-        )
-        
-        if not success or not users:
+        try:
+            profile, read_at = await identity_resolver.resolve_versioned(user_id)
+        except UserNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        user_profile = users[0]
-        firebase_uid = user_profile['id']
+        user_profile = dict(profile)
+        firebase_uid = identity_resolver.doc_id_of(user_profile)
         
         # Update role in Firestore
         update_data = {
@@ -707,17 +697,16 @@ async def change_user_role(
             "updated_at": datetime.utcnow()
         }
         
-        success, error = await database_service.update_document(
-            COLLECTIONS['users'],
-            firebase_uid,
-            update_data
-        )
-        
-        if not success:
+        try:
+            async with unit_of_work(database_service) as uow:
+                uow.attach(COLLECTIONS['users'], firebase_uid, user_profile, read_at)
+                uow.update(COLLECTIONS['users'], firebase_uid, update_data)
+        except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to update user role: {error}"
+                detail=f"Failed to update user role: {e}"
             )
+        identity_resolver.forget(firebase_uid)
         
         # Update custom claims in Firebase
         current_claims = user_profile.copy()
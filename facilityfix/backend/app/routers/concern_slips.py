@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
-from app.models.database_models import ConcernSlip
+from app.models.database_models import ConcernSlip, StatusCounts
 from app.services.concern_slip_service import ConcernSlipService
+from app.core.container import get_concern_slip_service
 from app.auth.dependencies import get_current_user, require_role
+from app.database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from app.models.projection import InvalidFieldsError, parse_fields, partial_model
 
 router = APIRouter(prefix="/concern-slips", tags=["concern-slips"])
 
@@ -24,9 +27,18 @@ class EvaluateConcernSlipRequest(BaseModel):
     resolution_type: Optional[str] = None  # job_service, work_permit
     admin_notes: Optional[str] = None
 
+# Response Models
+PartialConcernSlip = partial_model(ConcernSlip)
+
+class ConcernSlipListResponse(BaseModel):
+    concern_slips: List[PartialConcernSlip]
+    page_size: int
+    next_cursor: Optional[str] = None
+
 @router.post("/", response_model=ConcernSlip)
 async def submit_concern_slip(
     request: CreateConcernSlipRequest,
+    service: ConcernSlipService = Depends(get_concern_slip_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["tenant"]))
 ):
@@ -36,7 +48,6 @@ async def submit_concern_slip(
     The system notifies all admins automatically.
     """
     try:
-        service = ConcernSlipService()
         concern_slip = await service.create_concern_slip(
             reported_by=current_user["uid"],
             concern_data=request.dict()
@@ -57,12 +68,12 @@ async def submit_concern_slip(
 async def evaluate_concern_slip(
     concern_slip_id: str,
     request: EvaluateConcernSlipRequest,
+    service: ConcernSlipService = Depends(get_concern_slip_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
     """Evaluate concern slip - approve/reject and determine resolution type (Admin only)"""
     try:
-        service = ConcernSlipService()
         concern_slip = await service.evaluate_concern_slip(
             concern_slip_id=concern_slip_id,
             evaluated_by=current_user["uid"],
@@ -77,12 +88,12 @@ async def evaluate_concern_slip(
 @router.get("/{concern_slip_id}", response_model=ConcernSlip)
 async def get_concern_slip(
     concern_slip_id: str,
+    service: ConcernSlipService = Depends(get_concern_slip_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "tenant"]))
 ):
     """Get concern slip by ID"""
     try:
-        service = ConcernSlipService()
         concern_slip = await service.get_concern_slip(concern_slip_id)
         if not concern_slip:
             raise HTTPException(status_code=404, detail="Concern slip not found")
@@ -97,76 +108,108 @@ async def get_concern_slip(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get concern slip: {str(e)}")
 
-@router.get("/tenant/{tenant_id}", response_model=List[ConcernSlip])
+@router.get("/tenant/{tenant_id}", response_model=ConcernSlipListResponse, response_model_exclude_unset=True)
 async def get_concern_slips_by_tenant(
     tenant_id: str,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: ConcernSlipService = Depends(get_concern_slip_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "tenant"]))
 ):
-    """Get all concern slips for a tenant"""
+    """Get concern slips for a tenant, newest first, one page at a time"""
     try:
         # Tenants can only view their own concern slips
         if current_user.get("role") == "tenant" and current_user["uid"] != tenant_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        service = ConcernSlipService()
-        concern_slips = await service.get_concern_slips_by_tenant(tenant_id)
-        return concern_slips
+        selected = parse_fields(fields, ConcernSlip.model_fields)
+        concern_slips, next_cursor = await service.list_concern_slips(reported_by=tenant_id, page_size=page_size, cursor=cursor, fields=selected)
+        return ConcernSlipListResponse(concern_slips=concern_slips, page_size=page_size, next_cursor=next_cursor)
     except HTTPException:
         raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get concern slips: {str(e)}")
 
-@router.get("/status/{status}", response_model=List[ConcernSlip])
+@router.get("/status/{status}", response_model=ConcernSlipListResponse, response_model_exclude_unset=True)
 async def get_concern_slips_by_status(
     status: str,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: ConcernSlipService = Depends(get_concern_slip_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
-    """Get all concern slips with specific status (Admin only)"""
+    """Get concern slips with specific status, one page at a time (Admin only)"""
     try:
-        service = ConcernSlipService()
-        concern_slips = await service.get_concern_slips_by_status(status)
-        return concern_slips
+        selected = parse_fields(fields, ConcernSlip.model_fields)
+        concern_slips, next_cursor = await service.list_concern_slips(status=status, page_size=page_size, cursor=cursor, fields=selected)
+        return ConcernSlipListResponse(concern_slips=concern_slips, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get concern slips: {str(e)}")
 
-@router.get("/pending/all", response_model=List[ConcernSlip])
+@router.get("/pending/all", response_model=ConcernSlipListResponse, response_model_exclude_unset=True)
 async def get_pending_concern_slips(
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: ConcernSlipService = Depends(get_concern_slip_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
-    """Get all pending concern slips awaiting evaluation (Admin only)"""
+    """Get pending concern slips awaiting evaluation, one page at a time (Admin only)"""
     try:
-        service = ConcernSlipService()
-        concern_slips = await service.get_pending_concern_slips()
-        return concern_slips
+        selected = parse_fields(fields, ConcernSlip.model_fields)
+        concern_slips, next_cursor = await service.list_concern_slips(status="pending", page_size=page_size, cursor=cursor, fields=selected)
+        return ConcernSlipListResponse(concern_slips=concern_slips, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get pending concern slips: {str(e)}")
 
-@router.get("/", response_model=List[ConcernSlip])
+@router.get("/", response_model=ConcernSlipListResponse, response_model_exclude_unset=True)
 async def get_all_concern_slips(
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: ConcernSlipService = Depends(get_concern_slip_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role('admin'))
 ):
     """
     Get all concern slips (Admin only).
-    Returns a list of all concern slips submitted by tenants,
+    Returns concern slips submitted by tenants one page at a time,
     sorted by most recent.
     """
     try:
-        service = ConcernSlipService()
-        concern_slips = await service.get_all_concern_slips()
-
-        # Sort by creation date (latest first)
-        concern_slips.sort(key=lambda slip: slip.created_at, reverse=True)
-
-        return concern_slips
-
+        selected = parse_fields(fields, ConcernSlip.model_fields)
+        concern_slips, next_cursor = await service.list_concern_slips(page_size=page_size, cursor=cursor, fields=selected)
+        return ConcernSlipListResponse(concern_slips=concern_slips, page_size=page_size, next_cursor=next_cursor)
     except HTTPException:
         raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get concern slips: {str(e)}"
-        )
+        raise HTTPException(status_code=500, detail=f"Failed to get concern slips: {str(e)}")
+
+@router.get("/stats/status", response_model=StatusCounts)
+async def get_concern_slip_status_counts(
+    service: ConcernSlipService = Depends(get_concern_slip_service),
+    current_user: dict = Depends(get_current_user),
+    _: None = Depends(require_role(["admin"]))
+):
+    """Count concern slips per status for the dashboard (Admin only)"""
+    try:
+        return await service.get_status_counts()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get concern slip counts: {str(e)}")
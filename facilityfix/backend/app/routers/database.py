@@ -6,8 +6,11 @@ from ..models.database_models import Building, UserProfile
 
 router = APIRouter(prefix="/database", tags=["database"])
 
+# The legacy FirestoreClient blocks (and sleeps between read retries), so
+# these routes are plain functions, which FastAPI runs in its threadpool
+
 @router.get("/test")
-async def test_database_connection():
+def test_database_connection():
     """Test Firestore database connection"""
     try:
         client = get_firestore_client()
@@ -25,7 +28,7 @@ async def test_database_connection():
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
 
 @router.post("/init-sample-data")
-async def initialize_sample_data(current_user: dict = Depends(require_admin)):
+def initialize_sample_data(current_user: dict = Depends(require_admin)):
     """Initialize sample data for testing (Admin only)"""
     try:
         client = get_firestore_client()
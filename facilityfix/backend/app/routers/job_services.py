@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
-from app.models.database_models import JobService
+from app.models.database_models import JobService, StatusCounts
 from app.services.job_service_service import JobServiceService
+from app.core.container import get_job_service_service
 from app.auth.dependencies import get_current_user, require_role
+from app.database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from app.models.projection import InvalidFieldsError, parse_fields, partial_model
 
 router = APIRouter(prefix="/job-services", tags=["job-services"])
 
@@ -30,15 +33,23 @@ class UpdateJobStatusRequest(BaseModel):
 class AddNotesRequest(BaseModel):
     notes: str
 
+# Response Models
+PartialJobService = partial_model(JobService)
+
+class JobServiceListResponse(BaseModel):
+    job_services: List[PartialJobService]
+    page_size: int
+    next_cursor: Optional[str] = None
+
 @router.post("/", response_model=JobService)
 async def create_job_service(
     request: CreateJobServiceRequest,
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
     """Create a new job service from an approved concern slip (Admin only)"""
     try:
-        service = JobServiceService()
         job_service = await service.create_job_service(
             concern_slip_id=request.concern_slip_id,
             created_by=current_user["uid"],
@@ -54,12 +65,12 @@ async def create_job_service(
 async def assign_job_service(
     job_service_id: str,
     request: AssignJobServiceRequest,
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
     """Assign job service to internal staff (Admin only)"""
     try:
-        service = JobServiceService()
         job_service = await service.assign_job_service(
             job_service_id=job_service_id,
             assigned_to=request.assigned_to,
@@ -75,12 +86,12 @@ async def assign_job_service(
 async def update_job_status(
     job_service_id: str,
     request: UpdateJobStatusRequest,
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "staff"]))
 ):
     """Update job service status (Admin and assigned Staff only)"""
     try:
-        service = JobServiceService()
         job_service = await service.update_job_status(
             job_service_id=job_service_id,
             status=request.status,
@@ -97,12 +108,12 @@ async def update_job_status(
 async def add_work_notes(
     job_service_id: str,
     request: AddNotesRequest,
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "staff"]))
 ):
     """Add work notes to job service (Admin and assigned Staff only)"""
     try:
-        service = JobServiceService()
         job_service = await service.add_work_notes(
             job_service_id=job_service_id,
             notes=request.notes,
@@ -117,12 +128,12 @@ async def add_work_notes(
 @router.get("/{job_service_id}", response_model=JobService)
 async def get_job_service(
     job_service_id: str,
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "staff", "tenant"]))
 ):
     """Get job service by ID"""
     try:
-        service = JobServiceService()
         job_service = await service.get_job_service(job_service_id)
         if not job_service:
             raise HTTPException(status_code=404, detail="Job service not found")
@@ -130,48 +141,84 @@ async def get_job_service(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get job service: {str(e)}")
 
-@router.get("/staff/{staff_id}", response_model=List[JobService])
+@router.get("/staff/{staff_id}", response_model=JobServiceListResponse, response_model_exclude_unset=True)
 async def get_job_services_by_staff(
     staff_id: str,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "staff"]))
 ):
-    """Get all job services assigned to a staff member"""
+    """Get job services assigned to a staff member, one page at a time"""
     try:
         # Staff can only view their own assignments, admins can view any
         user_role = current_user.get("role")
         if user_role == "staff" and current_user["uid"] != staff_id:
             raise HTTPException(status_code=403, detail="Staff can only view their own assignments")
         
-        service = JobServiceService()
-        job_services = await service.get_job_services_by_staff(staff_id)
-        return job_services
+        selected = parse_fields(fields, JobService.model_fields)
+        job_services, next_cursor = await service.list_job_services(assigned_to=staff_id, page_size=page_size, cursor=cursor, fields=selected)
+        return JobServiceListResponse(job_services=job_services, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get job services: {str(e)}")
 
-@router.get("/status/{status}", response_model=List[JobService])
+@router.get("/status/{status}", response_model=JobServiceListResponse, response_model_exclude_unset=True)
 async def get_job_services_by_status(
     status: str,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
-    """Get all job services with specific status (Admin only)"""
+    """Get job services with specific status, one page at a time (Admin only)"""
     try:
-        service = JobServiceService()
-        job_services = await service.get_job_services_by_status(status)
-        return job_services
+        selected = parse_fields(fields, JobService.model_fields)
+        job_services, next_cursor = await service.list_job_services(status=status, page_size=page_size, cursor=cursor, fields=selected)
+        return JobServiceListResponse(job_services=job_services, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get job services: {str(e)}")
 
-@router.get("/", response_model=List[JobService])
+@router.get("/", response_model=JobServiceListResponse, response_model_exclude_unset=True)
 async def get_all_job_services(
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: JobServiceService = Depends(get_job_service_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
-    """Get all job services (Admin only)"""
+    """Get all job services, newest first, one page at a time (Admin only)"""
     try:
-        service = JobServiceService()
-        job_services = await service.get_all_job_services()
-        return job_services
+        selected = parse_fields(fields, JobService.model_fields)
+        job_services, next_cursor = await service.list_job_services(page_size=page_size, cursor=cursor, fields=selected)
+        return JobServiceListResponse(job_services=job_services, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get job services: {str(e)}")
+
+@router.get("/stats/status", response_model=StatusCounts)
+async def get_job_service_status_counts(
+    service: JobServiceService = Depends(get_job_service_service),
+    current_user: dict = Depends(get_current_user),
+    _: None = Depends(require_role(["admin"]))
+):
+    """Count job services per status for the dashboard (Admin only)"""
+    try:
+        return await service.get_status_counts()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get job service counts: {str(e)}")
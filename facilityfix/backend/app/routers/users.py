@@ -1,13 +1,20 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import List, Optional
-from ..models.user import UserResponse, UserRole
+from ..models.user import UserListResponse, UserResponse, UserRole, UserStatistics
 from ..models.database_models import UserProfile
 from ..auth.dependencies import require_admin, require_staff_or_admin, get_current_user
-from ..database.database_service import database_service
+from ..database.database_service import MAX_BATCH_WRITES, database_service
 from ..database.collections import COLLECTIONS
+from ..database.counters import load_counts
+from ..database.unit_of_work import UnitOfWork, unit_of_work
+from ..core.config import settings
+from ..database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from ..models.projection import InvalidFieldsError, parse_fields
 from ..auth.firebase_auth import firebase_auth
+from ..services.identity_resolver import identity_resolver, UserNotFoundError, DuplicateUserIdError
 from pydantic import BaseModel, EmailStr
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+import anyio
 
 router = APIRouter(prefix="/users", tags=["user-management"])
 
@@ -31,16 +38,72 @@ class UserSearchFilters(BaseModel):
     status: Optional[str] = None
     department: Optional[str] = None
 
-@router.get("/", response_model=List[dict])
+async def _update_user_document(doc_id: str, user_doc: dict, update_data: dict,
+                                read_at: Optional[datetime] = None) -> tuple[bool, Optional[str]]:
+    """
+    Update a resolved user, keeping the role/status/building counters in
+    step. ``read_at`` is the update_time ``user_doc`` was read at, if known.
+    """
+    try:
+        async with unit_of_work(database_service) as uow:
+            uow.attach(COLLECTIONS["users"], doc_id, user_doc, read_at)
+            uow.update(COLLECTIONS["users"], doc_id, update_data)
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+async def _sync_auth_status(doc_ids: List[str], profiles: dict, new_status: str) -> int:
+    """
+    Push a status change to Firebase Auth: the account is disabled unless it
+    is active, and the custom claims carry the new status. The profile's
+    claims are merged into the ones the account already has (e.g.
+    tokens_valid_after), and an account whose claims cannot be read is left
+    alone. Calls run in parallel on the auth executor's worker pool.
+
+    Returns:
+        Number of users whose Firebase account could not be updated
+    """
+    failures = 0
+
+    async def _sync(doc_id: str):
+        nonlocal failures
+        profile = profiles[doc_id]
+        try:
+            account = await firebase_auth.get_user(doc_id)
+            if account is None:
+                raise Exception("account could not be read")
+            claims = {
+                **(account.custom_claims or {}),
+                "role": profile.get("role"),
+                "user_id": profile.get("user_id"),
+                "building_id": profile.get("building_id"),
+                "unit_id": profile.get("unit_id"),
+                "department": profile.get("department"),
+                "status": new_status,
+            }
+            await firebase_auth.update_user(doc_id, disabled=new_status != "active", custom_claims=claims)
+        except Exception as e:
+            failures += 1
+            print(f"Warning: could not sync Firebase status for {doc_id}: {e}")
+
+    async with anyio.create_task_group() as tg:
+        for doc_id in doc_ids:
+            tg.start_soon(_sync, doc_id)
+    return failures
+
+@router.get("/", response_model=UserListResponse)
 async def get_users(
     role: Optional[str] = Query(None, description="Filter by user role"),
     building_id: Optional[str] = Query(None, description="Filter by building ID"),
     status: Optional[str] = Query(None, description="Filter by user status"),
     department: Optional[str] = Query(None, description="Filter by department"),
-    limit: Optional[int] = Query(50, description="Maximum number of users to return"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Users per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, deprecated=True, description="Use page_size"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,user_id,first_name,role"),
     current_user: dict = Depends(require_staff_or_admin)
 ):
-    """Get all users with optional filtering"""
+    """Get users with optional filtering, newest first, one page at a time"""
     try:
         # Build filters
         filters = []
@@ -52,25 +115,33 @@ async def get_users(
             filters.append(('status', '==', status))
         if department:
             filters.append(('department', '==', department))
+        page_size = limit or page_size
+        selected = parse_fields(fields, {*UserResponse.model_fields, *UserProfile.model_fields})
         
-        # Query users from Firestore
-        success, users, error = await database_service.query_collection(
+        # Query one page of users from Firestore
+        success, users, next_cursor, error = await database_service.query_page(
             COLLECTIONS['users'], 
             filters=filters if filters else None,
-            limit=limit
+            page_size=page_size,
+            cursor=cursor,
+            fields=selected
         )
         
         if not success:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                status_code=500,
                 detail=f"Failed to retrieve users: {error}"
             )
         
-        return users
+        return UserListResponse(users=users, page_size=page_size, next_cursor=next_cursor)
         
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=500,
             detail=f"Error retrieving users: {str(e)}"
         )
 
@@ -81,27 +152,16 @@ async def get_user(
 ):
     """Get a specific user whose user_id == {user_id} (e.g., T-0001)."""
     try:
-        # 1) Try direct doc-id (in case a doc is actually named T-0001)
-        success, user_data, error = await database_service.get_document(
-            COLLECTIONS["users"], user_id
-        )
-
-        # 2) If not found by doc-id, query by the "user_id" field
-        if not success or not user_data:
-            q_success, docs, q_error = await database_service.query_documents(
-                COLLECTIONS["users"],
-                filters=[("user_id", "==", user_id)],
-                limit=1,
+        # Resolve by user_id (T-0001), Firebase UID or email in a single read
+        try:
+            user_data = await identity_resolver.resolve(user_id)
+        except UserNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User not found: Document '{user_id}' or field user_id == '{user_id}' not found in 'users'"
             )
-            if not q_success or not docs:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"User not found: Document '{user_id}' or field user_id == '{user_id}' not found in 'users'"
-                )
-            user_data = docs[0]
-
-        # (Optional) include Firestore doc id if your wrapper returns it
-        # user_data.setdefault("_doc_id", user_data.get("_doc_id"))
+        except DuplicateUserIdError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
         # Attach Firebase Auth info (by email first, fallback to Firebase UID in 'id')
         try:
@@ -161,54 +221,28 @@ async def update_user(
         update_data["updated_at"] = datetime.now(timezone.utc)
 
         # ── Resolve the actual Firestore document id ───────────────────────────
-        target_doc_id = None
-
-        # 1) If a document is literally named T-0001, allow updating it
-        by_id_ok, by_id_doc, _ = await database_service.get_document(
-            COLLECTIONS["users"], user_id
-        )
-        if by_id_ok and by_id_doc:
-            target_doc_id = user_id
-        else:
-            # 2) Otherwise query by the 'user_id' field
-            q_ok, docs, q_err = await database_service.query_documents(
-                COLLECTIONS["users"],
-                filters=[("user_id", "==", user_id)],
-                limit=2,
+        try:
+            user_doc, read_at = await identity_resolver.resolve_versioned(user_id)
+        except UserNotFoundError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        except DuplicateUserIdError as e:
+            # Safety: enforce uniqueness of user_id before writing
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        target_doc_id = identity_resolver.doc_id_of(user_doc)
+        if not target_doc_id:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Resolved user document has no Firestore id."
             )
-            if not q_ok:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Query failed: {q_err}"
-                )
-            if not docs:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"User not found for user_id '{user_id}'."
-                )
-            if len(docs) > 1:
-                # Safety: enforce uniqueness of user_id before writing
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail=f"Multiple users found with user_id '{user_id}'. Please resolve duplicates."
-                )
-
-            target_doc_id = docs[0].get("_doc_id") or docs[0].get("id")
-            if not target_doc_id:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Resolved user document has no Firestore id."
-                )
 
         # ── Perform the update using the resolved doc id ───────────────────────
-        success, error = await database_service.update_document(
-            COLLECTIONS["users"], target_doc_id, update_data
-        )
+        success, error = await _update_user_document(target_doc_id, user_doc, update_data, read_at)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Failed to update user: {error}"
             )
+        identity_resolver.forget(target_doc_id)
 
         return {
             "message": "User updated successfully",
@@ -242,44 +276,27 @@ async def update_user_status(
             )
 
         # Resolve the actual Firestore document id
-        target_doc_id = None
-        user_doc = None
-
-        by_id_ok, by_id_doc, _ = await database_service.get_document(
-            COLLECTIONS["users"], user_id
-        )
-        if by_id_ok and by_id_doc:
-            target_doc_id = user_id
-            user_doc = by_id_doc
-        else:
-            q_ok, docs, q_err = await database_service.query_documents(
-                COLLECTIONS["users"], filters=[("user_id", "==", user_id)], limit=2
-            )
-            if not q_ok:
-                raise HTTPException(status_code=500, detail=f"Query failed: {q_err}")
-            if not docs:
-                raise HTTPException(status_code=404, detail=f"User not found for user_id '{user_id}'.")
-            if len(docs) > 1:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Multiple users found with user_id '{user_id}'. Please resolve duplicates."
-                )
-            user_doc = docs[0]
-            target_doc_id = user_doc.get("_doc_id") or user_doc.get("id")
+        try:
+            user_doc, read_at = await identity_resolver.resolve_versioned(user_id)
+        except UserNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except DuplicateUserIdError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        target_doc_id = identity_resolver.doc_id_of(user_doc)
 
         update_data = {
             "status": status_update.status,
             "updated_at": datetime.now(timezone.utc),
         }
 
-        success, err = await database_service.update_document(
-            COLLECTIONS["users"], target_doc_id, update_data
-        )
+        success, err = await _update_user_document(target_doc_id, user_doc, update_data, read_at)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Failed to update user status: {err}"
             )
+        identity_resolver.forget(target_doc_id)
+        auth_failures = await _sync_auth_status([target_doc_id], {target_doc_id: user_doc}, status_update.status)
 
         return {
             "message": f"User status updated to {status_update.status}",
@@ -287,6 +304,7 @@ async def update_user_status(
             "doc_id": target_doc_id,
             "previous_status": user_doc.get("status") if isinstance(user_doc, dict) else None,
             "new_status": status_update.status,
+            "auth_sync_failures": auth_failures,
         }
 
     except HTTPException:
@@ -305,42 +323,30 @@ async def delete_user(
 ):
     """Deactivate or permanently delete the user whose user_id == {user_id} (e.g., T-0001)."""
     try:
-        # ── Resolve Firestore doc id by doc-id first, then by user_id field ──
-        target_doc_id = None
-        user_doc = None
-
-        by_id_ok, by_id_doc, _ = await database_service.get_document(
-            COLLECTIONS["users"], user_id
-        )
-        if by_id_ok and by_id_doc:
-            target_doc_id = user_id
-            user_doc = by_id_doc
-        else:
-            q_ok, docs, q_err = await database_service.query_documents(
-                COLLECTIONS["users"], filters=[("user_id", "==", user_id)], limit=2
-            )
-            if not q_ok:
-                raise HTTPException(status_code=500, detail=f"Query failed: {q_err}")
-            if not docs:
-                raise HTTPException(status_code=404, detail=f"User not found for user_id '{user_id}'.")
-            if len(docs) > 1:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Multiple users found with user_id '{user_id}'. Please resolve duplicates first."
-                )
-            user_doc = docs[0]
-            target_doc_id = user_doc.get("_doc_id") or user_doc.get("id")
+        # ── Resolve Firestore doc id from the user_id, UID or email ──
+        try:
+            user_doc, read_at = await identity_resolver.resolve_versioned(user_id)
+        except UserNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except DuplicateUserIdError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        target_doc_id = identity_resolver.doc_id_of(user_doc)
 
         # ── Permanent delete ───────────────────────────────────────────────────
         if permanent:
-            success, err = await database_service.delete_document(
-                COLLECTIONS["users"], target_doc_id
-            )
+            try:
+                async with unit_of_work(database_service) as uow:
+                    uow.attach(COLLECTIONS["users"], target_doc_id, user_doc, read_at)
+                    uow.delete(COLLECTIONS["users"], target_doc_id)
+                success, err = True, None
+            except Exception as e:
+                success, err = False, str(e)
             if not success:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Failed to delete user: {err}"
                 )
+            identity_resolver.forget(target_doc_id)
 
             # Best-effort: also delete from Firebase Auth (by UID or email)
             try:
@@ -362,16 +368,17 @@ async def delete_user(
             "status": "inactive",
             "updated_at": datetime.now(timezone.utc),
         }
-        success, err = await database_service.update_document(
-            COLLECTIONS["users"], target_doc_id, update_data
-        )
+        success, err = await _update_user_document(target_doc_id, user_doc, update_data, read_at)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Failed to deactivate user: {err}"
             )
+        identity_resolver.forget(target_doc_id)
+        auth_failures = await _sync_auth_status([target_doc_id], {target_doc_id: user_doc}, "inactive")
 
-        return {"message": "User deactivated", "user_id": user_id, "doc_id": target_doc_id}
+        return {"message": "User deactivated", "user_id": user_id, "doc_id": target_doc_id,
+                "auth_sync_failures": auth_failures}
 
     except HTTPException:
         raise
@@ -390,7 +397,7 @@ async def change_user_password(
     """Change user password (Admin only)"""
     try:
         # Update password in Firebase Auth
-        firebase_auth.update_user(user_id, password=password_change.new_password)
+        await firebase_auth.update_user(user_id, password=password_change.new_password)
         
         return {"message": "Password updated successfully", "user_id": user_id}
         
@@ -400,46 +407,41 @@ async def change_user_password(
             detail=f"Failed to update password: {str(e)}"
         )
 
-@router.get("/stats/overview")
+@router.get("/stats/overview", response_model=UserStatistics)
 async def get_user_statistics(
     current_user: dict = Depends(require_admin)
 ):
     """Get user statistics overview"""
     try:
-        # Get all users
-        success, all_users, error = await database_service.query_collection(COLLECTIONS['users'])
+        since = datetime.utcnow() - timedelta(days=30)
         
+        # Maintained counters cost one query; they are built from a scan of
+        # the users on first use, so every building_id is counted either way
+        success, counters, error = await load_counts(database_service, COLLECTIONS['users'])
+        if success:
+            success, recent, error = await database_service.aggregate_documents(
+                COLLECTIONS['users'], [('created_at', '>=', since)]
+            )
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to retrieve user statistics: {error}"
             )
         
-        # Calculate statistics
-        total_users = len(all_users)
-        role_counts = {}
-        status_counts = {}
-        building_counts = {}
+        total_users = counters["total"]
         
-        for user in all_users:
-            # Count by role
-            role = user.get('role', 'unknown')
-            role_counts[role] = role_counts.get(role, 0) + 1
-            
-            # Count by status
-            status = user.get('status', 'unknown')
-            status_counts[status] = status_counts.get(status, 0) + 1
-            
-            # Count by building
-            building_id = user.get('building_id', 'unassigned')
-            building_counts[building_id] = building_counts.get(building_id, 0) + 1
+        def _with_remainder(group: dict, remainder: str) -> dict:
+            # Users without a value are in no group
+            missing = total_users - sum(group.values())
+            return {**group, remainder: missing} if missing > 0 else group
         
-        return {
-            "total_users": total_users,
-            "by_role": role_counts,
-            "by_status": status_counts,
-            "by_building": building_counts
-        }
+        return UserStatistics(
+            total_users=total_users,
+            by_role=_with_remainder(counters.get("by_role", {}), "unknown"),
+            by_status=_with_remainder(counters.get("by_status", {}), "unknown"),
+            by_building=_with_remainder(counters.get("by_building_id", {}), "unassigned"),
+            recent_registrations=recent.get("count", 0)
+        )
         
     except HTTPException:
         raise
@@ -464,37 +466,70 @@ async def bulk_update_user_status(
                 detail=f"Invalid status. Must be one of: {valid_statuses}"
             )
         
-        results = []
         update_data = {
             'status': new_status,
             'updated_at': datetime.utcnow()
         }
         
-        for user_id in user_ids:
+        # Read every user in batched calls; the current status is needed to
+        # move the status counters, and the update_time makes each write
+        # conditional on it
+        success, versions, error = await database_service.get_versions(COLLECTIONS['users'], user_ids)
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to read users: {error}"
+            )
+        found = {user_id: user_doc for user_id, (user_doc, _) in versions.items() if user_doc is not None}
+        
+        # Write in batches (leaving room for the counter increment in each),
+        # a few batches at a time
+        errors = {}
+        chunk_size = MAX_BATCH_WRITES - 1
+        doc_ids = list(found)
+        limiter = anyio.CapacityLimiter(max(1, settings.FIRESTORE_BULK_CONCURRENCY))
+        
+        async def _write_chunk(chunk: List[str]):
+            uow = UnitOfWork(database_service)
             try:
-                success, error = await database_service.update_document(
-                    COLLECTIONS['users'],
-                    user_id,
-                    update_data
-                )
-                
-                results.append({
-                    "user_id": user_id,
-                    "success": success,
-                    "error": error if not success else None
-                })
+                for doc_id in chunk:
+                    uow.attach(COLLECTIONS['users'], doc_id, found[doc_id], versions[doc_id][1])
+                    uow.update(COLLECTIONS['users'], doc_id, update_data)
+                async with limiter:
+                    chunk_success, chunk_error = await uow.commit()
             except Exception as e:
-                results.append({
-                    "user_id": user_id,
-                    "success": False,
-                    "error": str(e)
-                })
+                chunk_success, chunk_error = False, str(e)
+            if not chunk_success:
+                errors.update({doc_id: chunk_error for doc_id in chunk})
+        
+        async with anyio.create_task_group() as tg:
+            for start in range(0, len(doc_ids), chunk_size):
+                tg.start_soon(_write_chunk, doc_ids[start:start + chunk_size])
+        
+        # Mirror the new status into Firebase Auth on the auth worker pool
+        updated = [doc_id for doc_id in doc_ids if doc_id not in errors]
+        auth_failures = await _sync_auth_status(updated, found, new_status)
+        for doc_id in updated:
+            identity_resolver.forget(doc_id)
+        
+        results = []
+        for user_id in user_ids:
+            if user_id not in found:
+                error = f"Document {user_id} not found in {COLLECTIONS['users']}"
+            else:
+                error = errors.get(user_id)
+            results.append({
+                "user_id": user_id,
+                "success": error is None,
+                "error": error
+            })
         
         successful_updates = sum(1 for r in results if r["success"])
         
         return {
             "message": f"Bulk update completed. {successful_updates}/{len(user_ids)} users updated.",
             "new_status": new_status,
+            "auth_sync_failures": auth_failures,
             "results": results
         }
         
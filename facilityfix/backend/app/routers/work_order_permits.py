@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
-from app.models.database_models import WorkOrderPermit
+from app.models.database_models import WorkOrderPermit, StatusCounts
 from app.services.work_order_permit_service import WorkOrderPermitService
+from app.core.container import get_work_order_permit_service
 from app.auth.dependencies import get_current_user, require_role
+from app.database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursorError
+from app.models.projection import InvalidFieldsError, parse_fields, partial_model
 
 router = APIRouter(prefix="/work-order-permits", tags=["work-order-permits"])
 
@@ -31,15 +34,23 @@ class UpdatePermitStatusRequest(BaseModel):
     status: str
     notes: Optional[str] = None
 
+# Response Models
+PartialWorkOrderPermit = partial_model(WorkOrderPermit)
+
+class WorkOrderPermitListResponse(BaseModel):
+    permits: List[PartialWorkOrderPermit]
+    page_size: int
+    next_cursor: Optional[str] = None
+
 @router.post("/", response_model=WorkOrderPermit)
 async def create_work_order_permit(
     request: CreateWorkOrderPermitRequest,
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["tenant"]))
 ):
     """Create a new work order permit request (Tenant only)"""
     try:
-        service = WorkOrderPermitService()
         permit = await service.create_work_order_permit(
             concern_slip_id=request.concern_slip_id,
             requested_by=current_user["uid"],
@@ -55,12 +66,12 @@ async def create_work_order_permit(
 async def approve_permit(
     permit_id: str,
     request: ApprovePermitRequest,
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
     """Approve work order permit (Admin only)"""
     try:
-        service = WorkOrderPermitService()
         permit = await service.approve_permit(
             permit_id=permit_id,
             approved_by=current_user["uid"],
@@ -76,12 +87,12 @@ async def approve_permit(
 async def deny_permit(
     permit_id: str,
     request: DenyPermitRequest,
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
     """Deny work order permit (Admin only)"""
     try:
-        service = WorkOrderPermitService()
         permit = await service.deny_permit(
             permit_id=permit_id,
             denied_by=current_user["uid"],
@@ -97,12 +108,12 @@ async def deny_permit(
 async def update_permit_status(
     permit_id: str,
     request: UpdatePermitStatusRequest,
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
     """Update work order permit status (Admin only)"""
     try:
-        service = WorkOrderPermitService()
         permit = await service.update_permit_status(
             permit_id=permit_id,
             status=request.status,
@@ -118,12 +129,12 @@ async def update_permit_status(
 @router.patch("/{permit_id}/start-work", response_model=WorkOrderPermit)
 async def start_work(
     permit_id: str,
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "tenant"]))
 ):
     """Mark work as started (updates actual start date)"""
     try:
-        service = WorkOrderPermitService()
         permit = await service.start_work(
             permit_id=permit_id,
             started_by=current_user["uid"]
@@ -137,12 +148,12 @@ async def start_work(
 @router.get("/{permit_id}", response_model=WorkOrderPermit)
 async def get_work_order_permit(
     permit_id: str,
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "tenant"]))
 ):
     """Get work order permit by ID"""
     try:
-        service = WorkOrderPermitService()
         permit = await service.get_work_order_permit(permit_id)
         if not permit:
             raise HTTPException(status_code=404, detail="Work order permit not found")
@@ -157,62 +168,104 @@ async def get_work_order_permit(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get work order permit: {str(e)}")
 
-@router.get("/tenant/{tenant_id}", response_model=List[WorkOrderPermit])
+@router.get("/tenant/{tenant_id}", response_model=WorkOrderPermitListResponse, response_model_exclude_unset=True)
 async def get_permits_by_tenant(
     tenant_id: str,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin", "tenant"]))
 ):
-    """Get all work order permits for a tenant"""
+    """Get work order permits for a tenant, newest first, one page at a time"""
     try:
         # Tenants can only view their own permits
         if current_user.get("role") == "tenant" and current_user["uid"] != tenant_id:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        service = WorkOrderPermitService()
-        permits = await service.get_permits_by_tenant(tenant_id)
-        return permits
+        selected = parse_fields(fields, WorkOrderPermit.model_fields)
+        permits, next_cursor = await service.list_permits(requested_by=tenant_id, page_size=page_size, cursor=cursor, fields=selected)
+        return WorkOrderPermitListResponse(permits=permits, page_size=page_size, next_cursor=next_cursor)
     except HTTPException:
         raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get permits: {str(e)}")
 
-@router.get("/status/{status}", response_model=List[WorkOrderPermit])
+@router.get("/status/{status}", response_model=WorkOrderPermitListResponse, response_model_exclude_unset=True)
 async def get_permits_by_status(
     status: str,
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
-    """Get all work order permits with specific status (Admin only)"""
+    """Get work order permits with specific status, one page at a time (Admin only)"""
     try:
-        service = WorkOrderPermitService()
-        permits = await service.get_permits_by_status(status)
-        return permits
+        selected = parse_fields(fields, WorkOrderPermit.model_fields)
+        permits, next_cursor = await service.list_permits(status=status, page_size=page_size, cursor=cursor, fields=selected)
+        return WorkOrderPermitListResponse(permits=permits, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get permits: {str(e)}")
 
-@router.get("/pending/all", response_model=List[WorkOrderPermit])
+@router.get("/pending/all", response_model=WorkOrderPermitListResponse, response_model_exclude_unset=True)
 async def get_pending_permits(
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
-    """Get all pending work order permits (Admin only)"""
+    """Get pending work order permits, one page at a time (Admin only)"""
     try:
-        service = WorkOrderPermitService()
-        permits = await service.get_pending_permits()
-        return permits
+        selected = parse_fields(fields, WorkOrderPermit.model_fields)
+        permits, next_cursor = await service.list_permits(status="pending", page_size=page_size, cursor=cursor, fields=selected)
+        return WorkOrderPermitListResponse(permits=permits, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get pending permits: {str(e)}")
 
-@router.get("/", response_model=List[WorkOrderPermit])
+@router.get("/", response_model=WorkOrderPermitListResponse, response_model_exclude_unset=True)
 async def get_all_permits(
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,status"),
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
     current_user: dict = Depends(get_current_user),
     _: None = Depends(require_role(["admin"]))
 ):
-    """Get all work order permits (Admin only)"""
+    """Get all work order permits, newest first, one page at a time (Admin only)"""
     try:
-        service = WorkOrderPermitService()
-        permits = await service.get_all_permits()
-        return permits
+        selected = parse_fields(fields, WorkOrderPermit.model_fields)
+        permits, next_cursor = await service.list_permits(page_size=page_size, cursor=cursor, fields=selected)
+        return WorkOrderPermitListResponse(permits=permits, page_size=page_size, next_cursor=next_cursor)
+    except HTTPException:
+        raise
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get permits: {str(e)}")
+
+@router.get("/stats/status", response_model=StatusCounts)
+async def get_permit_status_counts(
+    service: WorkOrderPermitService = Depends(get_work_order_permit_service),
+    current_user: dict = Depends(get_current_user),
+    _: None = Depends(require_role(["admin"]))
+):
+    """Count work order permits per status for the dashboard (Admin only)"""
+    try:
+        return await service.get_status_counts()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get permit counts: {str(e)}")
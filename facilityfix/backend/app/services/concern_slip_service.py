@@ -1,147 +1,198 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from datetime import datetime
-from app.models.database_models import ConcernSlip, Notification
-from app.database.database_service import DatabaseService, database_service
+from pydantic import BaseModel
+from app.models.database_models import ConcernSlip, StatusCounts
+from app.models.projection import partial_model
+from app.database.database_service import database_service
 from app.database.collections import COLLECTIONS
+from app.database.counters import load_counts
+from app.database.unit_of_work import UnitOfWork, unit_of_work
 import uuid
 
 class ConcernSlipService:
-    def __init__(self):
-        self.db = DatabaseService()
+    def __init__(self, db=None):
+        self.db = db or database_service
 
-    async def create_concern_slip(self, reported_by: str, concern_data: dict) -> ConcernSlip:
+    async def create_concern_slip(self, reported_by: str, concern_data: dict,
+                                  uow: Optional[UnitOfWork] = None) -> ConcernSlip:
         """Create a new concern slip - the entry point for repair/maintenance issues"""
 
-        # Fetch reporter profile from Firestore
-        success, user_profile, error = await database_service.get_document(
-            COLLECTIONS['users'], reported_by
-        )
-        if not success or not user_profile:
-            raise ValueError("Reporter profile not found")
+        async with unit_of_work(self.db, uow) as uow:
+            # Fetch reporter profile from Firestore
+            user_profile = await uow.get(COLLECTIONS['users'], reported_by)
+            if not user_profile:
+                raise ValueError("Reporter profile not found")
 
-        if user_profile.get("role") != "tenant":
-            raise ValueError("Only tenants can submit concern slips")
+            if user_profile.get("role") != "tenant":
+                raise ValueError("Only tenants can submit concern slips")
 
-        concern_slip_data = {
-            "id": str(uuid.uuid4()),
-            "reported_by": reported_by,
-            "title": concern_data["title"],
-            "description": concern_data["description"],
-            "location": concern_data["location"],
-            "category": concern_data["category"],
-            "priority": concern_data.get("priority", "medium"),
-            "unit_id": concern_data.get("unit_id"),
-            "attachments": concern_data.get("attachments", []),
-            "status": "pending",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
+            concern_slip_data = {
+                "id": str(uuid.uuid4()),
+                "reported_by": reported_by,
+                "title": concern_data["title"],
+                "description": concern_data["description"],
+                "location": concern_data["location"],
+                "category": concern_data["category"],
+                "priority": concern_data.get("priority", "medium"),
+                "unit_id": concern_data.get("unit_id"),
+                "attachments": concern_data.get("attachments", []),
+                "status": "pending"
+            }
 
-        # Create concern slip
-        await self.db.create_document("concern_slips", concern_slip_data["id"], concern_slip_data)
+            # Create concern slip
+            uow.create(COLLECTIONS['concern_slips'], concern_slip_data)
 
-        # Send notification to all admins
-        await self._send_admin_notification(
-            concern_slip_data["id"],
-            f"New concern slip submitted: {concern_slip_data['title']}"
-        )
+            # Send notification to all admins
+            await self._send_admin_notification(
+                uow,
+                concern_slip_data["id"],
+                f"New concern slip submitted: {concern_slip_data['title']}"
+            )
+
+            concern_slip = await uow.get(COLLECTIONS['concern_slips'], concern_slip_data["id"])
 
-        return ConcernSlip(**concern_slip_data)
+        return ConcernSlip(**concern_slip)
 
-    async def evaluate_concern_slip(self, concern_slip_id: str, evaluated_by: str, evaluation_data: dict) -> ConcernSlip:
+    async def evaluate_concern_slip(self, concern_slip_id: str, evaluated_by: str, evaluation_data: dict,
+                                    uow: Optional[UnitOfWork] = None) -> ConcernSlip:
         """Evaluate concern slip - approve/reject and determine resolution type"""
 
-        # Verify evaluator is admin
-        success, evaluator_profile, error = await database_service.get_document(
-            COLLECTIONS['users'], evaluated_by
-        )
-        if not success or not evaluator_profile or evaluator_profile.get("role") != "admin":
-            raise ValueError("Only admins can evaluate concern slips")
-
-        # Verify concern slip exists and is pending
-        concern_slip = await self.db.get_document("concern_slips", concern_slip_id)
-        if not concern_slip:
-            raise ValueError("Concern slip not found")
-
-        if concern_slip.get("status") != "pending":
-            raise ValueError("Only pending concern slips can be evaluated")
-
-        update_data = {
-            "status": evaluation_data["status"],
-            "evaluated_by": evaluated_by,
-            "evaluated_at": datetime.utcnow(),
-            "urgency_assessment": evaluation_data.get("urgency_assessment"),
-            "admin_notes": evaluation_data.get("admin_notes"),
-            "updated_at": datetime.utcnow()
-        }
+        async with unit_of_work(self.db, uow) as uow:
+            # Verify evaluator is admin
+            evaluator_profile = await uow.get(COLLECTIONS['users'], evaluated_by)
+            if not evaluator_profile or evaluator_profile.get("role") != "admin":
+                raise ValueError("Only admins can evaluate concern slips")
+
+            # Verify concern slip exists and is pending
+            concern_slip = await uow.get(COLLECTIONS['concern_slips'], concern_slip_id)
+            if not concern_slip:
+                raise ValueError("Concern slip not found")
+
+            if concern_slip.get("status") != "pending":
+                raise ValueError("Only pending concern slips can be evaluated")
+
+            update_data = {
+                "status": evaluation_data["status"],
+                "evaluated_by": evaluated_by,
+                "evaluated_at": datetime.utcnow(),
+                "urgency_assessment": evaluation_data.get("urgency_assessment"),
+                "admin_notes": evaluation_data.get("admin_notes")
+            }
 
-        # Set resolution type if approved
-        if evaluation_data["status"] == "approved":
-            update_data["resolution_type"] = evaluation_data.get("resolution_type")
+            # Set resolution type if approved
+            if evaluation_data["status"] == "approved":
+                update_data["resolution_type"] = evaluation_data.get("resolution_type")
 
-        await self.db.update_document("concern_slips", concern_slip_id, update_data)
+            uow.update(COLLECTIONS['concern_slips'], concern_slip_id, update_data)
 
-        # Send notification to tenant
-        tenant_id = concern_slip.get("reported_by")
-        status_message = "approved" if evaluation_data["status"] == "approved" else "rejected"
-        await self._send_tenant_notification(
-            tenant_id,
-            concern_slip_id,
-            f"Your concern slip has been {status_message}"
-        )
+            # Send notification to tenant
+            tenant_id = concern_slip.get("reported_by")
+            status_message = "approved" if evaluation_data["status"] == "approved" else "rejected"
+            self._send_tenant_notification(
+                uow,
+                tenant_id,
+                concern_slip_id,
+                f"Your concern slip has been {status_message}"
+            )
+
+            updated_concern = await uow.get(COLLECTIONS['concern_slips'], concern_slip_id)
 
-        updated_concern = await self.db.get_document("concern_slips", concern_slip_id)
         return ConcernSlip(**updated_concern)
 
     async def get_concern_slip(self, concern_slip_id: str) -> Optional[ConcernSlip]:
         """Get concern slip by ID"""
-        concern_data = await self.db.get_document("concern_slips", concern_slip_id)
-        return ConcernSlip(**concern_data) if concern_data else None
+        success, concern_data, error = await self.db.get_document(COLLECTIONS['concern_slips'], concern_slip_id)
+        return ConcernSlip(**concern_data) if success and concern_data else None
 
     async def get_concern_slips_by_tenant(self, tenant_id: str) -> List[ConcernSlip]:
         """Get all concern slips submitted by a tenant"""
-        concerns = await self.db.query_documents("concern_slips", {"reported_by": tenant_id})
-        return [ConcernSlip(**concern) for concern in concerns]
+        return await self._query_concern_slips([("reported_by", "==", tenant_id)])
 
     async def get_concern_slips_by_status(self, status: str) -> List[ConcernSlip]:
         """Get all concern slips with specific status"""
-        concerns = await self.db.query_documents("concern_slips", {"status": status})
-        return [ConcernSlip(**concern) for concern in concerns]
+        return await self._query_concern_slips([("status", "==", status)])
 
     async def get_pending_concern_slips(self) -> List[ConcernSlip]:
         """Get all pending concern slips awaiting evaluation"""
-        concerns = await self.db.query_documents("concern_slips", {"status": "pending"})
-        return [ConcernSlip(**concern) for concern in concerns]
+        return await self._query_concern_slips([("status", "==", "pending")])
 
     async def get_approved_concern_slips(self) -> List[ConcernSlip]:
         """Get all approved concern slips ready for resolution"""
-        concerns = await self.db.query_documents("concern_slips", {"status": "approved"})
-        return [ConcernSlip(**concern) for concern in concerns]
-
-    async def get_all_concern_slips(self) -> List[ConcernSlip]:
-        """Get all concern slips (Admin only)"""
-        concerns = await self.db.get_all_documents("concern_slips")
+        return await self._query_concern_slips([("status", "==", "approved")])
+
+    async def get_all_concern_slips(self) -> AsyncIterator[ConcernSlip]:
+        """
+        Iterate over all concern slips (Admin only)
+
+        Documents are read a page at a time (scan_documents), so memory
+        stays constant however large the collection is.
+        """
+        async for concern in self.db.scan_documents(COLLECTIONS['concern_slips']):
+            yield ConcernSlip(**concern)
+
+    async def list_concern_slips(self, reported_by: Optional[str] = None, status: Optional[str] = None,
+                                 page_size: int = 50, cursor: Optional[str] = None,
+                                 fields: Optional[List[str]] = None) -> Tuple[List[BaseModel], Optional[str]]:
+        """
+        Get one page of concern slips, newest first
+
+        Args:
+            fields: Optional projection. Items are always PartialConcernSlip models;
+                without a projection every field is set.
+
+        Returns:
+            Tuple of (items, next_cursor); next_cursor is None on the last page
+        """
+        filters = []
+        if reported_by:
+            filters.append(("reported_by", "==", reported_by))
+        if status:
+            filters.append(("status", "==", status))
+
+        success, concerns, next_cursor, error = await self.db.query_page(
+            COLLECTIONS['concern_slips'], filters or None, page_size=page_size, cursor=cursor,
+            fields=fields
+        )
+        if not success:
+            raise Exception(error)
+        partial = partial_model(ConcernSlip)
+        if fields:
+            return [partial(**concern) for concern in concerns], next_cursor
+        # Validate whole documents against the full schema
+        return [partial(**ConcernSlip(**concern).model_dump()) for concern in concerns], next_cursor
+
+    async def get_status_counts(self) -> StatusCounts:
+        """Number of concern slips per status, read from the sharded dashboard counters"""
+        success, counts, error = await load_counts(self.db, COLLECTIONS['concern_slips'])
+        if not success:
+            raise Exception(error)
+        return StatusCounts(total=counts["total"], by_status=counts.get("by_status", {}))
+
+    async def _query_concern_slips(self, filters: List[tuple] = None) -> List[ConcernSlip]:
+        success, concerns, error = await self.db.query_documents(COLLECTIONS['concern_slips'], filters)
+        if not success:
+            raise Exception(error)
         return [ConcernSlip(**concern) for concern in concerns]
 
-    async def _send_admin_notification(self, concern_slip_id: str, message: str):
+    async def _send_admin_notification(self, uow: UnitOfWork, concern_slip_id: str, message: str):
         """Send notification to all admins"""
         # Get all admin users
-        admin_users = await self.db.query_documents("user_profiles", {"role": "admin"})
+        admin_users = await uow.query(COLLECTIONS['users'], [("role", "==", "admin")])
 
-        for admin in admin_users:
-            notification_data = {
+        uow.create_many(COLLECTIONS['notifications'], [
+            {
                 "id": str(uuid.uuid4()),
-                "recipient_id": admin.get("id"),
+                "recipient_id": admin["_doc_id"],
                 "title": "New Concern Slip",
                 "message": message,
                 "notification_type": "concern_submitted",
                 "related_id": concern_slip_id,
-                "is_read": False,
-                "created_at": datetime.utcnow()
+                "is_read": False
             }
-            await self.db.create_document("notifications", notification_data["id"], notification_data)
+            for admin in admin_users
+        ])
 
-    async def _send_tenant_notification(self, recipient_id: str, concern_slip_id: str, message: str):
+    def _send_tenant_notification(self, uow: UnitOfWork, recipient_id: str, concern_slip_id: str, message: str):
         """Send notification to tenant about concern slip updates"""
         notification_data = {
             "id": str(uuid.uuid4()),
@@ -150,7 +201,6 @@ class ConcernSlipService:
             "message": message,
             "notification_type": "concern_update",
             "related_id": concern_slip_id,
-            "is_read": False,
-            "created_at": datetime.utcnow()
+            "is_read": False
         }
-        await self.db.create_document("notifications", notification_data["id"], notification_data)
+        uow.create(COLLECTIONS['notifications'], notification_data)
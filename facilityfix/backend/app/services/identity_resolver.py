@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import re
+
+from ..core.config import settings
+from ..database.database_service import database_service
+from ..database.collections import COLLECTIONS
+
+# Human user IDs look like T-0001 / S-0001 / A-0001
+USER_ID_PATTERN = re.compile(r"^[A-Z]-\d+$")
+
+
+class UserNotFoundError(ValueError):
+    """No user profile matches the given reference"""
+
+
+class DuplicateUserIdError(ValueError):
+    """More than one user profile carries the same user_id"""
+
+
+class IdentityResolver:
+    """
+    Resolves a user reference (Firebase UID, user_id like T-0001, or email)
+    to its Firestore profile with at most one Firestore read.
+
+    A write-through in-memory index maps user_id <-> uid <-> email. Known
+    references go straight to ``get_document`` on the UID; unknown ones are
+    routed by their shape to a single lookup (doc id, user_id query or
+    email query) instead of trying the doc id first and querying on a miss.
+
+    References match exactly as stored, like the ``==`` query on a miss, so
+    a reference resolves the same whether or not this worker has seen it.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.db = database_service
+        self.max_entries = max_entries
+        # uid -> (user_id, email), kept in LRU order
+        self._by_uid: "OrderedDict[str, Tuple[Optional[str], Optional[str]]]" = OrderedDict()
+        self._uid_by_user_id: Dict[str, str] = {}
+        self._uid_by_email: Dict[str, str] = {}
+
+    @staticmethod
+    def doc_id_of(profile: Dict[str, Any]) -> Optional[str]:
+        """Firestore document id (the Firebase UID) of a resolved profile"""
+        return profile.get("_doc_id") or profile.get("id")
+
+    # ── index maintenance ────────────────────────────────────────────────
+    def remember(self, profile: Dict[str, Any]):
+        """Index a profile that was just read or written"""
+        uid = self.doc_id_of(profile)
+        if not uid:
+            return
+        self.forget(uid)
+
+        user_id = profile.get("user_id")
+        email = profile.get("email") or None
+        self._by_uid[uid] = (user_id, email)
+        if user_id:
+            self._uid_by_user_id[user_id] = uid
+        if email:
+            self._uid_by_email[email] = uid
+
+        while len(self._by_uid) > self.max_entries:
+            self.forget(next(iter(self._by_uid)))
+
+    def forget(self, uid: Optional[str] = None, user_id: Optional[str] = None):
+        """Drop a user from the index (role, status or delete changes)"""
+        if uid is None and user_id is not None:
+            uid = self._uid_by_user_id.get(user_id)
+        if uid is None:
+            return
+        known_user_id, email = self._by_uid.pop(uid, (None, None))
+        if known_user_id and self._uid_by_user_id.get(known_user_id) == uid:
+            del self._uid_by_user_id[known_user_id]
+        if email and self._uid_by_email.get(email) == uid:
+            del self._uid_by_email[email]
+
+    def clear(self):
+        self._by_uid.clear()
+        self._uid_by_user_id.clear()
+        self._uid_by_email.clear()
+
+    def _indexed_uid(self, ref: str) -> Optional[str]:
+        if ref in self._by_uid:
+            uid = ref
+        else:
+            uid = self._uid_by_user_id.get(ref) or self._uid_by_email.get(ref)
+        if uid is not None:
+            self._by_uid.move_to_end(uid)
+        return uid
+
+    # ── lookups ──────────────────────────────────────────────────────────
+    async def resolve(self, ref: str) -> Dict[str, Any]:
+        """
+        Resolve a UID, user_id or email to the user's profile document
+
+        Raises:
+            UserNotFoundError: No profile matches ``ref``
+            DuplicateUserIdError: ``ref`` is a user_id shared by several profiles
+            Exception: The Firestore lookup itself failed
+        """
+        profile, _ = await self.resolve_versioned(ref)
+        return profile
+
+    async def resolve_versioned(self, ref: str) -> Tuple[Dict[str, Any], Optional[datetime]]:
+        """
+        ``resolve``, also returning the update_time the profile was read at
+        (None when it came from a query), for UnitOfWork.attach
+        """
+        field = "email" if "@" in ref else "user_id" if USER_ID_PATTERN.match(ref) else None
+        uid = self._indexed_uid(ref)
+        if uid is None and field is not None:
+            return await self._resolve_by_field(field, ref), None
+
+        doc_id = uid or ref
+        profile, update_time = await self._get_profile(doc_id)
+        if field is not None and (profile is None or profile.get(field) != ref):
+            # Stale index entry: the email / user_id now belongs to another
+            # UID (e.g. re-registered through another worker)
+            self.forget(doc_id)
+            return await self._resolve_by_field(field, ref), None
+        if profile is None:
+            raise UserNotFoundError(f"User not found: '{ref}'")
+
+        self.remember(profile)
+        return profile, update_time
+
+    async def _get_profile(self, doc_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[datetime]]:
+        """
+        The profile stored under ``doc_id`` and its update_time, or None
+        (and forgotten) if there is none
+        """
+        success, versions, error = await self.db.get_versions(COLLECTIONS["users"], [doc_id])
+        if not success:
+            raise Exception(f"Lookup failed: {error}")
+        profile, update_time = versions.get(doc_id, (None, None))
+        if profile is None:
+            self.forget(doc_id)
+        return profile, update_time
+
+    async def _resolve_by_field(self, field: str, value: str) -> Dict[str, Any]:
+        success, docs, error = await self.db.query_documents(
+            COLLECTIONS["users"], filters=[(field, "==", value)], limit=2
+        )
+        if not success:
+            raise Exception(f"Query failed: {error}")
+        if not docs:
+            raise UserNotFoundError(f"User not found for {field} '{value}'.")
+        if len(docs) > 1:
+            raise DuplicateUserIdError(
+                f"Multiple users found with {field} '{value}'. Please resolve duplicates."
+            )
+
+        profile = docs[0]
+        self.remember(profile)
+        return profile
+
+    async def resolve_uid(self, ref: str) -> str:
+        """Resolve a reference to a Firebase UID, skipping Firestore when it is indexed"""
+        uid = self._indexed_uid(ref)
+        if uid is not None:
+            return uid
+        return self.doc_id_of(await self.resolve(ref))
+
+
+identity_resolver = IdentityResolver(max_entries=settings.IDENTITY_INDEX_SIZE)
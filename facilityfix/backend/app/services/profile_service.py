@@ -2,7 +2,9 @@ from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 from ..database.database_service import database_service
 from ..database.collections import COLLECTIONS
+from ..database.unit_of_work import unit_of_work
 from ..auth.firebase_auth import firebase_auth
+from .identity_resolver import identity_resolver, UserNotFoundError, DuplicateUserIdError
 import re
 
 class ProfileService:
@@ -15,21 +17,11 @@ class ProfileService:
         Returns the Firestore profile enriched with Firebase Auth data and a completion score.
         """
         try:
-            # 1) Try treating user_ref as a Firestore document id (Firebase UID)
-            ok, profile_data, err = await self.db.get_document(COLLECTIONS["users"], user_ref)
-
-            # 2) If not found, resolve by the user_id field (e.g., T-0001)
-            if not ok or not profile_data:
-                q_ok, docs, q_err = await self.db.query_documents(
-                    COLLECTIONS["users"],
-                    filters=[("user_id", "==", user_ref)],
-                    limit=1,
-                )
-                if not q_ok:
-                    return False, None, q_err
-                if not docs:
-                    return False, None, f"Document {user_ref} not found in users"
-                profile_data = docs[0]  # includes _doc_id if your db wrapper adds it
+            # 1-2) Resolve the Firebase UID or user_id (e.g., T-0001) with a single read
+            try:
+                profile_data = await identity_resolver.resolve(user_ref)
+            except (UserNotFoundError, DuplicateUserIdError):
+                return False, None, f"Document {user_ref} not found in users"
 
             # 3) Enrich with Firebase Auth info (prefer email, fallback to stored UID)
             try:
@@ -132,10 +124,14 @@ class ProfileService:
             if not is_valid:
                 return False, validation_error
             
-            # Get current profile for history
-            success, current_profile, error = await self.db.get_document(COLLECTIONS['users'], user_id)
+            # Get current profile for history, and the update_time the
+            # profile update below is conditional on
+            success, versions, error = await self.db.get_versions(COLLECTIONS['users'], [user_id])
             if not success:
                 return False, f"Could not retrieve current profile: {error}"
+            current_profile, read_at = versions.get(user_id, (None, None))
+            if current_profile is None:
+                return False, f"Could not retrieve current profile: Document {user_id} not found in {COLLECTIONS['users']}"
             
             # Create history entry
             history_entry = {
@@ -154,12 +150,14 @@ class ProfileService:
                         history_entry['changes'][field] = new_value
                         history_entry['previous_values'][field] = old_value
             
-            # Update profile
+            # Update profile (and the building/role/status counters)
             update_data['updated_at'] = datetime.utcnow()
-            success, error = await self.db.update_document(COLLECTIONS['users'], user_id, update_data)
-            
-            if not success:
-                return False, error
+            try:
+                async with unit_of_work(self.db) as uow:
+                    uow.attach(COLLECTIONS['users'], user_id, current_profile, read_at)
+                    uow.update(COLLECTIONS['users'], user_id, update_data)
+            except Exception as e:
+                return False, str(e)
             
             # Save history if there were changes
             if history_entry['changes']:
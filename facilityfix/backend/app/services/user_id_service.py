@@ -1,7 +1,10 @@
 from ..database.database_service import database_service
+from ..database.sequence_allocator import SequenceAllocator
 from ..database.collections import COLLECTIONS
 from ..models.user import UserRole
-import asyncio
+from ..core.config import settings
+
+sequence_allocator = SequenceAllocator(database_service, block_size=settings.USER_ID_BLOCK_SIZE)
 
 class UserIdService:
     @staticmethod
@@ -16,7 +19,18 @@ class UserIdService:
     
     @staticmethod
     async def generate_user_id(role: UserRole) -> str:
-        """Generate next available user ID for the role"""
+        """Generate next available user ID for the role (O(1) from a leased block)"""
+        prefix = UserIdService.get_role_prefix(role)
+
+        async def _seed() -> int:
+            return await UserIdService._find_max_number(role) + 1
+
+        next_number = await sequence_allocator.next_value(f"user_id_{prefix}", seed=_seed)
+        return f"{prefix}-{next_number:04d}"
+    
+    @staticmethod
+    async def _find_max_number(role: UserRole) -> int:
+        """Scan existing users of a role for the highest number (only used to seed the counter)"""
         prefix = UserIdService.get_role_prefix(role)
         
         # Get all users with this role to find the highest number
@@ -26,8 +40,7 @@ class UserIdService:
         )
         
         if not success:
-            # If query fails, start from 1
-            return f"{prefix}-0001"
+            raise Exception(f"Could not seed user ID counter: {error}")
         
         # Find the highest existing number for this role
         max_number = 0
@@ -40,9 +53,7 @@ class UserIdService:
                 except (IndexError, ValueError):
                     continue
         
-        # Generate next number
-        next_number = max_number + 1
-        return f"{prefix}-{next_number:04d}"
+        return max_number
     
     @staticmethod
     def parse_building_unit(building_unit: str) -> tuple:
@@ -1,135 +1,141 @@
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from datetime import datetime
-from app.models.database_models import WorkOrderPermit, UserProfile, ConcernSlip, Notification
-from app.database.database_service import DatabaseService
-from app.services.user_id_service import UserIdService
+from pydantic import BaseModel
+from app.models.database_models import WorkOrderPermit, StatusCounts
+from app.models.projection import partial_model
+from app.database.database_service import database_service
+from app.database.collections import COLLECTIONS
+from app.database.counters import load_counts
+from app.database.unit_of_work import UnitOfWork, unit_of_work
 import uuid
 
 class WorkOrderPermitService:
-    def __init__(self):
-        self.db = DatabaseService()
-        self.user_service = UserIdService()
+    def __init__(self, db=None):
+        self.db = db or database_service
 
-    async def create_work_order_permit(self, concern_slip_id: str, requested_by: str, permit_data: dict) -> WorkOrderPermit:
+    async def create_work_order_permit(self, concern_slip_id: str, requested_by: str, permit_data: dict,
+                                       uow: Optional[UnitOfWork] = None) -> WorkOrderPermit:
         """Create a new work order permit for external worker authorization"""
-        
-        # Verify concern slip exists and is approved
-        concern_slip = await self.db.get_document("concern_slips", concern_slip_id)
-        if not concern_slip:
-            raise ValueError("Concern slip not found")
-        
-        if concern_slip.get("status") != "approved":
-            raise ValueError("Concern slip must be approved before creating work order permit")
-        
-        # Verify requester is tenant and owns the unit
-        requester_profile = await self.user_service.get_user_profile(requested_by)
-        if not requester_profile or requester_profile.role != "tenant":
-            raise ValueError("Only tenants can request work order permits")
-
-        permit_data_complete = {
-            "id": str(uuid.uuid4()),
-            "concern_slip_id": concern_slip_id,
-            "requested_by": requested_by,
-            "unit_id": permit_data["unit_id"],
-            "contractor_name": permit_data["contractor_name"],
-            "contractor_contact": permit_data["contractor_contact"],
-            "contractor_company": permit_data.get("contractor_company"),
-            "work_description": permit_data["work_description"],
-            "proposed_start_date": permit_data["proposed_start_date"],
-            "estimated_duration": permit_data["estimated_duration"],
-            "specific_instructions": permit_data["specific_instructions"],
-            "entry_requirements": permit_data.get("entry_requirements"),
-            "status": "pending",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
 
-        # Create work order permit
-        await self.db.create_document("work_order_permits", permit_data_complete["id"], permit_data_complete)
-        
-        # Update concern slip status
-        await self.db.update_document("concern_slips", concern_slip_id, {
-            "resolution_type": "work_permit",
-            "updated_at": datetime.utcnow()
-        })
-
-        # Send notification to admin for approval
-        await self._send_admin_notification(
-            permit_data_complete["id"],
-            f"New work order permit request from {requester_profile.first_name} {requester_profile.last_name}"
-        )
+        async with unit_of_work(self.db, uow) as uow:
+            # Verify concern slip exists and is approved
+            concern_slip = await uow.get(COLLECTIONS['concern_slips'], concern_slip_id)
+            if not concern_slip:
+                raise ValueError("Concern slip not found")
+
+            if concern_slip.get("status") != "approved":
+                raise ValueError("Concern slip must be approved before creating work order permit")
+
+            # Verify requester is tenant and owns the unit
+            requester_profile = await uow.get(COLLECTIONS['users'], requested_by)
+            if not requester_profile or requester_profile.get("role") != "tenant":
+                raise ValueError("Only tenants can request work order permits")
+
+            permit_data_complete = {
+                "id": str(uuid.uuid4()),
+                "concern_slip_id": concern_slip_id,
+                "requested_by": requested_by,
+                "unit_id": permit_data["unit_id"],
+                "contractor_name": permit_data["contractor_name"],
+                "contractor_contact": permit_data["contractor_contact"],
+                "contractor_company": permit_data.get("contractor_company"),
+                "work_description": permit_data["work_description"],
+                "proposed_start_date": permit_data["proposed_start_date"],
+                "estimated_duration": permit_data["estimated_duration"],
+                "specific_instructions": permit_data["specific_instructions"],
+                "entry_requirements": permit_data.get("entry_requirements"),
+                "status": "pending"
+            }
+
+            # Create work order permit
+            uow.create(COLLECTIONS['work_order_permits'], permit_data_complete)
+
+            # Update concern slip status
+            uow.update(COLLECTIONS['concern_slips'], concern_slip_id, {
+                "resolution_type": "work_permit"
+            })
+
+            # Send notification to admin for approval
+            await self._send_admin_notification(
+                uow,
+                permit_data_complete["id"],
+                f"New work order permit request from {requester_profile.get('first_name', '')} {requester_profile.get('last_name', '')}"
+            )
 
-        return WorkOrderPermit(**permit_data_complete)
+            permit = await uow.get(COLLECTIONS['work_order_permits'], permit_data_complete["id"])
 
-    async def approve_permit(self, permit_id: str, approved_by: str, conditions: Optional[str] = None) -> WorkOrderPermit:
+        return WorkOrderPermit(**permit)
+
+    async def approve_permit(self, permit_id: str, approved_by: str, conditions: Optional[str] = None,
+                             uow: Optional[UnitOfWork] = None) -> WorkOrderPermit:
         """Approve work order permit (Admin only)"""
-        
-        # Verify approver is admin
-        approver_profile = await self.user_service.get_user_profile(approved_by)
-        if not approver_profile or approver_profile.role != "admin":
-            raise ValueError("Only admins can approve work order permits")
 
         update_data = {
             "status": "approved",
             "approved_by": approved_by,
             "approval_date": datetime.utcnow(),
-            "permit_conditions": conditions,
-            "updated_at": datetime.utcnow()
+            "permit_conditions": conditions
         }
-
-        await self.db.update_document("work_order_permits", permit_id, update_data)
-        
-        # Send notification to tenant
-        permit = await self.db.get_document("work_order_permits", permit_id)
-        await self._send_tenant_notification(
-            permit.get("requested_by"),
-            permit_id,
-            "Your work order permit has been approved"
+        return await self._decide_permit(
+            permit_id, approved_by, update_data,
+            "Only admins can approve work order permits",
+            "Your work order permit has been approved",
+            uow
         )
 
-        updated_permit = await self.db.get_document("work_order_permits", permit_id)
-        return WorkOrderPermit(**updated_permit)
-
-    async def deny_permit(self, permit_id: str, denied_by: str, reason: str) -> WorkOrderPermit:
+    async def deny_permit(self, permit_id: str, denied_by: str, reason: str,
+                          uow: Optional[UnitOfWork] = None) -> WorkOrderPermit:
         """Deny work order permit (Admin only)"""
-        
-        # Verify denier is admin
-        denier_profile = await self.user_service.get_user_profile(denied_by)
-        if not denier_profile or denier_profile.role != "admin":
-            raise ValueError("Only admins can deny work order permits")
 
         update_data = {
             "status": "denied",
             "approved_by": denied_by,  # Track who made the decision
             "approval_date": datetime.utcnow(),
-            "denial_reason": reason,
-            "updated_at": datetime.utcnow()
+            "denial_reason": reason
         }
-
-        await self.db.update_document("work_order_permits", permit_id, update_data)
-        
-        # Send notification to tenant
-        permit = await self.db.get_document("work_order_permits", permit_id)
-        await self._send_tenant_notification(
-            permit.get("requested_by"),
-            permit_id,
-            f"Your work order permit has been denied. Reason: {reason}"
+        return await self._decide_permit(
+            permit_id, denied_by, update_data,
+            "Only admins can deny work order permits",
+            f"Your work order permit has been denied. Reason: {reason}",
+            uow
         )
 
-        updated_permit = await self.db.get_document("work_order_permits", permit_id)
+    async def _decide_permit(self, permit_id: str, admin_id: str, update_data: dict,
+                             forbidden_message: str, tenant_message: str,
+                             uow: Optional[UnitOfWork]) -> WorkOrderPermit:
+        async with unit_of_work(self.db, uow) as uow:
+            # Verify decision maker is admin
+            admin_profile = await uow.get(COLLECTIONS['users'], admin_id)
+            if not admin_profile or admin_profile.get("role") != "admin":
+                raise ValueError(forbidden_message)
+
+            permit = await uow.get(COLLECTIONS['work_order_permits'], permit_id)
+            if not permit:
+                raise ValueError("Work order permit not found")
+
+            uow.update(COLLECTIONS['work_order_permits'], permit_id, update_data)
+
+            # Send notification to tenant
+            self._send_tenant_notification(
+                uow,
+                permit.get("requested_by"),
+                permit_id,
+                tenant_message
+            )
+
+            updated_permit = await uow.get(COLLECTIONS['work_order_permits'], permit_id)
+
         return WorkOrderPermit(**updated_permit)
 
-    async def update_permit_status(self, permit_id: str, status: str, updated_by: str, notes: Optional[str] = None) -> WorkOrderPermit:
+    async def update_permit_status(self, permit_id: str, status: str, updated_by: str, notes: Optional[str] = None,
+                                   uow: Optional[UnitOfWork] = None) -> WorkOrderPermit:
         """Update work order permit status"""
-        
+
         valid_statuses = ["pending", "approved", "denied", "completed"]
         if status not in valid_statuses:
             raise ValueError(f"Invalid status. Must be one of: {valid_statuses}")
 
-        update_data = {
-            "status": status,
-            "updated_at": datetime.utcnow()
-        }
+        update_data = {"status": status}
 
         # Add timestamp for specific status changes
         if status == "completed":
@@ -139,92 +145,144 @@ class WorkOrderPermitService:
         if notes:
             update_data["admin_notes"] = notes
 
-        await self.db.update_document("work_order_permits", permit_id, update_data)
+        async with unit_of_work(self.db, uow) as uow:
+            permit = await uow.get(COLLECTIONS['work_order_permits'], permit_id)
+            if not permit:
+                raise ValueError("Work order permit not found")
 
-        # Send notifications based on status
-        permit = await self.db.get_document("work_order_permits", permit_id)
-        
-        if status == "completed":
-            # Notify tenant of completion
-            await self._send_tenant_notification(
-                permit.get("requested_by"),
-                permit_id,
-                "Your external work has been marked as completed"
-            )
+            uow.update(COLLECTIONS['work_order_permits'], permit_id, update_data)
+
+            # Send notifications based on status
+            if status == "completed":
+                # Notify tenant of completion
+                self._send_tenant_notification(
+                    uow,
+                    permit.get("requested_by"),
+                    permit_id,
+                    "Your external work has been marked as completed"
+                )
+
+            updated_permit = await uow.get(COLLECTIONS['work_order_permits'], permit_id)
 
-        updated_permit = await self.db.get_document("work_order_permits", permit_id)
         return WorkOrderPermit(**updated_permit)
 
-    async def start_work(self, permit_id: str, started_by: str) -> WorkOrderPermit:
+    async def start_work(self, permit_id: str, started_by: str,
+                         uow: Optional[UnitOfWork] = None) -> WorkOrderPermit:
         """Mark work as started (updates actual start date)"""
-        
-        permit = await self.db.get_document("work_order_permits", permit_id)
-        if not permit:
-            raise ValueError("Work order permit not found")
-        
-        if permit.get("status") != "approved":
-            raise ValueError("Work can only be started on approved permits")
 
-        update_data = {
-            "actual_start_date": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
+        async with unit_of_work(self.db, uow) as uow:
+            permit = await uow.get(COLLECTIONS['work_order_permits'], permit_id)
+            if not permit:
+                raise ValueError("Work order permit not found")
 
-        await self.db.update_document("work_order_permits", permit_id, update_data)
+            if permit.get("status") != "approved":
+                raise ValueError("Work can only be started on approved permits")
 
-        # Send notification to admin
-        await self._send_admin_notification(
-            permit_id,
-            f"External work has started for permit {permit_id}"
-        )
+            uow.update(COLLECTIONS['work_order_permits'], permit_id, {
+                "actual_start_date": datetime.utcnow()
+            })
+
+            # Send notification to admin
+            await self._send_admin_notification(
+                uow,
+                permit_id,
+                f"External work has started for permit {permit_id}"
+            )
+
+            updated_permit = await uow.get(COLLECTIONS['work_order_permits'], permit_id)
 
-        updated_permit = await self.db.get_document("work_order_permits", permit_id)
         return WorkOrderPermit(**updated_permit)
 
     async def get_work_order_permit(self, permit_id: str) -> Optional[WorkOrderPermit]:
         """Get work order permit by ID"""
-        permit_data = await self.db.get_document("work_order_permits", permit_id)
-        return WorkOrderPermit(**permit_data) if permit_data else None
+        success, permit_data, error = await self.db.get_document(COLLECTIONS['work_order_permits'], permit_id)
+        return WorkOrderPermit(**permit_data) if success and permit_data else None
 
     async def get_permits_by_tenant(self, tenant_id: str) -> List[WorkOrderPermit]:
         """Get all work order permits requested by a tenant"""
-        permits = await self.db.query_documents("work_order_permits", {"requested_by": tenant_id})
-        return [WorkOrderPermit(**permit) for permit in permits]
+        return await self._query_permits([("requested_by", "==", tenant_id)])
 
     async def get_permits_by_status(self, status: str) -> List[WorkOrderPermit]:
         """Get all work order permits with specific status"""
-        permits = await self.db.query_documents("work_order_permits", {"status": status})
-        return [WorkOrderPermit(**permit) for permit in permits]
+        return await self._query_permits([("status", "==", status)])
 
     async def get_pending_permits(self) -> List[WorkOrderPermit]:
         """Get all pending work order permits (Admin view)"""
-        permits = await self.db.query_documents("work_order_permits", {"status": "pending"})
-        return [WorkOrderPermit(**permit) for permit in permits]
-
-    async def get_all_permits(self) -> List[WorkOrderPermit]:
-        """Get all work order permits (Admin only)"""
-        permits = await self.db.get_all_documents("work_order_permits")
+        return await self._query_permits([("status", "==", "pending")])
+
+    async def get_all_permits(self) -> AsyncIterator[WorkOrderPermit]:
+        """
+        Iterate over all work order permits (Admin only)
+
+        Documents are read a page at a time (scan_documents), so memory
+        stays constant however large the collection is.
+        """
+        async for permit in self.db.scan_documents(COLLECTIONS['work_order_permits']):
+            yield WorkOrderPermit(**permit)
+
+    async def list_permits(self, requested_by: Optional[str] = None, status: Optional[str] = None,
+                           page_size: int = 50, cursor: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> Tuple[List[BaseModel], Optional[str]]:
+        """
+        Get one page of permits, newest first
+
+        Args:
+            fields: Optional projection. Items are always PartialWorkOrderPermit models;
+                without a projection every field is set.
+
+        Returns:
+            Tuple of (items, next_cursor); next_cursor is None on the last page
+        """
+        filters = []
+        if requested_by:
+            filters.append(("requested_by", "==", requested_by))
+        if status:
+            filters.append(("status", "==", status))
+
+        success, permits, next_cursor, error = await self.db.query_page(
+            COLLECTIONS['work_order_permits'], filters or None, page_size=page_size, cursor=cursor,
+            fields=fields
+        )
+        if not success:
+            raise Exception(error)
+        partial = partial_model(WorkOrderPermit)
+        if fields:
+            return [partial(**permit) for permit in permits], next_cursor
+        # Validate whole documents against the full schema
+        return [partial(**WorkOrderPermit(**permit).model_dump()) for permit in permits], next_cursor
+
+    async def get_status_counts(self) -> StatusCounts:
+        """Number of work order permits per status, read from the sharded dashboard counters"""
+        success, counts, error = await load_counts(self.db, COLLECTIONS['work_order_permits'])
+        if not success:
+            raise Exception(error)
+        return StatusCounts(total=counts["total"], by_status=counts.get("by_status", {}))
+
+    async def _query_permits(self, filters: List[tuple] = None) -> List[WorkOrderPermit]:
+        success, permits, error = await self.db.query_documents(COLLECTIONS['work_order_permits'], filters)
+        if not success:
+            raise Exception(error)
         return [WorkOrderPermit(**permit) for permit in permits]
 
-    async def _send_admin_notification(self, permit_id: str, message: str):
+    async def _send_admin_notification(self, uow: UnitOfWork, permit_id: str, message: str):
         """Send notification to all admins"""
         # Get all admin users
-        admin_users = await self.db.query_documents("user_profiles", {"role": "admin"})
-        
-        for admin in admin_users:
-            notification_data = {
+        admin_users = await uow.query(COLLECTIONS['users'], [("role", "==", "admin")])
+
+        uow.create_many(COLLECTIONS['notifications'], [
+            {
                 "id": str(uuid.uuid4()),
-                "recipient_id": admin.get("id"),
+                "recipient_id": admin["_doc_id"],
                 "title": "Work Order Permit Request",
                 "message": message,
                 "notification_type": "permit_request",
                 "related_id": permit_id,
-                "is_read": False,
-                "created_at": datetime.utcnow()
+                "is_read": False
             }
-            await self.db.create_document("notifications", notification_data["id"], notification_data)
+            for admin in admin_users
+        ])
 
-    async def _send_tenant_notification(self, recipient_id: str, permit_id: str, message: str):
+    def _send_tenant_notification(self, uow: UnitOfWork, recipient_id: str, permit_id: str, message: str):
         """Send notification to tenant about permit updates"""
         notification_data = {
             "id": str(uuid.uuid4()),
@@ -233,7 +291,6 @@ class WorkOrderPermitService:
             "message": message,
             "notification_type": "permit_update",
             "related_id": permit_id,
-            "is_read": False,
-            "created_at": datetime.utcnow()
+            "is_read": False
         }
-        await self.db.create_document("notifications", notification_data["id"], notification_data)
+        uow.create(COLLECTIONS['notifications'], notification_data)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark the read endpoints of every router offline.
+
+The app runs in-process (httpx over ASGI, no server) on a local storage
+backend (in-memory by default, or SQLite in a throwaway file, never SQLITE_PATH), seeded with a synthetic building's worth of users,
+concern slips, job services and work order permits. Authentication is
+replaced by a fixed admin user, so no Firebase project or network is
+involved and the numbers reflect the routers, services, validation and
+serialisation alone.
+
+Usage:
+    python scripts/benchmark_routers.py [--requests 200] [--concurrency 8] [--scale 1000] [--backend memory]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.auth.dependencies import get_current_user
+from app.core.container import container
+from app.database.backends import BACKENDS, SQLiteFirestore, create_backend
+from app.database.collections import COLLECTIONS
+from app.database.database_service import DatabaseService, database_service
+from app.main import app, http_single_flight
+
+ADMIN = {"uid": "bench-admin", "email": "admin@bench.local", "role": "admin", "user_id": "A-0001"}
+
+STATUSES = {
+    "concern_slips": ["pending", "evaluated", "approved", "rejected"],
+    "job_services": ["assigned", "in_progress", "completed", "closed"],
+    "work_order_permits": ["pending", "approved", "denied", "completed"],
+}
+
+
+async def seed(db: DatabaseService, scale: int, rng: random.Random):
+    now = datetime.utcnow()
+    tenants = [f"tenant-{n}" for n in range(scale)]
+    staff = [f"staff-{n}" for n in range(max(1, scale // 20))]
+
+    users = {}
+    for n, uid in enumerate(tenants + staff):
+        role = "tenant" if uid.startswith("tenant") else "staff"
+        users[uid] = {
+            "user_id": f"{role[0].upper()}-{n + 1:04d}", "email": f"{uid}@bench.local",
+            "first_name": "Bench", "last_name": f"User {n}", "role": role,
+            "status": rng.choice(["active", "active", "active", "suspended"]),
+            "building_id": f"building-{n % 3}", "unit_id": f"unit-{n}",
+            "department": rng.choice(["maintenance", "security", None]) if role == "staff" else None,
+        }
+
+    slips, jobs, permits = {}, {}, {}
+    for n in range(scale * 2):
+        tenant = rng.choice(tenants)
+        slips[f"cs-{n}"] = {
+            "reported_by": tenant, "unit_id": users[tenant]["unit_id"], "title": f"Concern {n}",
+            "description": "Leaking pipe under the sink", "location": "Kitchen",
+            "category": rng.choice(["plumbing", "electrical", "hvac"]),
+            "priority": rng.choice(["low", "medium", "high"]), "status": rng.choice(STATUSES["concern_slips"]),
+        }
+        if n % 2 == 0:
+            jobs[f"js-{n}"] = {
+                "concern_slip_id": f"cs-{n}", "created_by": ADMIN["uid"], "assigned_to": rng.choice(staff),
+                "title": f"Job {n}", "description": "Replace the pipe", "location": "Kitchen",
+                "category": "plumbing", "priority": "medium", "status": rng.choice(STATUSES["job_services"]),
+            }
+        else:
+            permits[f"wp-{n}"] = {
+                "concern_slip_id": f"cs-{n}", "requested_by": tenant, "unit_id": users[tenant]["unit_id"],
+                "contractor_name": "Acme", "contractor_contact": "555-0100", "work_description": "Rewire",
+                "proposed_start_date": now + timedelta(days=3), "estimated_duration": "1 day",
+                "specific_instructions": "Call first", "status": rng.choice(STATUSES["work_order_permits"]),
+            }
+
+    for collection, documents in (("users", users), ("concern_slips", slips),
+                                  ("job_services", jobs), ("work_order_permits", permits)):
+        success, results = await db.create_documents(COLLECTIONS[collection], list(documents.values()),
+                                                     document_ids=list(documents), validate=False)
+        if not success:
+            raise SystemExit(f"Seeding {collection} failed: {next(r for r in results if not r[0])}")
+    return tenants, staff
+
+
+def endpoints(tenants, staff):
+    tenant, member = tenants[0], staff[0]
+    return [
+        ("users", "/users/?page_size=50"),
+        ("users", "/users/?role=tenant&status=active&page_size=50"),
+        ("users", "/users/stats/overview"),
+        ("concern_slips", "/concern-slips/?page_size=50"),
+        ("concern_slips", "/concern-slips/cs-1"),
+        ("concern_slips", f"/concern-slips/tenant/{tenant}"),
+        ("concern_slips", "/concern-slips/status/pending"),
+        ("concern_slips", "/concern-slips/pending/all"),
+        ("concern_slips", "/concern-slips/stats/status"),
+        ("job_services", "/job-services/?page_size=50"),
+        ("job_services", "/job-services/js-0"),
+        ("job_services", f"/job-services/staff/{member}"),
+        ("job_services", "/job-services/status/assigned"),
+        ("job_services", "/job-services/stats/status"),
+        ("work_order_permits", "/work-order-permits/?page_size=50"),
+        ("work_order_permits", "/work-order-permits/wp-1"),
+        ("work_order_permits", f"/work-order-permits/tenant/{tenant}"),
+        ("work_order_permits", "/work-order-permits/pending/all"),
+        ("work_order_permits", "/work-order-permits/stats/status"),
+        ("profiles", "/profiles/building/building-0"),
+        ("profiles", f"/profiles/{tenant}/completion"),
+    ]
+
+
+async def bench(client: httpx.AsyncClient, path: str, requests: int, concurrency: int):
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def _worker():
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "statuses": statuses,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scale", type=int, default=1000, help="Tenants to seed (2x concern slips)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="memory",
+                        help="Storage backend (sqlite uses a temporary file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if args.backend == SQLiteFirestore.name:
+            backend = SQLiteFirestore(path=os.path.join(scratch, "benchmark.sqlite3"))
+        else:
+            backend = create_backend(args.backend)
+        try:
+            await run(args, backend)
+        finally:
+            backend.close()
+
+
+async def run(args, backend):
+    db = DatabaseService(backend)
+    database_service.bind(db)
+    container.database_service = db
+    container._build_services()
+    app.dependency_overrides[get_current_user] = lambda: ADMIN
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    tenants, staff = await seed(db, args.scale, random.Random(args.seed))
+    # Replicated collections (REPLICA_COLLECTIONS) load from the seeded data
+    db.start_replicas()
+    print(f"Seeded {args.scale:,} tenants, {len(staff):,} staff and {args.scale * 2:,} concern slips\n")
+    print(f"{'endpoint':<48} | {'req/s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'reads/req':>9} | status")
+    print("-" * 100)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for router, path in endpoints(tenants, staff):
+            backend.operations.clear()
+            # The routers' debug prints would swamp the table
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = await bench(client, path, args.requests, args.concurrency)
+            reads = backend.operations["reads"] / args.requests
+            statuses = ", ".join(f"{code}x{count}" for code, count in sorted(result["statuses"].items()))
+            print(f"{path:<48} | {result['rps']:>8,.0f} | {result['p50']:>7.2f} | {result['p95']:>7.2f} | "
+                  f"{reads:>9,.1f} | {statuses}")
+
+    print(f"\n{args.requests} requests per endpoint, {args.concurrency} concurrent, {args.backend} backend.")
+    for layer, stats in (("database reads", db.single_flight.stats()), ("GET requests", http_single_flight.stats())):
+        print(f"Coalesced {layer}: {stats['coalesced']:,} of {stats['calls']:,} ({stats['hit_rate']:.0%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark tenant registrations: the old scan-for-max user ID versus the
+block-leased SequenceAllocator.
+
+Runs offline on a local storage backend (in-memory by default, or SQLite
+in a throwaway file, never SQLITE_PATH). For each size the users collection is seeded with that
+many tenants, then registrations run the way POST /auth/register/tenant
+does once Firebase Auth has answered: UserIdService.generate_user_id,
+then the profile created through a unit of work. The scan variant
+generates each ID the way UserIdService did before, by reading every
+tenant and parsing the highest number.
+
+Both run on the same seeded store, the scan first. The allocator starts
+without a counter document, so its first registration includes the
+one-off seed scan; it is reported separately from the steady rate.
+
+Usage:
+    python scripts/benchmark_user_id_allocation.py [--sizes 10000 100000 1000000] [--backend memory]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.database.backends import BACKENDS, SQLiteFirestore, create_backend
+from app.database.collections import COLLECTIONS
+from app.database.database_service import DatabaseService, database_service
+from app.database.sequence_allocator import SequenceAllocator
+from app.database.unit_of_work import unit_of_work
+from app.models.user import UserRole
+from app.services import user_id_service as user_id_module
+from app.services.user_id_service import UserIdService
+
+SEED_CHUNK = 5000
+
+
+async def seed(db: DatabaseService, existing: int):
+    now = datetime.utcnow()
+    for start in range(0, existing, SEED_CHUNK):
+        numbers = range(start + 1, min(existing, start + SEED_CHUNK) + 1)
+        documents = [{
+            "user_id": f"T-{n:04d}", "email": f"tenant-{n}@bench.local", "first_name": "Bench",
+            "last_name": f"Tenant {n}", "role": "tenant", "status": "active",
+            "building_id": f"building-{n % 3}", "unit_id": f"unit-{n}", "created_at": now,
+        } for n in numbers]
+        success, results = await db.create_documents(COLLECTIONS['users'], documents,
+                                                     document_ids=[f"tenant-{n}" for n in numbers],
+                                                     validate=False)
+        if not success:
+            raise SystemExit(f"Seeding failed: {next(r[2] for r in results if not r[0])}")
+
+
+async def scan_user_id() -> str:
+    """UserIdService.generate_user_id as it was: the highest tenant number + 1"""
+    return f"T-{await UserIdService._find_max_number(UserRole.TENANT) + 1:04d}"
+
+
+async def register(generate, name: str) -> str:
+    user_id = await generate()
+    async with unit_of_work(database_service) as uow:
+        uow.create(COLLECTIONS['users'], {
+            "user_id": user_id, "email": f"{name}@bench.local", "first_name": "New",
+            "last_name": name, "role": "tenant", "status": "active",
+        }, document_id=name)
+    return user_id
+
+
+async def bench(backend, label: str, registrations: int, generate) -> dict:
+    """Registrations/sec, plus the first registration on its own"""
+    backend.operations.clear()
+    started = time.perf_counter()
+    ids = [await register(generate, f"{label}-0")]
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    for n in range(1, registrations):
+        ids.append(await register(generate, f"{label}-{n}"))
+    rest = time.perf_counter() - started
+
+    numbers = [int(user_id.split("-")[1]) for user_id in ids]
+    if numbers != list(range(numbers[0], numbers[0] + len(numbers))):
+        raise SystemExit(f"{label}: user IDs are not consecutive: {ids[:3]}...")
+    return {
+        "first_ms": first * 1000,
+        "rate": (registrations - 1) / rest if registrations > 1 else 0.0,
+        "reads": backend.operations["reads"] / registrations,
+    }
+
+
+async def bench_size(backend_name: str, existing: int, registrations: int) -> tuple:
+    """Seed ``existing`` tenants, then time the scan and then the allocator on them"""
+    with tempfile.TemporaryDirectory() as scratch:
+        if backend_name == SQLiteFirestore.name:
+            backend = SQLiteFirestore(path=os.path.join(scratch, "benchmark.sqlite3"))
+        else:
+            backend = create_backend(backend_name)
+        try:
+            return await _bench_backend(backend, existing, registrations)
+        finally:
+            backend.close()
+
+
+async def _bench_backend(backend, existing: int, registrations: int) -> tuple:
+    db = DatabaseService(backend)
+    database_service.bind(db)
+    # A fresh allocator: no leased block and, until it seeds one, no counter document
+    user_id_module.sequence_allocator = SequenceAllocator(database_service, block_size=settings.USER_ID_BLOCK_SIZE)
+    await seed(db, existing)
+
+    # The scan reads every tenant per registration; a handful is enough
+    scan = await bench(backend, "scan", max(3, min(50, 500_000 // existing)), scan_user_id)
+    leased = await bench(backend, "leased", registrations,
+                         lambda: UserIdService.generate_user_id(UserRole.TENANT))
+    return scan, leased
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Existing tenants to seed")
+    parser.add_argument("--registrations", type=int, default=200, help="Registrations with the allocator")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="memory",
+                        help="Storage backend (sqlite uses a temporary file)")
+    args = parser.parse_args()
+
+    print(f"{'existing users':>15} | {'scan reg/s':>10} | {'scan reads/reg':>14} | "
+          f"{'leased reg/s':>12} | {'leased reads/reg':>16} | {'first (seed) ms':>15}")
+    print("-" * 100)
+    for size in args.sizes:
+        scan, leased = await bench_size(args.backend, size, args.registrations)
+        print(f"{size:>15,} | {scan['rate']:>10,.2f} | {scan['reads']:>14,.0f} | "
+              f"{leased['rate']:>12,.1f} | {leased['reads']:>16,.2f} | {leased['first_ms']:>15,.1f}")
+
+    print(f"\n{args.backend} backend, block size {settings.USER_ID_BLOCK_SIZE}. reads/reg are "
+          "billed-equivalent document reads, seed scan included.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
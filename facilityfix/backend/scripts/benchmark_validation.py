@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of schema validation, before and after compiling validators.
+
+For each collection, synthetic documents (every model field filled in, a
+share of them invalid) are validated three ways:
+
+- before: a Pydantic model built per document, as SchemaValidator did
+  (with the errors formatted the same way);
+- validate_document: the per-collection validator compiled at import;
+- validate_many: the whole list in one pass, as create_documents does.
+
+validate_required_fields and get_collection_schema are timed against the
+model walk and the schema generation they used to do on every call.
+
+Usage:
+    python scripts/benchmark_validation.py [--documents 20000] [--invalid 0.1] [--collection users]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import typing
+from datetime import datetime
+from enum import Enum
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import ValidationError
+
+from app.database.schema_validator import SchemaValidator, schema_validator
+
+SAMPLES = {str: "value", int: 3, float: 2.5, bool: True, datetime: datetime(2024, 1, 1), list: [], dict: {}}
+
+
+def sample_value(annotation):
+    """A valid value of a field's type"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return sample_value(next(arg for arg in typing.get_args(annotation) if arg is not type(None)))
+    if origin is not None:
+        return SAMPLES.get(origin, "value")
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return next(iter(annotation)).value
+    return SAMPLES.get(annotation, "value")
+
+
+def documents(collection: str, count: int, invalid: float, rng: random.Random):
+    model = SchemaValidator.MODEL_MAPPING[collection]
+    template = {name: sample_value(field_info.annotation) for name, field_info in model.model_fields.items()}
+    required = [name for name, field_info in model.model_fields.items() if field_info.is_required()]
+    docs = []
+    for n in range(count):
+        doc = dict(template, id=f"doc-{n}")
+        if required and rng.random() < invalid:
+            del doc[rng.choice(required)]
+        docs.append(doc)
+    return docs
+
+
+def validate_before(collection: str, data):
+    """SchemaValidator.validate_document as it was: a model instance per document"""
+    try:
+        SchemaValidator.MODEL_MAPPING[collection](**data)
+        return True, None
+    except ValidationError as e:
+        return False, "; ".join(f"{' -> '.join(str(x) for x in error['loc'])}: {error['msg']}"
+                                for error in e.errors())
+
+
+def required_before(collection: str, data):
+    model = SchemaValidator.MODEL_MAPPING[collection]
+    required = [name for name, field_info in model.model_fields.items()
+                if field_info.is_required() and name not in ['id', 'created_at', 'updated_at']]
+    missing = [field for field in required if field not in data or data[field] is None]
+    return len(missing) == 0, missing
+
+
+def rate(fn, count: int, repeat: int = 3) -> float:
+    """Best of ``repeat`` runs, in calls per second"""
+    best = min(_timed(fn) for _ in range(repeat))
+    return count / best
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20000, help="Documents per collection")
+    parser.add_argument("--invalid", type=float, default=0.1, help="Share of documents missing a required field")
+    parser.add_argument("--collection", action="append", choices=sorted(SchemaValidator.MODEL_MAPPING),
+                        help="Collection to benchmark (repeatable; default all)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    collections = args.collection or sorted(SchemaValidator.MODEL_MAPPING)
+    print(f"{'collection':<20} | {'before docs/s':>13} | {'document docs/s':>15} | {'many docs/s':>11} | "
+          f"{'speedup':>7} | {'required x':>10} | {'schema x':>8}")
+    print("-" * 104)
+    for collection in collections:
+        docs = documents(collection, args.documents, args.invalid, rng)
+        expected = [validate_before(collection, doc) for doc in docs]
+        if [schema_validator.validate_document(collection, doc) for doc in docs] != expected \
+                or schema_validator.validate_many(collection, docs) != expected:
+            raise SystemExit(f"{collection}: validation results differ from the model's")
+
+        before = rate(lambda: [validate_before(collection, doc) for doc in docs], len(docs))
+        single = rate(lambda: [schema_validator.validate_document(collection, doc) for doc in docs], len(docs))
+        many = rate(lambda: schema_validator.validate_many(collection, docs), len(docs))
+        required = (rate(lambda: [schema_validator.validate_required_fields(collection, doc) for doc in docs], len(docs))
+                    / rate(lambda: [required_before(collection, doc) for doc in docs], len(docs)))
+        model = SchemaValidator.MODEL_MAPPING[collection]
+        schema = (rate(lambda: [schema_validator.get_collection_schema(collection) for _ in range(100)], 100)
+                  / rate(lambda: [model.model_json_schema() for _ in range(100)], 100))
+        print(f"{collection:<20} | {before:>13,.0f} | {single:>15,.0f} | {many:>11,.0f} | "
+              f"{many / before:>6.1f}x | {required:>9.1f}x | {schema:>7.1f}x")
+
+    print(f"\n{args.documents:,} documents per collection, {args.invalid:.0%} invalid; "
+          "speedup is validate_many over before.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Check that a storage backend behaves like Firestore behind DatabaseService.
+
+Runs the same DatabaseService calls the routers and services make (CRUD,
+preconditions, filters, ordering and cursor pagination, projections,
+aggregations, batched reads and writes, increments and transactions) and
+compares the results with what Firestore returns. Run it against the live
+project to confirm the expectations, and against a stand-in backend to
+confirm the stand-in:
+
+    python scripts/check_storage_backend.py                     # in-memory backend
+    python scripts/check_storage_backend.py --backend firestore # live project
+
+Against Firestore the checks write to throwaway collections prefixed with
+``conformance_`` and delete them afterwards.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.backends import BACKENDS, create_backend
+from app.database.database_service import DatabaseService
+
+CHECKS = []
+
+
+def check(fn):
+    CHECKS.append(fn)
+    return fn
+
+
+def expect(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+async def seed(db: DatabaseService, collection: str, documents: dict):
+    success, results = await db.create_documents(collection, list(documents.values()),
+                                                 document_ids=list(documents), validate=False)
+    expect(success, f"seeding failed: {results}")
+
+
+@check
+async def create_and_get(db, prefix):
+    collection = f"{prefix}_docs"
+    success, doc_id, error = await db.create_document(collection, {"name": "a", "n": 1}, validate=False)
+    expect(success and doc_id, f"create failed: {error}")
+    expect(len(doc_id) == 20, f"auto IDs are 20 characters, got {doc_id!r}")
+
+    success, doc, error = await db.get_document(collection, doc_id)
+    expect(success and doc["name"] == "a" and doc["id"] == doc_id, f"read back {doc!r}: {error}")
+    expect(doc["created_at"].tzinfo is not None, "timestamps are read back timezone-aware")
+
+    success, doc, _ = await db.get_document(collection, "missing")
+    expect(not success and doc is None, "reading a missing document fails")
+
+
+@check
+async def update_and_delete(db, prefix):
+    collection = f"{prefix}_docs"
+    await seed(db, collection, {"u1": {"name": "a", "nested": {"x": 1, "y": 2}}})
+
+    success, error = await db.update_document(collection, "u1", {"nested.x": 5, "extra": True}, validate=False)
+    expect(success, f"update failed: {error}")
+    _, doc, _ = await db.get_document(collection, "u1")
+    expect(doc["nested"] == {"x": 5, "y": 2} and doc["extra"] is True, f"dotted update gave {doc!r}")
+
+    success, error = await db.update_document(collection, "nope", {"name": "b"}, validate=False)
+    expect(not success and "not found" in error, f"updating a missing document fails as not found: {error}")
+
+    success, error = await db.delete_document(collection, "u1")
+    expect(success, f"delete failed: {error}")
+    success, _, _ = await db.get_document(collection, "u1")
+    expect(not success, "deleted documents are gone")
+
+    success, error = await db.delete_document(collection, "u1")
+    expect(success, "deleting a missing document succeeds")
+
+
+@check
+async def update_precondition(db, prefix):
+    collection = f"{prefix}_docs"
+    await seed(db, collection, {"p1": {"version": 1}})
+    snapshot = await db._run(db.db.collection(collection).document("p1").get)
+
+    success, error = await db.update_document(collection, "p1", {"version": 2}, validate=False,
+                                              last_update_time=snapshot.update_time)
+    expect(success, f"update with a current update_time succeeds: {error}")
+    success, error = await db.update_document(collection, "p1", {"version": 3}, validate=False,
+                                              last_update_time=snapshot.update_time)
+    expect(not success and "modified since" in error, f"update with a stale update_time fails: {error}")
+
+
+@check
+async def filters(db, prefix):
+    collection = f"{prefix}_filters"
+    await seed(db, collection, {
+        "a": {"n": 1, "s": "x", "tags": ["red", "blue"], "flag": True},
+        "b": {"n": 2.0, "s": "y", "tags": ["green"], "flag": False},
+        "c": {"n": 3, "s": "z", "tags": [], "flag": None},
+        "d": {"n": "3", "s": "x"},
+        "e": {"s": "w"},
+    })
+
+    async def ids(filters):
+        success, docs, error = await db.query_documents(collection, filters)
+        expect(success, f"query {filters} failed: {error}")
+        return sorted(doc["_doc_id"] for doc in docs)
+
+    cases = [
+        ([("n", "==", 2)], ["b"]),                      # 2 == 2.0
+        ([("n", ">", 1)], ["b", "c"]),                  # numbers only, not "3"
+        ([("n", ">=", "0")], ["d"]),                    # strings only
+        ([("n", "<=", 2)], ["a", "b"]),
+        ([("n", "!=", 1)], ["b", "c", "d"]),            # field must exist
+        ([("s", "in", ["x", "w"])], ["a", "d", "e"]),
+        ([("s", "not-in", ["x", "w"])], ["b", "c"]),
+        ([("tags", "array_contains", "red")], ["a"]),
+        ([("tags", "array_contains_any", ["green", "blue"])], ["a", "b"]),
+        ([("flag", "==", True)], ["a"]),                # True is not 1
+        ([("flag", "==", None)], ["c"]),                # explicit nulls only
+        ([("s", "==", "x"), ("flag", "==", True)], ["a"]),
+        ([("s", "x")], ["a", "d"]),                     # two-tuples mean ==
+    ]
+    for query_filters, expected in cases:
+        got = await ids(query_filters)
+        expect(got == expected, f"{query_filters}: expected {expected}, got {got}")
+
+
+@check
+async def ordering_and_pages(db, prefix):
+    collection = f"{prefix}_pages"
+    base = datetime(2024, 1, 1)
+    documents = {f"doc{i:02d}": {"rank": i % 4, "created_at": base + timedelta(minutes=i)} for i in range(23)}
+    documents["no_rank"] = {"created_at": base}
+    success, results = await db.create_documents(collection, list(documents.values()),
+                                                 document_ids=list(documents), validate=False)
+    expect(success, f"seeding failed: {results}")
+    # create_documents stamps created_at; put the seeded values back
+    await db.update_documents(collection, [(i, {"created_at": d["created_at"]}) for i, d in documents.items()],
+                              validate=False)
+
+    success, docs, _ = await db.query_documents(collection, order_by="rank", descending=True)
+    got = [(doc["rank"], doc["_doc_id"]) for doc in docs]
+    expected = sorted(((d["rank"], i) for i, d in documents.items() if "rank" in d), reverse=True)
+    expect(got == expected, "order_by sorts by the field, then the document ID in the same direction, "
+                            "and leaves out documents without the field")
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        success, page, cursor, error = await db.query_page(collection, [("rank", "<", 3)],
+                                                           order_by="rank", descending=False,
+                                                           page_size=4, cursor=cursor)
+        expect(success, f"page failed: {error}")
+        seen += [doc["_doc_id"] for doc in page]
+        pages += 1
+        if cursor is None:
+            break
+    expected = [i for _, i in sorted((d["rank"], i) for i, d in documents.items() if d.get("rank", 9) < 3)]
+    expect(seen == expected, f"paging visits every document once, in order ({pages} pages)")
+
+    success, page, cursor, _ = await db.query_page(collection, page_size=5)
+    expect([doc["_doc_id"] for doc in page] == [f"doc{i:02d}" for i in range(22, 17, -1)],
+           "query_page defaults to newest first")
+
+    success, docs, _ = await db.query_documents(collection, [("rank", "==", 1)], limit=2)
+    expect(len(docs) == 2, "limit caps the result")
+
+
+@check
+async def projection_and_scan(db, prefix):
+    collection = f"{prefix}_scan"
+    await seed(db, collection, {f"s{i:03d}": {"a": i, "b": {"c": i, "d": "x"}, "e": "y"} for i in range(25)})
+
+    success, docs, _ = await db.query_documents(collection, [("a", "==", 3)], fields=["a", "b.c"])
+    expect(docs == [{"a": 3, "b": {"c": 3}, "_doc_id": "s003"}], f"projection returned {docs!r}")
+
+    scanned = [doc["_doc_id"] async for doc in db.scan_documents(collection, page_size=7, fields=["a"])]
+    expect(scanned == sorted(scanned) and len(scanned) == 25, "scan visits every document in ID order")
+
+
+@check
+async def aggregations(db, prefix):
+    collection = f"{prefix}_agg"
+    await seed(db, collection, {
+        "a": {"kind": "x", "amount": 10},
+        "b": {"kind": "x", "amount": 2.5},
+        "c": {"kind": "x", "amount": "12"},
+        "d": {"kind": "y", "amount": 4},
+    })
+    success, values, error = await db.aggregate_documents(
+        collection, [("kind", "==", "x")], [("count", None), ("sum", "amount"), ("avg", "amount")]
+    )
+    expect(success, f"aggregation failed: {error}")
+    expect(values == {"count": 3, "sum_amount": 12.5, "avg_amount": 6.25},
+           f"count counts every match, sum/avg only numbers: {values}")
+
+    success, values, _ = await db.aggregate_documents(collection, [("kind", "==", "z")],
+                                                      [("count", None), ("sum", "amount"), ("avg", "amount")])
+    expect(values == {"count": 0, "sum_amount": 0, "avg_amount": None}, f"empty aggregation gave {values}")
+
+
+@check
+async def batched_reads(db, prefix):
+    collection = f"{prefix}_many"
+    await seed(db, collection, {f"m{i}": {"i": i} for i in range(5)})
+    success, docs, missing, error = await db.get_documents(collection, ["m3", "x", "m1", "m3"])
+    expect(success, f"get_documents failed: {error}")
+    expect([doc and doc["i"] for doc in docs] == [3, None, 1, 3] and missing == ["x"],
+           f"documents follow the requested order: {docs}, missing {missing}")
+
+
+@check
+async def atomic_batches(db, prefix):
+    collection = f"{prefix}_batch"
+    await seed(db, collection, {"keep": {"v": 1}})
+    success, error = await db.commit_writes([
+        ("update", collection, "keep", {"v": 2}),
+        ("update", collection, "absent", {"v": 2}),
+    ])
+    expect(not success and "does not exist" in error, f"a batch with a missing update fails: {error}")
+    _, doc, _ = await db.get_document(collection, "keep")
+    expect(doc["v"] == 1, "a failed batch applies none of its writes")
+
+    success, error = await db.commit_writes([
+        ("increment", collection, "counter", {"total": 2, "by_kind": {"a": 1}}),
+        ("increment", collection, "counter", {"total": -1, "by_kind": {"a": 1, "b": 1}}),
+    ])
+    expect(success, f"increments failed: {error}")
+    _, doc, _ = await db.get_document(collection, "counter")
+    expect(doc["total"] == 1 and doc["by_kind"] == {"a": 2, "b": 1}, f"increments merged to {doc}")
+
+
+@check
+async def transactions(db, prefix):
+    collection = f"{prefix}_seq"
+    success, start, _ = await db.reserve_sequence_block(collection, "ids", 10)
+    expect(success and start is None, "a missing counter without an initial value reserves nothing")
+
+    results = await asyncio.gather(*[db.reserve_sequence_block(collection, "ids", 10, initial=1) for _ in range(8)])
+    starts = sorted(start for _, start, _ in results)
+    expect(starts == list(range(1, 81, 10)), f"concurrent reservations never overlap: {starts}")
+
+
+async def cleanup(db: DatabaseService, prefix: str):
+    for collection in ("docs", "filters", "pages", "scan", "agg", "many", "batch", "seq"):
+        ids = [doc["_doc_id"] async for doc in db.scan_documents(f"{prefix}_{collection}", fields=[])]
+        await db.delete_documents(f"{prefix}_{collection}", ids)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="memory", choices=["firestore", *sorted(BACKENDS)])
+    args = parser.parse_args()
+
+    db = DatabaseService() if args.backend == "firestore" else DatabaseService(create_backend(args.backend))
+    prefix = f"conformance_{uuid.uuid4().hex[:8]}"
+    print(f"Checking the {args.backend} backend...")
+
+    failed = 0
+    try:
+        for fn in CHECKS:
+            try:
+                await fn(db, prefix)
+                print(f"  ✅ {fn.__name__}")
+            except AssertionError as e:
+                failed += 1
+                print(f"  ❌ {fn.__name__}: {e}")
+            except Exception:
+                failed += 1
+                print(f"  ❌ {fn.__name__} raised:")
+                traceback.print_exc()
+    finally:
+        await cleanup(db, prefix)
+        db.close()
+
+    print(f"\n{len(CHECKS) - failed} of {len(CHECKS)} checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Generate firestore.indexes.json from the indexes declared in
+app/database/collections.py (COLLECTION_SCHEMAS).
+
+Deploy the result with:
+    firebase deploy --only firestore:indexes
+
+Usage:
+    python scripts/generate_firestore_indexes.py [--check] [--output PATH]
+
+--check writes nothing and exits 1 if the file is out of date, for CI.
+"""
+import argparse
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from app.database.indexes import index_manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=os.path.join(BACKEND_DIR, "firestore.indexes.json"),
+                        help="Manifest to write (default: firestore.indexes.json next to firebase.json)")
+    parser.add_argument("--check", action="store_true",
+                        help="Only compare with the existing manifest; exit 1 if it differs")
+    args = parser.parse_args()
+
+    manifest = json.dumps(index_manifest(), indent=2) + "\n"
+
+    if args.check:
+        try:
+            with open(args.output) as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current is None or json.loads(current) != json.loads(manifest):
+            print(f"❌ {args.output} is out of date; run scripts/generate_firestore_indexes.py")
+            sys.exit(1)
+        print(f"✅ {args.output} is up to date")
+        return
+
+    with open(args.output, "w") as f:
+        f.write(manifest)
+    print(f"✅ Wrote {len(json.loads(manifest)['indexes'])} composite indexes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
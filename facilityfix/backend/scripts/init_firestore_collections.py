@@ -3,53 +3,34 @@ Firestore Database Initialization Script
 Creates collections with proper indexes and sample data for FacilityFix
 """
 
+import asyncio
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.config import settings
-from app.auth.firebase_auth import firebase_auth  # Initialize Firebase first
+from app.database.database_service import database_service
 from app.database.firestore_client import FirestoreClient
 from app.database.collections import COLLECTIONS, COLLECTION_SCHEMAS
+from app.database.indexes import declared_indexes
 from app.models.database_models import Building, Unit, UserProfile, Equipment, Inventory
 from datetime import datetime
 import json
 
 def create_indexes():
-    """Create composite indexes for Firestore collections"""
+    """List the composite indexes declared in COLLECTION_SCHEMAS"""
     print("Creating Firestore indexes...")
     
-    # Note: Composite indexes need to be created via Firebase Console or gcloud CLI
-    # This function documents the required indexes
-    
-    required_indexes = {
-        'repair_requests': [
-            ['status', 'priority'],
-            ['assigned_to', 'status'],
-            ['reported_by', 'created_at']
-        ],
-        'maintenance_tasks': [
-            ['assigned_to', 'status'],
-            ['scheduled_date', 'status'],
-            ['equipment_id', 'status']
-        ],
-        'inventory': [
-            ['building_id', 'current_stock'],
-            ['department', 'current_stock']
-        ],
-        'equipment': [
-            ['building_id', 'equipment_type'],
-            ['building_id', 'status']
-        ]
-    }
+    # Note: Composite indexes are deployed from firestore.indexes.json, which
+    # scripts/generate_firestore_indexes.py builds from the collection schemas
     
     print("Required composite indexes:")
-    for collection, indexes in required_indexes.items():
+    for collection, indexes in declared_indexes().items():
         print(f"\n{collection}:")
         for index in indexes:
-            print(f"  - {' + '.join(index)}")
+            print(f"  - {' + '.join(f'{field} {direction.lower()}' for field, direction in index)}")
     
-    print("\nNote: Create these indexes in Firebase Console under Firestore > Indexes")
+    print("\nNote: Run scripts/generate_firestore_indexes.py, then `firebase deploy --only firestore:indexes`")
 
 def create_sample_building():
     """Create a sample building for testing"""
@@ -78,26 +59,25 @@ def create_sample_units(building_id: str):
     if not building_id:
         return
     
-    client = FirestoreClient()
+    # Create sample units for floors 1-3, in one batched write
+    units = [
+        {
+            'building_id': building_id,
+            'unit_number': f"{floor:02d}{unit_num:02d}",
+            'floor_number': floor,
+            'occupancy_status': 'occupied' if unit_num <= 6 else 'vacant'
+        }
+        for floor in range(1, 4)  # Floors 1, 2, 3
+        for unit_num in range(1, 9)  # 8 units per floor
+    ]
     
-    # Create sample units for floors 1-3
+    _, results = asyncio.run(database_service.create_documents(COLLECTIONS['units'], units))
     units_created = 0
-    for floor in range(1, 4):  # Floors 1, 2, 3
-        for unit_num in range(1, 9):  # 8 units per floor
-            unit_data = {
-                'building_id': building_id,
-                'unit_number': f"{floor:02d}{unit_num:02d}",
-                'floor_number': floor,
-                'occupancy_status': 'occupied' if unit_num <= 6 else 'vacant',
-                'created_at': datetime.utcnow(),
-                'updated_at': datetime.utcnow()
-            }
-            
-            try:
-                unit_id = client.create_document(COLLECTIONS['units'], data=unit_data)
-                units_created += 1
-            except Exception as e:
-                print(f"Error creating unit {unit_data['unit_number']}: {e}")
+    for unit_data, (success, _, error) in zip(units, results):
+        if success:
+            units_created += 1
+        else:
+            print(f"Error creating unit {unit_data['unit_number']}: {error}")
     
     print(f"Created {units_created} sample units")
 
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rebuild the sharded dashboard counters from a scan of each counted
+collection (users, concern slips, job services, work order permits).
+
+Run it once after deploying the counters, and again whenever documents
+were written outside a unit of work (seed scripts, the Firebase console,
+bulk imports) and the dashboards have drifted.
+
+Usage:
+    python scripts/reconcile_counters.py [collection ...]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.counters import COUNTED_FIELDS, reconcile_counts
+from app.database.database_service import database_service
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collections", nargs="*",
+                        help=f"Collections to reconcile (default: {', '.join(sorted(COUNTED_FIELDS))})")
+    args = parser.parse_args()
+    unknown = set(args.collections) - set(COUNTED_FIELDS)
+    if unknown:
+        parser.error(f"not a counted collection: {', '.join(sorted(unknown))}")
+
+    failed = False
+    for collection in args.collections or sorted(COUNTED_FIELDS):
+        print(f"Reconciling {collection}...")
+        success, counts, error = await reconcile_counts(database_service, collection)
+        if not success:
+            print(f"  ❌ {error}")
+            failed = True
+            continue
+        print(f"  ✅ total: {counts['total']}")
+        for key, group in counts.items():
+            if key != "total":
+                print(f"     {key}: {dict(sorted(group.items()))}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
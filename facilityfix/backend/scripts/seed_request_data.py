@@ -84,22 +84,22 @@ class RequestDataSeeder:
             }
         ]
         
-        for concern_slip in concern_slips:
-            try:
-                success, slip_id, error = await database_service.create_document(
-                    COLLECTIONS['concern_slips'],
-                    concern_slip,
-                    validate=True
-                )
-                
+        try:
+            _, results = await database_service.create_documents(
+                COLLECTIONS['concern_slips'],
+                concern_slips,
+                validate=True
+            )
+            
+            for concern_slip, (success, doc_id, error) in zip(concern_slips, results):
                 if success:
-                    self.created_concern_slips.append(slip_id)
+                    self.created_concern_slips.append(doc_id)
                     print(f"✅ Created concern slip: {concern_slip['title']}")
                 else:
                     print(f"❌ Failed to create concern slip {concern_slip['title']}: {error}")
                     
-            except Exception as e:
-                print(f"❌ Error creating concern slip {concern_slip['title']}: {str(e)}")
+        except Exception as e:
+            print(f"❌ Error creating concern slips: {str(e)}")
     
     async def create_job_services(self):
         """Create sample job services"""
@@ -130,22 +130,22 @@ class RequestDataSeeder:
             }
         ]
         
-        for job_service in job_services:
-            try:
-                success, job_id, error = await database_service.create_document(
-                    COLLECTIONS['job_services'],
-                    job_service,
-                    validate=True
-                )
-                
+        try:
+            _, results = await database_service.create_documents(
+                COLLECTIONS['job_services'],
+                job_services,
+                validate=True
+            )
+            
+            for job_service, (success, doc_id, error) in zip(job_services, results):
                 if success:
-                    self.created_job_services.append(job_id)
+                    self.created_job_services.append(doc_id)
                     print(f"✅ Created job service: {job_service['title']}")
                 else:
                     print(f"❌ Failed to create job service {job_service['title']}: {error}")
                     
-            except Exception as e:
-                print(f"❌ Error creating job service {job_service['title']}: {str(e)}")
+        except Exception as e:
+            print(f"❌ Error creating job services: {str(e)}")
     
     async def create_work_order_permits(self):
         """Create sample work order permits"""
@@ -178,22 +178,22 @@ class RequestDataSeeder:
             }
         ]
         
-        for permit in work_order_permits:
-            try:
-                success, permit_id, error = await database_service.create_document(
-                    COLLECTIONS['work_order_permits'],
-                    permit,
-                    validate=True
-                )
-                
+        try:
+            _, results = await database_service.create_documents(
+                COLLECTIONS['work_order_permits'],
+                work_order_permits,
+                validate=True
+            )
+            
+            for permit, (success, doc_id, error) in zip(work_order_permits, results):
                 if success:
-                    self.created_work_order_permits.append(permit_id)
+                    self.created_work_order_permits.append(doc_id)
                     print(f"✅ Created work order permit: {permit['work_description'][:50]}...")
                 else:
                     print(f"❌ Failed to create work order permit: {error}")
                     
-            except Exception as e:
-                print(f"❌ Error creating work order permit: {str(e)}")
+        except Exception as e:
+            print(f"❌ Error creating work order permits: {str(e)}")
     
     async def seed_all_request_data(self):
         """Seed all request management data"""
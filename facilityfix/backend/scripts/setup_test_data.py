@@ -50,22 +50,22 @@ class TestDataSetup:
             }
         ]
         
-        for building in buildings:
-            try:
-                success, building_id, error = await database_service.create_document(
-                    COLLECTIONS['buildings'],
-                    building,
-                    validate=True
-                )
-                
+        try:
+            _, results = await database_service.create_documents(
+                COLLECTIONS['buildings'],
+                buildings,
+                validate=True
+            )
+            
+            for building, (success, building_id, error) in zip(buildings, results):
                 if success:
                     self.created_buildings.append(building_id)
                     print(f"Created building: {building['building_name']}")
                 else:
                     print(f"Failed to create building {building['building_name']}: {error}")
                     
-            except Exception as e:
-                print(f"Error creating building {building['building_name']}: {str(e)}")
+        except Exception as e:
+            print(f"Error creating buildings: {str(e)}")
     
     async def create_test_units(self):
         """Create test units"""
@@ -82,25 +82,22 @@ class TestDataSetup:
             {"id": "unit_005", "building_id": "building_002", "unit_number": "302", "floor_number": 3, "occupancy_status": "vacant"},
         ]
         
-        for unit in units:
-            try:
-                unit["created_at"] = datetime.utcnow()
-                unit["updated_at"] = datetime.utcnow()
-                
-                success, unit_id, error = await database_service.create_document(
-                    COLLECTIONS['units'],
-                    unit,
-                    validate=True
-                )
-                
+        try:
+            _, results = await database_service.create_documents(
+                COLLECTIONS['units'],
+                units,
+                validate=True
+            )
+            
+            for unit, (success, unit_id, error) in zip(units, results):
                 if success:
                     self.created_units.append(unit_id)
                     print(f"Created unit: {unit['unit_number']} in {unit['building_id']}")
                 else:
                     print(f"Failed to create unit {unit['unit_number']}: {error}")
                     
-            except Exception as e:
-                print(f"Error creating unit {unit['unit_number']}: {str(e)}")
+        except Exception as e:
+            print(f"Error creating units: {str(e)}")
     
     async def create_test_users(self):
         """Create test users"""